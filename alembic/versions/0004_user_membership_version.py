@@ -0,0 +1,26 @@
+"""users.membership_version (stamp for membership claims in access tokens)
+
+Revision ID: 0004_user_membership_version
+Revises: 0003_webhook_event_status_error
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004_user_membership_version"
+down_revision = "0003_webhook_event_status_error"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("membership_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+def downgrade() -> None:
+    op.drop_column("users", "membership_version")
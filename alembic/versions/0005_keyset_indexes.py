@@ -0,0 +1,39 @@
+"""composite indexes for keyset pagination on (created_at, id)
+
+Revision ID: 0005_keyset_indexes
+Revises: 0004_user_membership_version
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005_keyset_indexes"
+down_revision = "0004_user_membership_version"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tasks_org_project_created_id",
+        "tasks",
+        ["org_id", "project_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_projects_org_created_id",
+        "projects",
+        ["org_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_orgs_created_id",
+        "orgs",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_orgs_created_id", table_name="orgs")
+    op.drop_index("ix_projects_org_created_id", table_name="projects")
+    op.drop_index("ix_tasks_org_project_created_id", table_name="tasks")
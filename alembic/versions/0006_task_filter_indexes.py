@@ -0,0 +1,56 @@
+"""indexes for task list filters (status, assignee, creator, updated_at)
+
+Revision ID: 0006_task_filter_indexes
+Revises: 0005_keyset_indexes
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006_task_filter_indexes"
+down_revision = "0005_keyset_indexes"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+# all lead with (org_id, project_id) and, where the filter is an equality,
+# end in the keyset order so a filtered page is still a range scan
+def upgrade() -> None:
+    op.create_index(
+        "ix_tasks_project_status_created",
+        "tasks",
+        ["org_id", "project_id", "status", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    # "my open tasks": small, hot, and skips the done backlog entirely
+    op.create_index(
+        "ix_tasks_project_assignee_open",
+        "tasks",
+        ["org_id", "project_id", "assigned_to", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("status IN ('todo', 'doing')"),
+    )
+    op.create_index(
+        "ix_tasks_project_assignee_created",
+        "tasks",
+        ["org_id", "project_id", "assigned_to", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("assigned_to IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_tasks_project_creator_created",
+        "tasks",
+        ["org_id", "project_id", "created_by", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_tasks_project_updated",
+        "tasks",
+        ["org_id", "project_id", "updated_at"],
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_project_updated", table_name="tasks")
+    op.drop_index("ix_tasks_project_creator_created", table_name="tasks")
+    op.drop_index("ix_tasks_project_assignee_created", table_name="tasks")
+    op.drop_index("ix_tasks_project_assignee_open", table_name="tasks")
+    op.drop_index("ix_tasks_project_status_created", table_name="tasks")
@@ -0,0 +1,54 @@
+"""tasks.search_tsv generated column + indexes for title search
+
+adding a stored generated column rewrites the tasks table; run it in a
+maintenance window on large installs.
+
+Revision ID: 0007_task_title_search
+Revises: 0006_task_filter_indexes
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0007_task_title_search"
+down_revision = "0006_task_filter_indexes"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    # 'simple': no stemming or stop words (titles are short and multilingual);
+    # prefix matching on the last search term covers most of what stemming would
+    op.add_column(
+        "tasks",
+        sa.Column(
+            "search_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple'::regconfig, coalesce(title, ''))", persisted=True),
+            nullable=True,
+        ),
+    )
+    # fastupdate off: no pending list for every search to scan under steady
+    # inserts; costs a few more index page writes per task insert
+    op.create_index(
+        "ix_tasks_search_tsv",
+        "tasks",
+        ["search_tsv"],
+        postgresql_using="gin",
+        postgresql_with={"fastupdate": "off"},
+    )
+    # newest matches first across the whole org (app.task_search candidates)
+    op.create_index(
+        "ix_tasks_org_created_id",
+        "tasks",
+        ["org_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_org_created_id", table_name="tasks")
+    op.drop_index("ix_tasks_search_tsv", table_name="tasks")
+    op.drop_column("tasks", "search_tsv")
@@ -0,0 +1,51 @@
+"""projects.deleting_at + project_deletions (background project delete)
+
+Revision ID: 0008_project_deletions
+Revises: 0007_task_title_search
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0008_project_deletions"
+down_revision = "0007_task_title_search"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.add_column("projects", sa.Column("deleting_at", sa.DateTime(timezone=True), nullable=True))
+    # the few projects being deleted, looked up per org to hide their tasks
+    op.create_index(
+        "ix_projects_org_deleting",
+        "projects",
+        ["org_id"],
+        postgresql_where=sa.text("deleting_at IS NOT NULL"),
+    )
+
+    # no fk to projects: the row outlives the project it tracks
+    op.create_table(
+        "project_deletions",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("org_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("orgs.id"), nullable=False),
+        sa.Column("requested_by", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="pending"),
+        sa.Column("tasks_total", sa.Integer(), nullable=True),
+        sa.Column("tasks_purged", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_project_deletions_org_id", "project_deletions", ["org_id"])
+
+def downgrade() -> None:
+    op.drop_index("ix_project_deletions_org_id", table_name="project_deletions")
+    op.drop_table("project_deletions")
+    op.drop_index("ix_projects_org_deleting", table_name="projects")
+    op.drop_column("projects", "deleting_at")
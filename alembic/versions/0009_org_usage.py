@@ -0,0 +1,47 @@
+"""org_usage counters for the free plan limits, backfilled from current rows
+
+Revision ID: 0009_org_usage
+Revises: 0008_project_deletions
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0009_org_usage"
+down_revision = "0008_project_deletions"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.create_table(
+        "org_usage",
+        sa.Column(
+            "org_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("orgs.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("projects", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tasks", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("members", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    # same definitions as app.billing.usage.reconcile
+    op.execute(
+        """
+        insert into org_usage (org_id, projects, tasks, members)
+        select o.id,
+               (select count(*) from projects p where p.org_id = o.id and p.deleting_at is null),
+               (select count(*) from tasks t where t.org_id = o.id),
+               (select count(*) from memberships m where m.org_id = o.id)
+        from orgs o
+        """
+    )
+
+def downgrade() -> None:
+    op.drop_table("org_usage")
@@ -0,0 +1,25 @@
+"""change_version counters on orgs and projects for conditional GETs
+
+Revision ID: 0010_change_versions
+Revises: 0009_org_usage
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0010_change_versions"
+down_revision = "0009_org_usage"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.add_column("orgs", sa.Column("change_version", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("projects", sa.Column("change_version", sa.BigInteger(), nullable=False, server_default="0"))
+
+def downgrade() -> None:
+    op.drop_column("projects", "change_version")
+    op.drop_column("orgs", "change_version")
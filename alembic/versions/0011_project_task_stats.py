@@ -0,0 +1,111 @@
+"""project_task_stats rollup kept by statement-level triggers on tasks
+
+the backfill counts every task once; on large installs run it in a
+maintenance window (scripts/rebuild_task_stats.py repairs it later).
+
+Revision ID: 0011_project_task_stats
+Revises: 0010_change_versions
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0011_project_task_stats"
+down_revision = "0010_change_versions"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+# one upsert per statement, whatever its row count: the statement's task
+# rows (transition tables) become per (project, assignee) deltas. rows are
+# locked in (project_id, assigned_to) order so concurrent statements queue
+# instead of deadlocking
+_APPLY = """
+create function project_task_stats_apply() returns trigger
+language plpgsql as $$
+declare
+    src text;
+begin
+    src := case tg_op
+        when 'INSERT' then 'select project_id, assigned_to, status, 1 as n from new_rows'
+        when 'DELETE' then 'select project_id, assigned_to, status, -1 as n from old_rows'
+        else 'select project_id, assigned_to, status, -1 as n from old_rows
+              union all select project_id, assigned_to, status, 1 from new_rows'
+    end;
+    execute format($q$
+        insert into project_task_stats as s (project_id, assigned_to, todo, doing, done, last_activity_at)
+        select project_id, assigned_to,
+               coalesce(sum(n) filter (where status = 'todo'), 0),
+               coalesce(sum(n) filter (where status = 'doing'), 0),
+               coalesce(sum(n) filter (where status = 'done'), 0),
+               now()
+        from (%s) d
+        group by project_id, assigned_to
+        order by project_id, assigned_to
+        on conflict (project_id, assigned_to) do update set
+            todo = s.todo + excluded.todo,
+            doing = s.doing + excluded.doing,
+            done = s.done + excluded.done,
+            last_activity_at = excluded.last_activity_at
+    $q$, src);
+    return null;
+end
+$$
+"""
+
+_BACKFILL = """
+insert into project_task_stats (project_id, assigned_to, todo, doing, done, last_activity_at)
+select project_id, assigned_to,
+       count(*) filter (where status = 'todo'),
+       count(*) filter (where status = 'doing'),
+       count(*) filter (where status = 'done'),
+       max(updated_at)
+from tasks
+group by project_id, assigned_to
+"""
+
+def upgrade() -> None:
+    op.create_table(
+        "project_task_stats",
+        sa.Column(
+            "project_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("projects.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        # null: unassigned tasks
+        sa.Column("assigned_to", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("todo", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("doing", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_activity_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    # the upsert's conflict target; postgres 15+ for a nullable column in it
+    op.create_index(
+        "ux_project_task_stats_project_assignee",
+        "project_task_stats",
+        ["project_id", "assigned_to"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    op.execute(_APPLY)
+    for event, tables in (
+        ("insert", "new table as new_rows"),
+        ("update", "old table as old_rows new table as new_rows"),
+        ("delete", "old table as old_rows"),
+    ):
+        op.execute(
+            f"create trigger tasks_stats_{event} after {event} on tasks "
+            f"referencing {tables} for each statement execute function project_task_stats_apply()"
+        )
+    op.execute(_BACKFILL)
+
+def downgrade() -> None:
+    for event in ("insert", "update", "delete"):
+        op.execute(f"drop trigger tasks_stats_{event} on tasks")
+    op.execute("drop function project_task_stats_apply()")
+    op.drop_table("project_task_stats")
@@ -0,0 +1,51 @@
+"""change_seq on tasks and projects, and tombstones, for the change feed
+
+change_seq is the id of the transaction that last wrote the row
+(app.change_feed). existing rows get 0, which a first sync (no since
+token) still returns; new rows default to their transaction's id.
+
+Revision ID: 0012_change_feed
+Revises: 0011_project_task_stats
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0012_change_feed"
+down_revision = "0011_project_task_stats"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+XID = "(pg_current_xact_id()::text)::bigint"
+
+def upgrade() -> None:
+    # constant default first: no table rewrite. the transaction id default
+    # then only applies to new rows
+    for table in ("tasks", "projects"):
+        op.add_column(table, sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default="0"))
+        op.alter_column(table, "change_seq", server_default=sa.text(XID))
+    op.create_table(
+        "tombstones",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("org_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("orgs.id"), nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default=sa.text(XID)),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    # the feed's order within an org
+    op.create_index("ix_tasks_org_change_seq", "tasks", ["org_id", "change_seq", "id"])
+    op.create_index("ix_projects_org_change_seq", "projects", ["org_id", "change_seq", "id"])
+    op.create_index("ix_tombstones_org_change_seq", "tombstones", ["org_id", "change_seq", "id"])
+
+def downgrade() -> None:
+    op.drop_index("ix_tombstones_org_change_seq", table_name="tombstones")
+    op.drop_index("ix_projects_org_change_seq", table_name="projects")
+    op.drop_index("ix_tasks_org_change_seq", table_name="tasks")
+    op.drop_table("tombstones")
+    op.drop_column("projects", "change_seq")
+    op.drop_column("tasks", "change_seq")
@@ -0,0 +1,25 @@
+"""indexes for the stripe webhook's org lookups
+
+Revision ID: 0013_org_stripe_indexes
+Revises: 0012_change_feed
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+
+revision = "0013_org_stripe_indexes"
+down_revision = "0012_change_feed"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    # every webhook event finds its org by customer, then subscription id
+    op.create_index("ix_orgs_stripe_customer_id", "orgs", ["stripe_customer_id"])
+    op.create_index("ix_orgs_stripe_subscription_id", "orgs", ["stripe_subscription_id"])
+
+def downgrade() -> None:
+    op.drop_index("ix_orgs_stripe_subscription_id", table_name="orgs")
+    op.drop_index("ix_orgs_stripe_customer_id", table_name="orgs")
@@ -0,0 +1,33 @@
+"""GET /orgs pages on the user's memberships, not on orgs
+
+the orgs (created_at desc, id desc) index couldn't serve a list that is
+filtered by membership: postgres still had to collect and sort all of the
+user's orgs. the keyset now runs on memberships.
+
+Revision ID: 0014_membership_keyset_index
+Revises: 0013_org_stripe_indexes
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0014_membership_keyset_index"
+down_revision = "0013_org_stripe_indexes"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_memberships_user_created_org",
+        "memberships",
+        ["user_id", sa.text("created_at DESC"), sa.text("org_id DESC")],
+    )
+    op.drop_index("ix_orgs_created_id", table_name="orgs")
+
+def downgrade() -> None:
+    op.create_index("ix_orgs_created_id", "orgs", [sa.text("created_at DESC"), sa.text("id DESC")])
+    op.drop_index("ix_memberships_user_created_org", table_name="memberships")
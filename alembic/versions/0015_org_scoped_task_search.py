@@ -0,0 +1,141 @@
+"""org-scoped lexemes in tasks.search_tsv, plus each org's search words
+
+every lexeme is prefixed with a key derived from the task's org id (same
+positions, so ts_rank_cd is unchanged): the gin index keeps one posting
+list per (org, word), and a search reads the searching org's postings
+instead of every org's. task_search_words lists each org's words, so that
+a search ending mid-word ("fix log") can ask for the words that start with
+it ('login' | 'logout') instead of making the gin index collect a prefix
+match.
+
+recomputing the stored column rewrites the tasks table and rebuilds the gin
+index, and the backfill reads every title; run it in a maintenance window on
+large installs.
+
+Revision ID: 0015_org_scoped_task_search
+Revises: 0014_membership_keyset_index
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0015_org_scoped_task_search"
+down_revision = "0014_membership_keyset_index"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+# the key is 8 hex digits of md5(org id), then the 'simple' lexeme. orgs
+# that share a key only share posting lists; every search is also filtered
+# on org_id. built as tsvector text so positions survive (array_to_tsvector
+# would drop them), with quotes and backslashes escaped for its input syntax
+_TSV = r"""
+create function task_search_tsv(org uuid, title text) returns tsvector
+language sql immutable parallel safe as $$
+    select coalesce(string_agg(
+        format('''%s'':%s',
+               replace(replace(left(md5(org::text), 8) || lexeme, '\', '\\'), '''', ''''''),
+               array_to_string(positions, ',')),
+        ' '), '')::tsvector
+    from unnest(to_tsvector('simple'::regconfig, coalesce(title, '')))
+$$
+"""
+
+# the same key on every quoted lexeme of a tsquery ('fix' & 'log':*);
+# doubled quotes inside a lexeme stay part of it
+_TSQUERY = r"""
+create function task_search_tsquery(org uuid, query tsquery) returns tsquery
+language sql immutable strict parallel safe as $$
+    select regexp_replace(query::text, '''((?:[^'']|'''')*)''', '''' || left(md5(org::text), 8) || '\1''', 'g')::tsquery
+$$
+"""
+
+# new words of the statement's task rows, in (org_id, word) order so that
+# concurrent statements adding the same words queue instead of deadlocking.
+# words are never removed
+_WORDS = """
+create function task_search_words_add() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into task_search_words (org_id, word)
+        select distinct n.org_id, w.lexeme
+        from new_rows n, unnest(to_tsvector('simple'::regconfig, coalesce(n.title, ''))) w
+        order by 1, 2
+        on conflict do nothing;
+    else
+        insert into task_search_words (org_id, word)
+        select distinct n.org_id, w.lexeme
+        from new_rows n
+        join old_rows o on o.id = n.id and (o.title <> n.title or o.org_id <> n.org_id),
+        unnest(to_tsvector('simple'::regconfig, coalesce(n.title, ''))) w
+        order by 1, 2
+        on conflict do nothing;
+    end if;
+    return null;
+end
+$$
+"""
+
+_BACKFILL = """
+insert into task_search_words (org_id, word)
+select distinct t.org_id, w.lexeme
+from tasks t, unnest(to_tsvector('simple'::regconfig, coalesce(t.title, ''))) w
+"""
+
+def _replace_column(expression: str) -> None:
+    op.drop_index("ix_tasks_search_tsv", table_name="tasks")
+    op.drop_column("tasks", "search_tsv")
+    op.add_column(
+        "tasks",
+        sa.Column("search_tsv", postgresql.TSVECTOR(), sa.Computed(expression, persisted=True), nullable=True),
+    )
+    op.create_index(
+        "ix_tasks_search_tsv",
+        "tasks",
+        ["search_tsv"],
+        postgresql_using="gin",
+        postgresql_with={"fastupdate": "off"},
+    )
+
+def upgrade() -> None:
+    op.execute(_TSV)
+    op.execute(_TSQUERY)
+    _replace_column("task_search_tsv(org_id, title)")
+
+    # "C": byte order, so word LIKE 'log%' is a range scan on the primary key
+    op.create_table(
+        "task_search_words",
+        sa.Column(
+            "org_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("orgs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("word", sa.Text(collation="C"), nullable=False),
+        sa.PrimaryKeyConstraint("org_id", "word"),
+    )
+    op.execute(_WORDS)
+    # named to fire after tasks_stats_*: lock order in app.change_version
+    for event, tables in (
+        ("insert", "new table as new_rows"),
+        ("update", "old table as old_rows new table as new_rows"),
+    ):
+        op.execute(
+            f"create trigger tasks_words_{event} after {event} on tasks "
+            f"referencing {tables} for each statement execute function task_search_words_add()"
+        )
+    op.execute(_BACKFILL)
+
+def downgrade() -> None:
+    for event in ("insert", "update"):
+        op.execute(f"drop trigger tasks_words_{event} on tasks")
+    op.execute("drop function task_search_words_add()")
+    op.drop_table("task_search_words")
+    _replace_column("to_tsvector('simple'::regconfig, coalesce(title, ''))")
+    op.execute("drop function task_search_tsquery(uuid, tsquery)")
+    op.execute("drop function task_search_tsv(uuid, text)")
@@ -0,0 +1,32 @@
+"""index stripe events that still need processing
+
+webhooks are applied in the background now (app.billing.stripe_events);
+every app worker lists the events left "received" or "failed" at startup,
+which shouldn't read the whole ledger.
+
+Revision ID: 0016_webhook_event_pending_index
+Revises: 0015_org_scoped_task_search
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0016_webhook_event_pending_index"
+down_revision = "0015_org_scoped_task_search"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_webhook_events_pending",
+        "webhook_events",
+        ["received_at"],
+        postgresql_where=sa.text("status IN ('received', 'failed')"),
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_events_pending", table_name="webhook_events")
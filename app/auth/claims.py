@@ -0,0 +1,73 @@
+"""opt-in membership claims in access tokens.
+
+    "orgs": {"<org id, base64url>": "o" | "a" | "m", ...}
+    "mv":   users.membership_version when the map was built
+
+the map is signed with the rest of the token. it is only trusted while
+"mv" matches the user's current membership version (see
+app.rbac.cache.membership_version), so any membership change makes every
+outstanding map stale at once. users with more than
+jwt_membership_claims_max_orgs memberships get their most recent ones;
+orgs missing from the map are authorized from postgres as before.
+"""
+from __future__ import annotations
+
+import base64
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.enums import Role
+from app.models.membership import Membership
+from app.models.user import User
+
+_ROLE_CODES = {Role.owner: "o", Role.admin: "a", Role.member: "m"}
+_CODE_ROLES = {v: k for k, v in _ROLE_CODES.items()}
+
+def encode_org_id(org_id: uuid.UUID) -> str:
+    # 22 chars instead of 36
+    return base64.urlsafe_b64encode(org_id.bytes).rstrip(b"=").decode("ascii")
+
+def role_from_claims(claims: dict, org_id: uuid.UUID) -> tuple[Role, int] | None:
+    # -> (role, stamp) if the token vouches for this org
+    orgs = claims.get("orgs")
+    stamp = claims.get("mv")
+    if not isinstance(orgs, dict) or not isinstance(stamp, int):
+        return None
+    role = _CODE_ROLES.get(orgs.get(encode_org_id(org_id)))
+    if role is None:
+        return None
+    return role, stamp
+
+async def load_membership_claims(db: AsyncSession, user_id: uuid.UUID) -> dict:
+    cap = settings.jwt_membership_claims_max_orgs
+    q = (
+        select(User.membership_version, Membership.org_id, Membership.role)
+        .select_from(User)
+        .outerjoin(Membership, Membership.user_id == User.id)
+        .where(User.id == user_id)
+        .order_by(Membership.created_at.desc())
+        .limit(cap + 1)
+    )
+    rows = (await db.execute(q)).all()
+    if not rows:
+        return {}
+
+    orgs = {
+        encode_org_id(org_id): _ROLE_CODES[Role(role)]
+        for _, org_id, role in rows[:cap]
+        if org_id is not None
+    }
+    return {"orgs": orgs, "mv": int(rows[0][0])}
+
+async def bump_membership_version(db: AsyncSession, user_id: uuid.UUID) -> int:
+    # call inside the transaction that changes the user's memberships, then
+    # publish the result after commit (app.rbac.cache.publish_membership_version)
+    return await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(membership_version=User.membership_version + 1)
+        .returning(User.membership_version)
+    )
@@ -2,7 +2,7 @@ import uuid
 
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.tokens import decode_access_token
 from app.db import get_db
@@ -10,20 +10,29 @@ from app.models.user import User
 
 bearer = HTTPBearer(auto_error=False)
 
-def get_current_user(
+async def get_token_claims(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> User:
+) -> dict:
+    # token check only, no db (async so it skips the threadpool); callers load
+    # the user themselves
     if creds is None or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="missing bearer token")
 
     try:
         payload = decode_access_token(creds.credentials)
-        user_id = uuid.UUID(payload["sub"])
+        uuid.UUID(payload["sub"])
     except Exception:
         raise HTTPException(status_code=401, detail="invalid token")
+    return payload
+
+async def get_token_user_id(claims: dict = Depends(get_token_claims)) -> uuid.UUID:
+    return uuid.UUID(claims["sub"])
 
-    user = db.get(User, user_id)
+async def get_current_user(
+    user_id: uuid.UUID = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="user not found")
 
@@ -1,7 +1,10 @@
 import hashlib
 import hmac
 import secrets
+import time
 import uuid
+from collections import OrderedDict
+from collections.abc import Callable
 import jwt
 from datetime import datetime, timedelta, timezone
 from app.config import settings
@@ -21,7 +24,7 @@ def hash_magic_token(token: str) -> str:
 def magic_link_expiry() -> datetime:
     return now_utc() + timedelta(minutes=settings.magic_link_expires_minutes)
 
-def issue_access_token(user_id: str | uuid.UUID) -> str:
+def issue_access_token(user_id: str | uuid.UUID, extra_claims: dict | None = None) -> str:
     user_id = str(user_id)
     iat = now_utc()
     exp = iat + timedelta(minutes=settings.jwt_expires_minutes)
@@ -32,9 +35,43 @@ def issue_access_token(user_id: str | uuid.UUID) -> str:
         "iat": int(iat.timestamp()),
         "exp": int(exp.timestamp()),
     }
+    if extra_claims:
+        # e.g. membership claims (app.auth.claims); never override the above
+        payload = {**extra_claims, **payload}
     return jwt.encode(payload, settings.jwt_secret, algorithm="HS256")
 
-def decode_access_token(token: str) -> dict:
+# verified-token cache: sha256(token) -> (exp, claims). clients reuse one
+# token for jwt_expires_minutes, so most requests skip the signature check
+# and claims validation. entries die at the token's own exp.
+_verified: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+_verified_secret: str | None = None
+
+# revocation hooks get the claims on every decode, cached or not; returning
+# True rejects the token
+RevocationHook = Callable[[dict], bool]
+_revocation_hooks: list[RevocationHook] = []
+
+_jwt_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "revoked": 0}
+
+def jwt_cache_stats() -> dict[str, int]:
+    return dict(_jwt_stats, size=len(_verified))
+
+def add_revocation_hook(hook: RevocationHook) -> None:
+    _revocation_hooks.append(hook)
+
+def remove_revocation_hook(hook: RevocationHook) -> None:
+    _revocation_hooks.remove(hook)
+
+def forget_access_token(token: str) -> None:
+    _verified.pop(hashlib.sha256(token.encode("utf-8")).digest(), None)
+
+def forget_subject(sub: str | uuid.UUID) -> None:
+    # drop every cached token for a user (e.g. after revoking their sessions)
+    sub = str(sub)
+    for k in [k for k, (_, claims) in _verified.items() if claims.get("sub") == sub]:
+        del _verified[k]
+
+def _verify(token: str) -> dict:
     return jwt.decode(
         token,
         settings.jwt_secret,
@@ -42,3 +79,52 @@ def decode_access_token(token: str) -> dict:
         audience=settings.jwt_audience,
         issuer=settings.jwt_issuer,
     )
+
+def _copy(value):
+    # claims are decoded json: dicts and lists are the only mutable parts
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+def _check_revoked(claims: dict) -> dict:
+    for hook in _revocation_hooks:
+        if hook(claims):
+            _jwt_stats["revoked"] += 1
+            raise jwt.InvalidTokenError("token revoked")
+    # callers get their own copy, nested maps (membership "orgs") included;
+    # the cached claims stay pristine
+    return _copy(claims)
+
+def decode_access_token(token: str) -> dict:
+    global _verified_secret
+
+    max_entries = settings.jwt_cache_max_entries
+    if max_entries <= 0:
+        return _check_revoked(_verify(token))
+
+    if _verified_secret is not settings.jwt_secret:
+        # secret rotated (or first call): nothing cached was signed with it
+        _verified.clear()
+        _verified_secret = settings.jwt_secret
+
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    hit = _verified.get(digest)
+    if hit is not None:
+        if time.time() < hit[0]:
+            _verified.move_to_end(digest)
+            _jwt_stats["hits"] += 1
+            return _check_revoked(hit[1])
+        # expired: drop it and let jwt.decode raise the proper error
+        del _verified[digest]
+        _jwt_stats["expired"] += 1
+
+    _jwt_stats["misses"] += 1
+    claims = _verify(token)
+    if "exp" in claims:
+        _verified[digest] = (float(claims["exp"]), claims)
+        while len(_verified) > max_entries:
+            _verified.popitem(last=False)
+            _jwt_stats["evictions"] += 1
+    return _check_revoked(claims)
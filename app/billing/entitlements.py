@@ -0,0 +1,210 @@
+"""org -> what it may write: plan, subscription status, period end, limits.
+
+write routes (projects, tasks, invites) make one check_write() call: the
+billing gate, plus the free plan limit when the write creates rows. the
+entitlements are cached two levels deep like the auth context
+(app.rbac.cache): a per-worker LRU with a short ttl in front of a redis
+hash per org (`ent:{org_id}`, fields `d` and a version `v`). the stripe
+webhook calls invalidate() after it commits a plan or status change; a
+loader only writes back if the version it saw before reading postgres is
+still there, so a load racing the webhook can't put the old plan back.
+
+staleness bounds for a change that went through invalidate():
+  - same worker: none
+  - other workers: entitlements_local_ttl_seconds
+  - invalidation lost (redis down at the time): entitlements_cache_ttl_seconds,
+    or the end of the billing period if that comes first
+"""
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.billing import usage
+from app.billing.gates import FREE_MEMBER_LIMIT, FREE_PROJECT_LIMIT, FREE_TASK_LIMIT, enforce_billing_writable
+from app.config import settings
+from app.models.org import Org
+from app.redis_client import Script, get_redis, mark_redis_failed, redis_backing_off
+
+@dataclass(frozen=True, slots=True)
+class Entitlements:
+    plan: str
+    subscription_status: str
+    current_period_end: datetime | None
+    # None = no limit
+    max_projects: int | None
+    max_tasks: int | None
+    max_members: int | None
+
+    def limit(self, kind: str) -> int | None:
+        return getattr(self, f"max_{kind}")
+
+_LIMIT_DETAIL = {
+    "projects": "free_plan_project_limit",
+    "tasks": "free_plan_task_limit",
+    "members": "free_plan_member_limit",
+}
+
+# KEYS[1] = org hash; ARGV = version seen before the load ('' = none),
+# value, hash ttl (s)
+_PUT_LUA = """
+local v = redis.call('HGET', KEYS[1], 'v') or ''
+if v ~= ARGV[1] then
+  return 0
+end
+redis.call('HSET', KEYS[1], 'd', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_put = Script(_PUT_LUA)
+
+_local: OrderedDict[uuid.UUID, tuple[float, Entitlements]] = OrderedDict()
+
+_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0, "stale_writes_skipped": 0}
+
+def stats() -> dict[str, int]:
+    return dict(_stats, l1_size=len(_local))
+
+def _key(org_id: uuid.UUID) -> str:
+    return f"ent:{org_id}"
+
+def for_org(plan: str, subscription_status: str, current_period_end: datetime | None) -> Entitlements:
+    free = plan == "free"
+    return Entitlements(
+        plan=plan,
+        subscription_status=subscription_status,
+        current_period_end=current_period_end,
+        max_projects=FREE_PROJECT_LIMIT if free else None,
+        max_tasks=FREE_TASK_LIMIT if free else None,
+        max_members=FREE_MEMBER_LIMIT if free else None,
+    )
+
+def _expires_at(e: Entitlements) -> float:
+    # wall clock; a period rolling over without a webhook still reloads
+    expires_at = time.time() + settings.entitlements_cache_ttl_seconds
+    if e.current_period_end is not None:
+        expires_at = min(expires_at, max(e.current_period_end.timestamp(), time.time() + 1))
+    return expires_at
+
+def _encode(e: Entitlements, expires_at: float) -> str:
+    period_end = e.current_period_end.isoformat() if e.current_period_end is not None else None
+    return json.dumps(
+        {"p": e.plan, "s": e.subscription_status, "c": period_end, "e": expires_at}, separators=(",", ":")
+    )
+
+def _decode(raw: str) -> tuple[float, Entitlements]:
+    d = json.loads(raw)
+    period_end = datetime.fromisoformat(d["c"]) if d["c"] is not None else None
+    return d["e"], for_org(d["p"], d["s"], period_end)
+
+def _remember(org_id: uuid.UUID, e: Entitlements) -> None:
+    expires_at = min(time.time() + settings.entitlements_local_ttl_seconds, _expires_at(e))
+    _local[org_id] = (expires_at, e)
+    _local.move_to_end(org_id)
+    while len(_local) > settings.entitlements_local_max_entries:
+        _local.popitem(last=False)
+
+def _recall(org_id: uuid.UUID) -> Entitlements | None:
+    hit = _local.get(org_id)
+    if hit is None:
+        return None
+    if time.time() < hit[0]:
+        _local.move_to_end(org_id)
+        _stats["l1_hits"] += 1
+        return hit[1]
+    del _local[org_id]
+    return None
+
+async def _lookup(org_id: uuid.UUID) -> tuple[Entitlements | None, str | None]:
+    # -> (entitlements, version) from redis; version None = redis not consulted
+    if redis_backing_off():
+        return None, None
+    try:
+        raw, version = await get_redis().hmget(_key(org_id), ["d", "v"])
+    except Exception:
+        mark_redis_failed()
+        return None, None
+    if raw is not None:
+        expires_at, e = _decode(raw)
+        if time.time() < expires_at:
+            _stats["l2_hits"] += 1
+            return e, None
+    return None, version or ""
+
+async def _store(org_id: uuid.UUID, e: Entitlements, version: str | None) -> bool:
+    # False when the org was invalidated since `version` was read
+    if version is None or redis_backing_off():
+        return True
+    expires_at = _expires_at(e)
+    try:
+        stored = await _put([_key(org_id)], [version, _encode(e, expires_at), max(1, int(expires_at - time.time()))])
+    except Exception:
+        mark_redis_failed()
+        return True
+    if not int(stored):
+        _stats["stale_writes_skipped"] += 1
+        return False
+    return True
+
+async def get(db: AsyncSession, org_id: uuid.UUID) -> Entitlements:
+    if settings.entitlements_cache_enabled:
+        e = _recall(org_id)
+        if e is not None:
+            return e
+        e, version = await _lookup(org_id)
+        if e is not None:
+            _remember(org_id, e)
+            return e
+    else:
+        version = None
+
+    _stats["misses"] += 1
+    row = (
+        await db.execute(
+            select(Org.plan, Org.subscription_status, Org.current_period_end).where(Org.id == org_id)
+        )
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="org not found")
+    e = for_org(row.plan, row.subscription_status, row.current_period_end)
+    if settings.entitlements_cache_enabled and await _store(org_id, e, version):
+        _remember(org_id, e)
+    return e
+
+async def check_write(db: AsyncSession, org_id: uuid.UUID, kind: str, adding: int = 0) -> Entitlements:
+    """402 unless the org may write `kind` (projects, tasks, members).
+
+    adding > 0 counts that many new rows in org_usage and refuses if it
+    passes the plan's limit; call it right before the insert, in the same
+    transaction (the org's usage row stays locked until commit).
+    """
+    e = await get(db, org_id)
+    enforce_billing_writable(e)
+    if adding and await usage.reserve(db, org_id, kind, adding, e.limit(kind)) is None:
+        raise HTTPException(status_code=402, detail=_LIMIT_DETAIL[kind])
+    return e
+
+async def invalidate(org_id: uuid.UUID) -> None:
+    # call after committing a plan/status change
+    _stats["invalidations"] += 1
+    _local.pop(org_id, None)
+    if redis_backing_off():
+        return
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.hdel(_key(org_id), "d")
+    pipe.hset(_key(org_id), "v", uuid.uuid4().hex)
+    pipe.expire(_key(org_id), max(1, int(settings.entitlements_cache_ttl_seconds)))
+    try:
+        await pipe.execute()
+    except Exception:
+        # entries still expire on their own within entitlements_cache_ttl_seconds
+        mark_redis_failed()
@@ -0,0 +1,399 @@
+"""background stripe event processing.
+
+POST /webhooks/stripe only verifies the signature, records the event in
+webhook_events as "received" (the ledger is also the dedupe: provider +
+event_id is unique) and answers. deliveries that arrive together are
+recorded together, one insert and commit for all of them (record()), so a
+burst costs the database a handful of round trips. each worker then drains
+the queued events
+in the background, webhook_process_batch_size per transaction with a pause
+of webhook_process_pause_seconds between batches, so a burst of deliveries
+is applied over a few seconds instead of taking database round trips and
+cpu from the api's readers all at once.
+
+batches take their rows `FOR UPDATE SKIP LOCKED`, so workers draining at
+the same time never apply an event twice. a batch that fails is applied
+again one event at a time; an event that fails on its own is recorded
+"failed" (with the error) in a session of its own. stripe sending it again
+queues it again.
+
+events a dead worker left "received", and failed ones, are picked up by
+every app worker at startup (resume()) and by scripts/process_webhooks.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.billing import entitlements
+from app.config import settings
+from app.models.enums import Plan, SubscriptionStatus
+from app.models.org import Org
+from app.models.webhook_event import WebhookEvent
+from app.rbac import cache as auth_cache
+
+logger = logging.getLogger(__name__)
+
+# this worker's drain (one at a time); asyncio only keeps weak references
+_running: set[asyncio.Task] = set()
+# set by spawn(): events were queued since the drain last looked
+_more = False
+# deliveries waiting for record()'s writer, and the writer
+_intake: list[tuple[str, str, dict, asyncio.Future]] = []
+_writer: set[asyncio.Task] = set()
+
+_SUBSCRIPTION_EVENTS = {"customer.subscription.updated", "customer.subscription.deleted"}
+_INVOICE_EVENTS = {"invoice.paid", "invoice.payment_failed"}
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _object(ev: WebhookEvent) -> object:
+    return ((ev.payload or {}).get("data") or {}).get("object")  # no `or {}` here
+
+def _metadata_org_id(metadata: object) -> uuid.UUID | None:
+    if not metadata or not isinstance(metadata, dict) or not metadata.get("org_id"):
+        return None
+    try:
+        return uuid.UUID(str(metadata["org_id"]))
+    except Exception:
+        return None
+
+async def _load_orgs(db: AsyncSession, events: list[WebhookEvent]) -> list[Org]:
+    # every org the events could name, in one query: _find_org() matches them
+    # in memory, where they already carry the changes of the batch's earlier
+    # events (an org an event gives a subscription id is found by it after)
+    customers, subs, ids = set(), set(), set()
+    for ev in events:
+        # events _apply() fails or ignores don't need one
+        data = (ev.payload or {}).get("data")
+        obj = data.get("object") if isinstance(data, dict) else None
+        if not isinstance(obj, dict):
+            continue
+        customers.add(obj.get("customer"))
+        subs.add(obj.get("id") if ev.event_type in _SUBSCRIPTION_EVENTS else obj.get("subscription"))
+        ids.add(_metadata_org_id(obj.get("metadata")))
+    customers.discard(None)
+    subs.discard(None)
+    ids.discard(None)
+    if not (customers or subs or ids):
+        return []
+    return list(
+        await db.scalars(
+            select(Org).where(
+                or_(
+                    Org.stripe_customer_id.in_(customers),
+                    Org.stripe_subscription_id.in_(subs),
+                    Org.id.in_(ids),
+                )
+            )
+        )
+    )
+
+def _find_org(orgs: list[Org], customer_id: str | None, sub_id: str | None, metadata: dict | None) -> Org | None:
+    if customer_id:
+        org = next((o for o in orgs if o.stripe_customer_id == customer_id), None)
+        if org:
+            return org
+    if sub_id:
+        org = next((o for o in orgs if o.stripe_subscription_id == sub_id), None)
+        if org:
+            return org
+    org_id = _metadata_org_id(metadata)
+    return next((o for o in orgs if o.id == org_id), None) if org_id else None
+
+def _map_stripe_sub_status(raw: str | None) -> SubscriptionStatus:
+    if raw == "active":
+        return SubscriptionStatus.active
+    if raw == "trialing":
+        return SubscriptionStatus.trialing
+    if raw == "past_due":
+        return SubscriptionStatus.past_due
+    if raw == "unpaid":
+        return SubscriptionStatus.unpaid
+    if raw == "canceled":
+        return SubscriptionStatus.canceled
+    if raw == "incomplete":
+        return SubscriptionStatus.incomplete
+    return SubscriptionStatus.none
+
+def _plan_for_status(st: SubscriptionStatus) -> Plan:
+    return Plan.pro if st in {SubscriptionStatus.active, SubscriptionStatus.trialing, SubscriptionStatus.past_due} else Plan.free
+
+def _billing_state(org: Org) -> tuple:
+    # what cached auth contexts and entitlements are built from
+    return (org.plan, org.subscription_status, org.stripe_subscription_id)
+
+async def _invalidate_if_changed(org: Org, before: tuple) -> None:
+    # stripe sends several events per change (invoice.paid on every renewal):
+    # one that changes nothing leaves the org's readers on their caches
+    if _billing_state(org) != before:
+        await auth_cache.invalidate_org(org.id)
+        await entitlements.invalidate(org.id)
+
+def _apply(orgs: list[Org], ev: WebhookEvent) -> tuple[Org, tuple] | None:
+    # set ev.status and change the org (one of orgs, from _load_orgs()); the
+    # org and its billing state before the change, None if the event was
+    # ignored. caller commits
+    event_type = ev.event_type
+    obj = _object(ev)
+
+    if event_type not in _SUBSCRIPTION_EVENTS | _INVOICE_EVENTS:
+        ev.status = "ignored"
+        return None
+    # validate shape for handlers that expect a dict
+    if not isinstance(obj, dict):
+        raise TypeError("stripe event data.object must be an object")
+
+    customer = obj.get("customer")
+    if not customer:
+        ev.status = "ignored"
+        return None
+
+    sub_id = obj.get("id") if event_type in _SUBSCRIPTION_EVENTS else obj.get("subscription")
+    org = _find_org(orgs, customer, sub_id, obj.get("metadata"))
+    if not org:
+        ev.status = "ignored"
+        return None
+
+    before = _billing_state(org)
+    # if present, associate subscription id
+    org.stripe_subscription_id = sub_id or org.stripe_subscription_id
+    if event_type == "customer.subscription.deleted":
+        org.subscription_status = SubscriptionStatus.canceled
+        org.plan = Plan.free
+    elif event_type == "customer.subscription.updated":
+        sub_status = _map_stripe_sub_status(obj.get("status"))
+        org.subscription_status = sub_status
+        org.plan = _plan_for_status(sub_status)
+    elif event_type == "invoice.paid":
+        org.subscription_status = SubscriptionStatus.active
+        org.plan = Plan.pro
+    else:
+        org.subscription_status = SubscriptionStatus.past_due
+        org.plan = Plan.pro
+
+    ev.status = "processed"
+    return org, before
+
+async def _record_failure(sessions: async_sessionmaker[AsyncSession], row_id: uuid.UUID, e: Exception) -> None:
+    # a fresh session: the one that failed may be unusable, and its rollback
+    # expired the row
+    try:
+        async with sessions() as db:
+            await db.execute(
+                update(WebhookEvent)
+                .where(WebhookEvent.id == row_id, WebhookEvent.status == "received")
+                .values(status="failed", error=f"{type(e).__name__}: {e}"[:1000], processed_at=None)
+            )
+            await db.commit()
+    except Exception:
+        # most likely the database that failed the event; it stays
+        # "received" and the next drain() tries it again
+        logger.exception("stripe event %s: processing failed (%r), recording it failed too", row_id, e)
+
+async def process(row_id: uuid.UUID, sessions: async_sessionmaker[AsyncSession]) -> str:
+    """apply one queued event on its own: "processed", "ignored", "failed",
+    or "busy" if another worker has it (or it is no longer queued)."""
+    try:
+        async with sessions() as db:
+            ev = await db.scalar(
+                select(WebhookEvent)
+                .where(WebhookEvent.id == row_id, WebhookEvent.status == "received")
+                .with_for_update(skip_locked=True)
+            )
+            if ev is None:
+                return "busy"
+            changed = _apply(await _load_orgs(db, [ev]), ev)
+            ev.processed_at, ev.error = _now_utc(), None
+            status = ev.status
+            await db.commit()
+    except Exception as e:
+        logger.exception("stripe event %s: processing failed", row_id)
+        await _record_failure(sessions, row_id, e)
+        return "failed"
+
+    if changed is not None:
+        await _invalidate_if_changed(*changed)
+    return status
+
+async def _drain_batch(sessions: async_sessionmaker[AsyncSession]) -> list[tuple[uuid.UUID, str]]:
+    # up to webhook_process_batch_size queued events in one transaction,
+    # oldest first; (ledger row id, result) for each
+    async with sessions() as db:
+        batch = list(
+            await db.scalars(
+                select(WebhookEvent)
+                .where(WebhookEvent.provider == "stripe", WebhookEvent.status == "received")
+                .order_by(WebhookEvent.received_at)
+                .limit(settings.webhook_process_batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        # read before a rollback can expire them
+        row_ids = [ev.id for ev in batch]
+        try:
+            # per org, its billing state before the batch's first event
+            changed: dict[uuid.UUID, tuple[Org, tuple]] = {}
+            orgs = await _load_orgs(db, batch)
+            for ev in batch:
+                applied = _apply(orgs, ev)
+                if applied is not None:
+                    changed.setdefault(applied[0].id, applied)
+                ev.processed_at, ev.error = _now_utc(), None
+            results = [(ev.id, ev.status) for ev in batch]
+            await db.commit()
+        except Exception:
+            logger.exception("stripe events: batch of %d failed, applying them one at a time", len(row_ids))
+            await db.rollback()
+            changed, results = {}, []
+
+    if row_ids and not results:
+        # one bad event mustn't hold up the rest; process() records it failed
+        results = [(row_id, await process(row_id, sessions)) for row_id in row_ids]
+    for org, before in changed.values():
+        await _invalidate_if_changed(org, before)
+    return results
+
+async def drain(sessions: async_sessionmaker[AsyncSession]) -> list[tuple[uuid.UUID, str]]:
+    """apply queued events a batch at a time, pausing
+    webhook_process_pause_seconds between batches, until none are left
+    (or the rest are locked by another worker's drain)."""
+    global _more
+    results: list[tuple[uuid.UUID, str]] = []
+    while True:
+        _more = False
+        batch = await _drain_batch(sessions)
+        results += batch
+        if not batch and not _more:
+            return results
+        if batch:
+            await asyncio.sleep(settings.webhook_process_pause_seconds)
+
+async def _drain_logged(sessions: async_sessionmaker[AsyncSession]) -> None:
+    try:
+        await drain(sessions)
+    except Exception:
+        # most likely the database; the events stay queued for the next
+        # delivery's drain, resume() or scripts/process_webhooks.py
+        logger.exception("stripe events: drain failed")
+
+def spawn(sessions: async_sessionmaker[AsyncSession]) -> None:
+    # make sure this worker is draining; call after committing a queued event
+    global _more
+    _more = True
+    loop = asyncio.get_running_loop()
+    if any(not t.done() and t.get_loop() is loop for t in _running):
+        return
+    t = asyncio.create_task(_drain_logged(sessions))
+    _running.add(t)
+    t.add_done_callback(_running.discard)
+
+async def _insert(db: AsyncSession, rows: list[tuple[str, str, dict]]) -> dict[str, uuid.UUID]:
+    # a new event (or a failed one sent again) is queued, anything else
+    # already was; the ledger row id of each event queued. caller commits
+    stmt = insert(WebhookEvent).values(
+        [
+            {"provider": "stripe", "event_id": event_id, "event_type": event_type, "status": "received", "payload": payload}
+            for event_id, event_type, payload in rows
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WebhookEvent.provider, WebhookEvent.event_id],
+        set_={
+            "event_type": stmt.excluded.event_type,
+            "payload": stmt.excluded.payload,
+            "status": "received",
+            "error": None,
+        },
+        where=WebhookEvent.status == "failed",
+    ).returning(WebhookEvent.event_id, WebhookEvent.id)
+    return {event_id: row_id for event_id, row_id in await db.execute(stmt)}
+
+def _settle(fut: asyncio.Future, result: uuid.UUID | None = None, error: Exception | None = None) -> None:
+    # the delivery may have gone (client disconnected) and cancelled it
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+async def _write(sessions: async_sessionmaker[AsyncSession]) -> None:
+    # record whatever deliveries are waiting, all of them in one statement
+    # and commit, until none are; the webhook rate limit caps how many wait
+    while _intake:
+        pending = _intake[:]
+        del _intake[:]
+        # one row per event: ON CONFLICT can't touch a row twice in one
+        # statement, and a repeat delivery is a duplicate of the first
+        first: dict[str, tuple[str, str, dict]] = {}
+        for event_id, event_type, payload, _ in pending:
+            first.setdefault(event_id, (event_id, event_type, payload))
+        try:
+            async with sessions() as db:
+                queued = await _insert(db, list(first.values()))
+                await db.commit()
+        except Exception as e:
+            if len(first) == 1:
+                for *_, fut in pending:
+                    _settle(fut, error=e)
+                continue
+            # one bad delivery mustn't fail the others: each on its own
+            logger.exception("stripe events: recording %d deliveries failed, recording them one at a time", len(first))
+            queued, errors = {}, {}
+            for row in first.values():
+                try:
+                    async with sessions() as db:
+                        queued.update(await _insert(db, [row]))
+                        await db.commit()
+                except Exception as err:
+                    errors[row[0]] = err
+            for event_id, _, _, fut in pending:
+                if event_id in errors:
+                    _settle(fut, error=errors[event_id])
+        seen: set[str] = set()
+        for event_id, _, _, fut in pending:
+            # the first delivery of an event gets its row, repeats are duplicates
+            _settle(fut, queued.get(event_id) if event_id not in seen else None)
+            seen.add(event_id)
+        if queued:
+            spawn(sessions)
+
+async def record(sessions: async_sessionmaker[AsyncSession], event_id: str, event_type: str, payload: dict) -> uuid.UUID | None:
+    """queue a delivered event: its ledger row id, None if it was already
+    queued or applied (a duplicate delivery). starts the drain."""
+    fut = asyncio.get_running_loop().create_future()
+    _intake.append((event_id, event_type, payload, fut))
+    loop = asyncio.get_running_loop()
+    if not any(not t.done() and t.get_loop() is loop for t in _writer):
+        t = asyncio.create_task(_write(sessions))
+        _writer.add(t)
+        t.add_done_callback(_writer.discard)
+    return await fut
+
+async def requeue_failed(db: AsyncSession) -> int:
+    # failed events back in the queue; caller commits
+    return (
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.provider == "stripe", WebhookEvent.status == "failed")
+            .values(status="received")
+        )
+    ).rowcount
+
+async def resume(sessions: async_sessionmaker[AsyncSession]) -> int:
+    # app startup: retry failed events and drain whatever is queued, events
+    # a worker that died left behind included; the row locks keep workers
+    # that all do this from applying an event twice
+    async with sessions() as db:
+        requeued = await requeue_failed(db)
+        await db.commit()
+    spawn(sessions)
+    return requeued
@@ -0,0 +1,99 @@
+"""per-org usage counters (org_usage) behind the free plan limits.
+
+every create and delete of a project, task or membership moves the org's
+counter in the same transaction as the row change. a limit check is then
+one conditional `UPDATE ... RETURNING` on one row instead of a count(*)
+over the org: an increment that would pass the limit matches nothing, and
+the row lock (held to commit) makes concurrent creates in the org take
+turns, so two requests can't both take the last slot.
+
+take the counter as late as possible in the transaction; everything after
+it runs with the org's creates queued behind it.
+
+reconcile_org() recounts from the tables and repairs drift (writes that
+bypassed the api, bugs); scripts/reconcile_usage.py runs it for every org.
+an org without a row is reconciled on first use.
+"""
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.membership import Membership
+from app.models.org_usage import OrgUsage
+from app.models.project import Project
+from app.models.task import Task
+
+KINDS = ("projects", "tasks", "members")
+
+async def reserve(
+    db: AsyncSession, org_id: uuid.UUID, kind: str, adding: int = 1, limit: int | None = None
+) -> int | None:
+    """count `adding` new rows of `kind`; the new total, or None (nothing
+    counted) if it would pass `limit`."""
+    col = getattr(OrgUsage, kind)
+    stmt = update(OrgUsage).where(OrgUsage.org_id == org_id)
+    if limit is not None:
+        stmt = stmt.where(col + adding <= limit)
+    stmt = stmt.values({col: col + adding}).returning(col).execution_options(synchronize_session=False)
+
+    n = await db.scalar(stmt)
+    if n is None and not await db.scalar(select(OrgUsage.org_id).where(OrgUsage.org_id == org_id)):
+        await reconcile_org(db, org_id)
+        n = await db.scalar(stmt)
+    return n
+
+async def release(db: AsyncSession, org_id: uuid.UUID, kind: str, n: int = 1) -> None:
+    # uncount deleted rows
+    col = getattr(OrgUsage, kind)
+    await db.execute(
+        update(OrgUsage)
+        .where(OrgUsage.org_id == org_id)
+        .values({col: func.greatest(col - n, 0)})
+        .execution_options(synchronize_session=False)
+    )
+
+def _actual(org_id: uuid.UUID) -> dict:
+    # what the counters count (the 0009 backfill uses the same definitions)
+    return {
+        "projects": select(func.count())
+        .select_from(Project)
+        .where(Project.org_id == org_id, Project.deleting_at.is_(None))
+        .scalar_subquery(),
+        # tasks of a project being deleted count until the purge removes them
+        "tasks": select(func.count()).select_from(Task).where(Task.org_id == org_id).scalar_subquery(),
+        "members": select(func.count())
+        .select_from(Membership)
+        .where(Membership.org_id == org_id)
+        .scalar_subquery(),
+    }
+
+async def reconcile_org(db: AsyncSession, org_id: uuid.UUID) -> dict[str, tuple[int, int]]:
+    """recount the org's usage and fix the row; {kind: (stored, actual)} for
+    the counters that were off. caller commits."""
+    await db.execute(insert(OrgUsage).values(org_id=org_id).on_conflict_do_nothing())
+    # lock first: creates in flight commit (or roll back) before we count,
+    # and new ones wait for us
+    stored = (
+        await db.execute(
+            select(OrgUsage.projects, OrgUsage.tasks, OrgUsage.members)
+            .where(OrgUsage.org_id == org_id)
+            .with_for_update()
+        )
+    ).one()
+    actual = (await db.execute(select(*(v.label(k) for k, v in _actual(org_id).items())))).one()
+
+    drift = {
+        k: (getattr(stored, k), getattr(actual, k)) for k in KINDS if getattr(stored, k) != getattr(actual, k)
+    }
+    if drift:
+        await db.execute(
+            update(OrgUsage)
+            .where(OrgUsage.org_id == org_id)
+            .values({k: a for k, (_, a) in drift.items()})
+            .execution_options(synchronize_session=False)
+        )
+    return drift
@@ -0,0 +1,183 @@
+"""incremental change feed for client sync (GET /orgs/{org_id}/changes).
+
+every write stamps the rows it inserts or updates with its transaction's
+id (`change_seq` on tasks and projects, app.change_version.CHANGE_SEQ),
+and a delete leaves a tombstone with one. a client keeps the token of the
+last change it applied and asks for what came after: a range scan on the
+(org_id, change_seq, id) indexes, so catching up costs the handful of rows
+that changed, not the org's task count.
+
+a row carries only its latest change, so the feed is the current state of
+everything that changed, not a log: clients upsert by id. deleting a
+project leaves one tombstone for the project, which stands for its tasks.
+
+transaction ids are handed out when a write starts, not when it commits,
+so a page only goes up to its snapshot's xmin: every transaction below it
+has finished, and anything still running (or committed while the page was
+read) is at or above it, for the next poll. writers take no lock for this.
+the cost is lag, not loss: while any write transaction runs (a long
+import, anywhere in the database), feeds hold at its id until it ends.
+the page is read in one statement, so rows and horizon share a snapshot.
+
+the token is base64url of "<seq>|<rank>|<id>" of the last change on the
+page; within a transaction, projects (rank 0) come before tasks (1) and
+tombstones (2).
+"""
+from __future__ import annotations
+
+import base64
+import functools
+import uuid
+from operator import itemgetter
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Text,
+    bindparam,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.project import Project
+from app.models.task import Task
+from app.models.tombstone import Tombstone
+from app.project_deletion import live_tasks
+
+PROJECT_FIELDS = ("id", "org_id", "name")
+TASK_FIELDS = ("id", "org_id", "project_id", "title", "status", "created_by", "assigned_to")
+
+# where a client that has nothing starts: every row, including ones written
+# before change_seq existed (0)
+START = (-1, 0, uuid.UUID(int=0))
+
+def encode_token(seq: int, rank: int, id_: uuid.UUID) -> str:
+    raw = f"{seq}|{rank}|{id_}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_token(token: str) -> tuple[int, int, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        seq, rank, id_ = raw.split("|", 2)
+        return int(seq), int(rank), uuid.UUID(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid since token")
+
+# the oldest transaction this statement's snapshot still sees running
+_HORIZON = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+def _after(rank: int, seq_col, id_col, pos_rank: int) -> ColumnElement[bool]:
+    # (change_seq, rank, id) > (:seq, pos_rank, :id), for a branch whose rank is fixed
+    if rank < pos_rank:
+        return seq_col > bindparam("seq")
+    if rank > pos_rank:
+        return seq_col >= bindparam("seq")
+    return tuple_(seq_col, id_col) > tuple_(bindparam("seq"), bindparam("id"))
+
+_COLUMNS = ("rank", "seq", "type", "id", "org_id", "project_id", "name", "title", "status", "created_by", "assigned_to")
+
+# columns some kinds don't have, typed for their nulls: a bare null in a
+# subquery is text, which won't union with uuid
+_OPTIONAL = {
+    "project_id": Task.project_id,
+    "name": Project.name,
+    "title": Task.title,
+    "status": Task.status,
+    "created_by": Task.created_by,
+    "assigned_to": Task.assigned_to,
+}
+
+# a row's data fields, by position
+_DATA = {
+    0: (PROJECT_FIELDS, itemgetter(*(_COLUMNS.index(f) for f in PROJECT_FIELDS))),
+    1: (TASK_FIELDS, itemgetter(*(_COLUMNS.index(f) for f in TASK_FIELDS))),
+}
+
+def _branch(**cols):
+    # one kind's select, with the union's columns in order
+    return select(*((cols[c] if c in cols else cast(null(), _OPTIONAL[c].type)).label(c) for c in _COLUMNS))
+
+@functools.cache
+def _statement(pos_rank: int):
+    # one per rank of the position, built once: the union's column
+    # bookkeeping costs more than the query itself
+    projects = _branch(
+        rank=literal(0),
+        seq=Project.change_seq,
+        type=literal("project"),
+        id=Project.id,
+        org_id=Project.org_id,
+        name=Project.name,
+    ).where(
+        Project.org_id == bindparam("org_id"),
+        Project.deleting_at.is_(None),
+        _after(0, Project.change_seq, Project.id, pos_rank),
+        Project.change_seq < _HORIZON,
+    )
+    tasks = _branch(
+        rank=literal(1),
+        seq=Task.change_seq,
+        type=literal("task"),
+        **{c: getattr(Task, c) for c in TASK_FIELDS},
+    ).where(
+        Task.org_id == bindparam("org_id"),
+        live_tasks(bindparam("org_id")),
+        _after(1, Task.change_seq, Task.id, pos_rank),
+        Task.change_seq < _HORIZON,
+    )
+    tombstones = _branch(
+        rank=literal(2),
+        seq=Tombstone.change_seq,
+        type=Tombstone.kind,
+        id=Tombstone.id,
+        org_id=Tombstone.org_id,
+    ).where(
+        Tombstone.org_id == bindparam("org_id"),
+        _after(2, Tombstone.change_seq, Tombstone.id, pos_rank),
+        Tombstone.change_seq < _HORIZON,
+    )
+    # each side walks its own index in feed order and stops after n rows
+    u = union_all(
+        *(
+            q.order_by(seq_col, id_col).limit(bindparam("n")).subquery().select()
+            for q, seq_col, id_col in (
+                (projects, Project.change_seq, Project.id),
+                (tasks, Task.change_seq, Task.id),
+                (tombstones, Tombstone.change_seq, Tombstone.id),
+            )
+        )
+    ).subquery()
+    return select(u).order_by(u.c.seq, u.c.rank, u.c.id).limit(bindparam("n"))
+
+def _change(r) -> dict:
+    rank, seq, type_, id_ = r[:4]
+    if rank == 2:
+        return {"seq": seq, "type": type_, "op": "delete", "id": id_, "data": None}
+    fields, values = _DATA[rank]
+    return {"seq": seq, "type": type_, "op": "upsert", "id": id_, "data": dict(zip(fields, values(r)))}
+
+async def page(
+    db: AsyncSession, org_id: uuid.UUID, since: str | None, limit: int
+) -> tuple[list[dict], str, bool]:
+    """changes after `since` (from the start if None), oldest first: the
+    changes, the token to ask from next time, whether there are more now."""
+    seq, rank, id_ = decode_token(since) if since else START
+    rows = (
+        await db.execute(_statement(rank), {"org_id": org_id, "seq": seq, "id": id_, "n": limit + 1})
+    ).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        last = rows[-1]
+        token = encode_token(last.seq, last.rank, last.id)
+    else:
+        # nothing new: same position
+        token = since or encode_token(*START)
+    return [_change(r) for r in rows], token, more
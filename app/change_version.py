@@ -0,0 +1,88 @@
+"""per-org and per-project change versions, for conditional GETs, and
+the change feed's row stamp.
+
+every project or task write bumps `orgs.change_version` and the
+`projects.change_version` of each project it touches, in the write's own
+transaction. list endpoints turn the version into a strong ETag, and a
+request whose If-None-Match still matches gets a 304 after one primary
+key lookup, before the list query runs.
+
+the version is read before the list, in its own statement: a write that
+commits in between can only make the response newer than its ETag, which
+costs the client one more full response, never a stale 304.
+
+bump() last in the transaction, after any usage counter and task writes:
+the org row stays locked from there to commit, so an org's writes only
+take turns for their commit, however long they ran before. lock order is
+org_usage, then project_task_stats, then task_search_words (new words
+only), then projects (sorted), then orgs.
+
+rows a write inserts or updates get CHANGE_SEQ, the writing transaction's
+id (`change_seq`, app.change_feed). it takes no lock: the feed orders by
+it and stops below the oldest transaction still running.
+"""
+from __future__ import annotations
+
+import hashlib
+import uuid
+from collections.abc import Iterable
+
+from fastapi import Request, Response
+from sqlalchemy import BigInteger, Text, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.org import Org
+from app.models.project import Project
+
+# the writing transaction's id, as a bigint (xid8 has no cast to it)
+CHANGE_SEQ = cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+async def bump(db: AsyncSession, org_id: uuid.UUID, project_ids: Iterable[uuid.UUID] = ()) -> int:
+    """mark the org (and projects) changed; the org's new version."""
+    ids = sorted(set(project_ids))
+    if ids:
+        await db.execute(
+            update(Project)
+            .where(Project.id.in_(ids))
+            .values(change_version=Project.change_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    return await db.scalar(
+        update(Org)
+        .where(Org.id == org_id)
+        .values(change_version=Org.change_version + 1)
+        .returning(Org.change_version)
+        .execution_options(synchronize_session=False)
+    )
+
+async def of_org(db: AsyncSession, org_id: uuid.UUID) -> int:
+    return await db.scalar(select(Org.change_version).where(Org.id == org_id)) or 0
+
+async def of_project(db: AsyncSession, project_id: uuid.UUID) -> int:
+    return await db.scalar(select(Project.change_version).where(Project.id == project_id)) or 0
+
+def etag(request: Request, version: int) -> str:
+    # same version, different page or filters: different representation
+    query = hashlib.blake2b(request.url.query.encode(), digest_size=6).hexdigest()
+    return f'"{version}-{query}"'
+
+def not_modified(request: Request, tag: str, response: Response) -> Response | None:
+    """the 304 to send if If-None-Match has `tag`, else None. either way
+    the route's `response` gets the ETag; the 304 carries its headers."""
+    response.headers.update(headers(tag))
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    # weak comparison (rfc 9110 13.1.2)
+    candidates = {t.strip() for t in header.split(",")}
+    if f"W/{tag}" in candidates and tag not in candidates:
+        # the client's copy came compressed (app.compression), under the
+        # weak form: the 304 confirms that validator, not a different one
+        return Response(status_code=304, headers=dict(response.headers) | {"etag": f"W/{tag}"})
+    if tag not in candidates and "*" not in candidates:
+        return None
+    return Response(status_code=304, headers=dict(response.headers))
+
+def headers(tag: str) -> dict[str, str]:
+    # clients keep the list but ask again every time
+    return {"etag": tag, "cache-control": "private, no-cache"}
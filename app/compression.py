@@ -0,0 +1,163 @@
+"""negotiated response compression (gzip, br, zstd).
+
+an ASGI middleware (app.main): picks the client's best Accept-Encoding
+among compression_encodings, in that order on ties. br and zstd need the
+optional `brotli` / `zstandard` packages; without them only gzip is
+offered.
+
+a complete body under compression_min_size goes out as is. a streamed
+body (the task export) is compressed chunk by chunk, each one flushed, so
+the client still gets rows as they are read. only text-like types are
+touched: json, ndjson, csv and text, and all of them carry Vary:
+Accept-Encoding whether compressed or not. compressing changes the bytes,
+so a strong ETag becomes weak; If-None-Match compares weakly
+(app.change_version), still matches, and the 304 carries the weak form.
+"""
+from __future__ import annotations
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+class _Gzip:
+    def __init__(self) -> None:
+        # wbits 31: gzip container
+        self._c = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+class _Brotli:
+    def __init__(self) -> None:
+        self._c = brotli.Compressor(quality=settings.compression_brotli_quality)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if last else self._c.flush())
+
+class _Zstd:
+    def __init__(self) -> None:
+        self._c = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._c.compress(data)
+        return out + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if last else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+ENCODERS = {"gzip": _Gzip}
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _Zstd
+
+def negotiate(accept_encoding: str) -> str | None:
+    """the encoding to answer with, or None for identity."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.strip().split(";")
+        q = 1.0
+        for p in params:
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for enc in settings.compression_encodings.split(","):
+        enc = enc.strip()
+        if enc not in ENCODERS:
+            continue
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await _Responder(self.app, encoding)(scope, receive, send)
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: str | None) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.send: Send
+        self.start: Message | None = None
+        self.encoder = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # held until the first body chunk says how big the body is
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not _compressible(start["status"], headers):
+                await self.send(start)
+                await self.send(message)
+                return
+            # compressed or not, the body depends on Accept-Encoding: a shared
+            # cache must not hand this identity response to a gzip client or
+            # the other way round
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None or (not more and len(body) < settings.compression_min_size):
+                await self.send(start)
+                await self.send(message)
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            headers["content-encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                headers["etag"] = f"W/{etag}"
+            body = self.encoder.chunk(body, not more)
+            if more:
+                del headers["content-length"]
+            else:
+                headers["content-length"] = str(len(body))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more})
+            return
+
+        if self.encoder is not None:
+            body = self.encoder.chunk(body, not more)
+            message = {"type": "http.response.body", "body": body, "more_body": more}
+        await self.send(message)
+
+def _compressible(status: int, headers: MutableHeaders) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(_TYPES)
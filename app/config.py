@@ -11,20 +11,106 @@ class Settings(BaseSettings):
     database_url: str = "postgresql+psycopg://app:app@db:5432/app"
     redis_url: str = "redis://redis:6379/0"
 
+    # async db pool (per worker)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+
     jwt_secret: str = "dev-secret-change-me"
     jwt_issuer: str = "mt-saas-api"
     jwt_audience: str = "mt-saas-api"
     jwt_expires_minutes: int = 60
+    # verified tokens kept per worker (0 = verify every request)
+    jwt_cache_max_entries: int = 10000
+    # opt-in org_id -> role map in access tokens (app.auth.claims)
+    jwt_membership_claims_enabled: bool = True
+    jwt_membership_claims_max_orgs: int = 50
 
     magic_link_expires_minutes: int = 15
     magic_link_pepper: str = "dev-pepper-change-me"
 
     STRIPE_WEBHOOK_SECRET: str | None = None
-    
+    # stripe events are applied in the background (app.billing.stripe_events),
+    # this many per transaction with a pause between batches: a burst is
+    # applied over a few seconds instead of taking cpu from the api's readers
+    webhook_process_batch_size: int = 10
+    webhook_process_pause_seconds: float = 0.2
+    # redis client (async, one pool per worker)
+    redis_max_connections: int = 50
+    redis_pool_timeout_seconds: float = 0.5
+    redis_socket_timeout_seconds: float = 0.25
+    redis_connect_timeout_seconds: float = 0.25
+    # after a redis error, skip redis (fail open) for this long
+    redis_failure_backoff_seconds: float = 2.0
+
     # rate limiting (redis)
     rate_limit_enabled: bool = True
     rate_limit_auth_request_link_per_min: int = 20
     rate_limit_auth_redeem_per_min: int = 30
     rate_limit_webhooks_per_min: int = 60
+    # two-tier limiting: tokens leased from redis per round trip (0 = off),
+    # how long a worker may sit on a lease, and how many keys it tracks
+    rate_limit_lease_chunk: int = 10
+    rate_limit_lease_ttl_seconds: float = 1.0
+    rate_limit_lease_max_keys: int = 10000
+
+    # per-org request budgets on org-scoped routes, by plan (per minute)
+    tenant_quota_enabled: bool = True
+    tenant_quota_free_read_per_min: int = 1200
+    tenant_quota_free_write_per_min: int = 300
+    tenant_quota_pro_read_per_min: int = 12000
+    tenant_quota_pro_write_per_min: int = 6000
+
+    # auth-context cache, (user, org) -> role/plan/status: per-worker LRU in
+    # front of redis. writers invalidate explicitly; the ttls bound staleness
+    # on other workers (local) and when an invalidation is lost (redis)
+    auth_cache_enabled: bool = True
+    auth_cache_ttl_seconds: float = 30.0
+    auth_cache_local_ttl_seconds: float = 1.0
+    auth_cache_local_max_entries: int = 10000
+
+    # billing entitlements (app.billing.entitlements), org -> plan/status/
+    # limits for write checks: per-worker LRU in front of redis, dropped by the
+    # stripe webhook; same staleness rules as the auth-context cache
+    entitlements_cache_enabled: bool = True
+    entitlements_cache_ttl_seconds: float = 300.0
+    entitlements_local_ttl_seconds: float = 5.0
+    entitlements_local_max_entries: int = 10000
+
+    # task search ranks at most this many of the newest matches; broad terms
+    # would otherwise rank (and fetch) a sizeable share of the org per request
+    task_search_max_candidates: int = 1000
+
+    # tasks per POST .../tasks:batch; up to 1000 (sqlalchemy's insertmanyvalues
+    # page size) they go out as a single INSERT
+    task_batch_max_items: int = 500
+
+    # rows per server-side cursor fetch (and per response chunk) in the
+    # streaming task export; its memory is about one batch
+    task_export_batch_size: int = 1000
+
+    # bulk import: records parsed and validated per step before they are
+    # copied into the staging table
+    task_import_chunk_size: int = 5000
+    # how long an http import's progress stays readable after its last update
+    task_import_status_ttl_seconds: float = 3600.0
+
+    # response compression (app.compression): encodings in server preference
+    # order (br and zstd need the "compression" extra, which the docker image
+    # installs; without it they're left out),
+    # bodies smaller than this go out as is
+    compression_enabled: bool = True
+    compression_encodings: str = "zstd,br,gzip"
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    # background project delete (app.project_deletion): tasks purged per
+    # short transaction, pause between batches, how long a purger's claim
+    # lasts, how many backed-off retries it gives tasks a writer has locked
+    project_purge_batch_size: int = 1000
+    project_purge_pause_seconds: float = 0.01
+    project_purge_lease_seconds: float = 60.0
+    project_purge_max_retries: int = 10
 
 settings = Settings()
@@ -1,7 +1,8 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.config import settings
@@ -9,21 +10,37 @@ from app.config import settings
 class Base(DeclarativeBase):
     pass
 
+# sync path: scripts (seed/demo) and alembic
 engine = create_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+# async path: request handlers (psycopg3 async driver, same url)
+async_engine = create_async_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    # keep loaded attributes usable after commit (no implicit lazy io)
+    expire_on_commit=False,
+)
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    # for work that outlives the request's session (background jobs)
+    return AsyncSessionLocal
 
 # db connectivity check
-def db_ping() -> bool:
+async def db_ping() -> bool:
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         return True
     except SQLAlchemyError:
         return False
@@ -1,19 +1,53 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy.exc import OperationalError
 
+from app import project_deletion
+from app.billing import stripe_events
+from app.compression import CompressionMiddleware
+from app.db import async_engine, get_sessionmaker
+from app.redis_client import close_redis, init_redis
 from app.routes.auth import router as auth_router
+from app.routes.changes import router as changes_router
 from app.routes.health import router as health_router
 from app.routes.orgs import router as orgs_router
 from app.routes.projects import router as projects_router
 from app.routes.tasks import router as tasks_router
 from app.routes.webhooks import router as webhooks_router
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_redis()
+    # finish project deletions and stripe events a dead or failed worker
+    # left behind (app.project_deletion, app.billing.stripe_events); the
+    # database being unreachable mustn't stop startup, scripts/purge_projects.py
+    # and scripts/process_webhooks.py catch up then. anything else (a missing
+    # migration, bad sql) fails startup
+    sessions = app.dependency_overrides.get(get_sessionmaker, get_sessionmaker)()
+    try:
+        await project_deletion.resume(sessions)
+        await stripe_events.resume(sessions)
+    except OperationalError:
+        logger.exception("could not resume background work at startup")
+    try:
+        yield
+    finally:
+        await close_redis()
+        await async_engine.dispose()
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="mt-saas-api", version="0.1.0")
+    app = FastAPI(title="mt-saas-api", version="0.1.0", lifespan=lifespan)
+    app.add_middleware(CompressionMiddleware)
     app.include_router(health_router)
     app.include_router(auth_router)
     app.include_router(orgs_router)
     app.include_router(projects_router)
     app.include_router(tasks_router)
+    app.include_router(changes_router)
     app.include_router(webhooks_router)
     return app
 
@@ -1,9 +1,14 @@
 from app.models.auth_magic_link import AuthMagicLink
 from app.models.membership import Membership
 from app.models.org import Org
+from app.models.org_usage import OrgUsage
 from app.models.project import Project
+from app.models.project_deletion import ProjectDeletion
+from app.models.project_task_stats import ProjectTaskStats
 from app.models.task import Task
+from app.models.task_search_word import TaskSearchWord
+from app.models.tombstone import Tombstone
 from app.models.user import User
 from app.models.webhook_event import WebhookEvent
 
-__all__ = ["User", "Org", "Membership", "Project", "Task", "AuthMagicLink"]
+__all__ = ["User", "Org", "OrgUsage", "Membership", "Project", "ProjectDeletion", "ProjectTaskStats", "Task", "TaskSearchWord", "Tombstone", "AuthMagicLink"]
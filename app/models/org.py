@@ -48,3 +48,10 @@ class Org(Base):
         sa.DateTime(timezone=True),
         nullable=True,
     )
+
+    # bumped by every project/task write in the org (app.change_version)
+    change_version: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default="0")
+
+# webhook lookups (app.routes.webhooks._find_org)
+sa.Index("ix_orgs_stripe_customer_id", Org.stripe_customer_id)
+sa.Index("ix_orgs_stripe_subscription_id", Org.stripe_subscription_id)
@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class OrgUsage(Base):
+    # per-org row counts behind the free plan limits (app.billing.usage)
+    __tablename__ = "org_usage"
+
+    org_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("orgs.id", ondelete="CASCADE"), primary_key=True
+    )
+    # live projects (not being deleted), all tasks (until purged), memberships
+    projects: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    tasks: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    members: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
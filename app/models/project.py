@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -20,3 +20,22 @@ class Project(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    # set when a delete was requested: hidden from the api from then on while
+    # app.project_deletion purges its tasks, then the row goes too
+    deleting_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # bumped by every write to the project or its tasks (app.change_version)
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+    # id of the transaction that last wrote the project row itself
+    # (app.change_feed)
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text)::bigint")
+    )
+
+# keyset pagination (app.pagination)
+Index("ix_projects_org_created_id", Project.org_id, Project.created_at.desc(), Project.id.desc())
+
+# projects being deleted (app.project_deletion)
+Index("ix_projects_org_deleting", Project.org_id, postgresql_where=text("deleting_at IS NOT NULL"))
+
+# change feed (app.change_feed)
+Index("ix_projects_org_change_seq", Project.org_id, Project.change_seq, Project.id)
@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class ProjectTaskStats(Base):
+    # task counts per (project, assignee) by status (app.project_stats); kept
+    # by statement-level triggers on tasks (migration 0011), never by the orm
+    __tablename__ = "project_task_stats"
+
+    project_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    # null: unassigned tasks
+    assigned_to: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+
+    todo: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    doing: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    done: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    # last task write in the group (insert, update or delete)
+    last_activity_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    # no table primary key (assigned_to is nullable); the unique index below is
+    # the row identity
+    __mapper_args__ = {"primary_key": [project_id, assigned_to]}
+
+Index(
+    "ux_project_task_stats_project_assignee",
+    ProjectTaskStats.project_id,
+    ProjectTaskStats.assigned_to,
+    unique=True,
+    postgresql_nulls_not_distinct=True,
+)
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Computed, DateTime, Enum, ForeignKey, Index, String, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -21,6 +21,11 @@ class Task(Base):
     )
 
     title: Mapped[str] = mapped_column(String(300), nullable=False)
+    # maintained by postgres, lexemes keyed by org (migration 0015); deferred
+    # so plain task loads don't drag it along
+    search_tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("task_search_tsv(org_id, title)", persisted=True), deferred=True
+    )
     status: Mapped[TaskStatus] = mapped_column(
         Enum(TaskStatus, name="task_status"), nullable=False, default=TaskStatus.todo
     )
@@ -39,3 +44,40 @@ class Task(Base):
         onupdate=func.now(),
         nullable=False,
     )
+    # id of the transaction that last wrote the task (app.change_feed);
+    # updates set it with app.change_version.CHANGE_SEQ
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text)::bigint")
+    )
+
+# keyset pagination (app.pagination)
+Index("ix_tasks_org_project_created_id", Task.org_id, Task.project_id, Task.created_at.desc(), Task.id.desc())
+
+# list filters (app.task_filters)
+Index(
+    "ix_tasks_project_status_created",
+    Task.org_id, Task.project_id, Task.status, Task.created_at.desc(), Task.id.desc(),
+)
+Index(
+    "ix_tasks_project_assignee_open",
+    Task.org_id, Task.project_id, Task.assigned_to, Task.created_at.desc(), Task.id.desc(),
+    postgresql_where=text("status IN ('todo', 'doing')"),
+)
+Index(
+    "ix_tasks_project_assignee_created",
+    Task.org_id, Task.project_id, Task.assigned_to, Task.created_at.desc(), Task.id.desc(),
+    postgresql_where=text("assigned_to IS NOT NULL"),
+)
+Index(
+    "ix_tasks_project_creator_created",
+    Task.org_id, Task.project_id, Task.created_by, Task.created_at.desc(), Task.id.desc(),
+)
+Index("ix_tasks_project_updated", Task.org_id, Task.project_id, Task.updated_at)
+
+# title search (app.task_search): the gin index finds selective terms within
+# the org, the org-wide recency index bounds broad ones
+Index("ix_tasks_search_tsv", Task.search_tsv, postgresql_using="gin", postgresql_with={"fastupdate": "off"})
+Index("ix_tasks_org_created_id", Task.org_id, Task.created_at.desc(), Task.id.desc())
+
+# change feed (app.change_feed)
+Index("ix_tasks_org_change_seq", Task.org_id, Task.change_seq, Task.id)
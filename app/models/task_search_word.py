@@ -0,0 +1,20 @@
+import uuid
+
+from sqlalchemy import ForeignKey, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class TaskSearchWord(Base):
+    # the words ('simple' lexemes) of an org's task titles, to expand a
+    # search's prefix term (app.task_search); kept by statement-level triggers
+    # on tasks (migration 0015), never by the orm. never removed either: a
+    # word no task uses any more just matches nothing
+    __tablename__ = "task_search_words"
+
+    org_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("orgs.id", ondelete="CASCADE"), primary_key=True
+    )
+    # "C": byte order, so word LIKE 'log%' is a range scan on the primary key
+    word: Mapped[str] = mapped_column(Text(collation="C"), primary_key=True)
@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class Tombstone(Base):
+    # a deleted task or project, for the change feed (app.change_feed)
+    __tablename__ = "tombstones"
+
+    # the deleted row's id
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    org_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("orgs.id"), nullable=False)
+    # "task" or "project"; a project's tombstone stands for its tasks too
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text)::bigint")
+    )
+
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+# the feed's order within an org
+Index("ix_tombstones_org_change_seq", Tombstone.org_id, Tombstone.change_seq, Tombstone.id)
@@ -30,3 +30,10 @@ class WebhookEvent(Base):
     payload: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
 
 # unique(provider,event_id) is defined in migrations
+
+# events not yet processed, for stripe_events.drain() and requeue_failed()
+sa.Index(
+    "ix_webhook_events_pending",
+    WebhookEvent.received_at,
+    postgresql_where=sa.text("status IN ('received', 'failed')"),
+)
@@ -0,0 +1,55 @@
+"""keyset pagination on (created_at, id), newest first.
+
+cursors are opaque to clients: base64url of "<created_at iso>|<id>" of the
+last row on the page. the next page is `(created_at, id) < cursor`, which
+the (…, created_at desc, id desc) indexes answer with a range scan, so a
+deep page costs the same as the first one.
+"""
+from __future__ import annotations
+
+import base64
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+def encode_cursor(created_at: datetime, id_: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{id_}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        ts, id_ = raw.split("|", 1)
+        created_at = datetime.fromisoformat(ts)
+        if created_at.tzinfo is None:
+            raise ValueError("naive timestamp")
+        return created_at, uuid.UUID(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+class PageParams:
+    # dependency: ?limit=&cursor=
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: str | None = Query(None),
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+
+def keyset(q: Select, created_at_col, id_col, page: PageParams) -> Select:
+    # one extra row tells us whether there is a next page
+    if page.after is not None:
+        q = q.where(tuple_(created_at_col, id_col) < tuple_(*page.after))
+    return q.order_by(created_at_col.desc(), id_col.desc()).limit(page.limit + 1)
+
+def split_page(rows: list, page: PageParams, key=lambda r: (r.created_at, r.id)) -> tuple[list, str | None]:
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[: page.limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,210 @@
+"""background project delete.
+
+DELETE /orgs/{org_id}/projects/{project_id} only marks the project
+(projects.deleting_at) and records a project_deletions row; from then on
+the project and its tasks are gone as far as the api is concerned (see
+live_tasks). purge() then removes the tasks project_purge_batch_size at a
+time, each batch its own short transaction that also records progress,
+and finally the project row.
+
+batches take `FOR UPDATE SKIP LOCKED`, so the purge never waits on (or
+holds up) a writer that has one of the rows locked; it comes back for
+those later, backing off, and after project_purge_max_retries tries marks
+the deletion failed. a purger claims the deletion with a lease renewed
+every batch, so a second worker only takes over once the first has gone
+quiet.
+
+failed deletions, and ones whose worker died, are picked up by the next
+DELETE of the project, by every app worker at startup (resume()) and by
+scripts/purge_projects.py; a deployment that restarts rarely should run
+the script from cron.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import change_version
+from app.billing import usage
+from app.config import settings
+from app.models.project import Project
+from app.models.project_deletion import ProjectDeletion
+from app.models.task import Task
+from app.models.tombstone import Tombstone
+
+logger = logging.getLogger(__name__)
+
+RESUMABLE = ("pending", "running", "failed")
+
+# purges started by this worker; asyncio only keeps weak references
+_running: set[asyncio.Task] = set()
+
+def live_tasks(org_id: uuid.UUID):
+    # condition for org-wide task queries: skip tasks of projects being deleted
+    return Task.project_id.not_in(
+        select(Project.id).where(Project.org_id == org_id, Project.deleting_at.is_not(None))
+    )
+
+async def mark(db: AsyncSession, project: Project, user_id: uuid.UUID) -> bool:
+    # hide the project and record the deletion; caller commits, then spawn()s.
+    # False if a concurrent DELETE recorded it first (this one waits for
+    # that commit on the primary key, then leaves everything alone).
+    # the deletion row before the usage counter, so only one of them
+    # releases it; then the counter, for app.change_version's lock order.
+    # the tombstone tells feed clients (app.change_feed) to drop the project
+    # and its tasks, so the purge doesn't leave one per task
+    recorded = await db.scalar(
+        insert(ProjectDeletion)
+        .values(project_id=project.id, org_id=project.org_id, requested_by=user_id)
+        .on_conflict_do_nothing(index_elements=[ProjectDeletion.project_id])
+        .returning(ProjectDeletion.project_id)
+    )
+    if recorded is None:
+        return False
+    await usage.release(db, project.org_id, "projects")
+    project.deleting_at = func.now()
+    db.add(Tombstone(id=project.id, org_id=project.org_id, kind="project"))
+    await change_version.bump(db, project.org_id, [project.id])
+    return True
+
+def spawn(project_id: uuid.UUID, sessions: async_sessionmaker[AsyncSession]) -> None:
+    t = asyncio.create_task(purge(project_id, sessions))
+    _running.add(t)
+    t.add_done_callback(_running.discard)
+
+def _lease():
+    return func.now() + timedelta(seconds=settings.project_purge_lease_seconds)
+
+async def _claim(db: AsyncSession, project_id: uuid.UUID) -> bool:
+    claimed = await db.scalar(
+        update(ProjectDeletion)
+        .where(
+            ProjectDeletion.project_id == project_id,
+            ProjectDeletion.status.in_(RESUMABLE),
+            or_(ProjectDeletion.lease_until.is_(None), ProjectDeletion.lease_until < func.now()),
+        )
+        .values(status="running", lease_until=_lease(), error=None)
+        .returning(ProjectDeletion.project_id)
+    )
+    if claimed is None:
+        return False
+
+    # a resumed purge counts what it already removed
+    remaining = await db.scalar(select(func.count()).select_from(Task).where(Task.project_id == project_id))
+    await db.execute(
+        update(ProjectDeletion)
+        .where(ProjectDeletion.project_id == project_id)
+        .values(tasks_total=ProjectDeletion.tasks_purged + remaining)
+    )
+    return True
+
+async def _purge_batch(db: AsyncSession, project_id: uuid.UUID) -> int:
+    batch = (
+        select(Task.id)
+        .where(Task.project_id == project_id)
+        .limit(settings.project_purge_batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    n = (await db.execute(delete(Task).where(Task.id.in_(batch)))).rowcount
+    org_id = await db.scalar(
+        update(ProjectDeletion)
+        .where(ProjectDeletion.project_id == project_id)
+        .values(tasks_purged=ProjectDeletion.tasks_purged + n, lease_until=_lease())
+        .returning(ProjectDeletion.org_id)
+    )
+    # last, so the org's usage row (which task creates queue on) is only
+    # held for the commit
+    if n:
+        await usage.release(db, org_id, "tasks", n)
+    return n
+
+async def _finish(db: AsyncSession, project_id: uuid.UUID) -> bool:
+    # False while tasks remain (locked by a writer when we passed them)
+    gone = await db.execute(
+        delete(Project).where(
+            Project.id == project_id,
+            ~exists().where(Task.project_id == project_id),
+        )
+    )
+    if gone.rowcount == 0 and await db.scalar(select(Project.id).where(Project.id == project_id)):
+        return False
+    await db.execute(
+        update(ProjectDeletion)
+        .where(ProjectDeletion.project_id == project_id)
+        .values(status="done", lease_until=None, finished_at=func.now())
+    )
+    return True
+
+def _backoff(retry: int) -> float:
+    # doubling from 0.1s, short of the lease so the claim stays ours
+    return min(0.1 * 2 ** (retry - 1), settings.project_purge_lease_seconds / 4)
+
+async def purge(project_id: uuid.UUID, sessions: async_sessionmaker[AsyncSession]) -> str:
+    """run a deletion to the end: "done", "failed", or "busy" if another
+    purger holds it (or there is nothing left to do)."""
+    async with sessions() as db:
+        if not await _claim(db, project_id):
+            return "busy"
+        await db.commit()
+
+    retry = 0
+    try:
+        while True:
+            async with sessions() as db:
+                n = await _purge_batch(db, project_id)
+                await db.commit()
+                if n == 0:
+                    if await _finish(db, project_id):
+                        await db.commit()
+                        return "done"
+                    await db.rollback()
+            if n:
+                retry = 0
+                await asyncio.sleep(settings.project_purge_pause_seconds)
+                continue
+            # all that's left is locked by writers
+            retry += 1
+            if retry > settings.project_purge_max_retries:
+                raise RuntimeError(f"tasks still locked after {retry - 1} retries")
+            await asyncio.sleep(_backoff(retry))
+    except Exception as e:
+        # give it up right away; resumable() lists it again
+        try:
+            async with sessions() as db:
+                await db.execute(
+                    update(ProjectDeletion)
+                    .where(ProjectDeletion.project_id == project_id)
+                    .values(status="failed", lease_until=None, error=repr(e)[:2000])
+                )
+                await db.commit()
+        except Exception:
+            # most likely the database that failed the purge; the deletion
+            # stays "running" and resumable() lists it once the lease runs out
+            logger.exception("project %s: purge failed (%r), recording it failed too", project_id, e)
+        return "failed"
+
+async def resumable(db: AsyncSession) -> list[uuid.UUID]:
+    # deletions nobody is working on: never started, crashed or failed
+    return list(
+        await db.scalars(
+            select(ProjectDeletion.project_id).where(
+                ProjectDeletion.status.in_(RESUMABLE),
+                or_(ProjectDeletion.lease_until.is_(None), ProjectDeletion.lease_until < func.now()),
+            )
+        )
+    )
+
+async def resume(sessions: async_sessionmaker[AsyncSession]) -> list[uuid.UUID]:
+    # spawn() every resumable deletion (app startup); leases keep workers
+    # that all do this from purging the same project twice
+    async with sessions() as db:
+        pending = await resumable(db)
+    for project_id in pending:
+        spawn(project_id, sessions)
+    return pending
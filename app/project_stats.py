@@ -0,0 +1,87 @@
+"""per-project task counts by status and assignee (project_task_stats).
+
+the rollup is kept by statement-level triggers on tasks (migration 0011):
+every insert, update or delete of tasks, from any code path (single and
+batch routes, imports, moves, the background purge, scripts), adds its
+per-(project, assignee) deltas in the same transaction. reading stats is
+one indexed lookup per project, however many tasks it has.
+
+the trigger locks the project's stats rows until commit, so writes to a
+project's tasks take turns from the statement on. lock order is org_usage,
+then project_task_stats, then app.change_version's rows: take the usage
+counter before writing tasks.
+
+rebuild() recounts a project from tasks; scripts/rebuild_task_stats.py runs
+it for every project.
+"""
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.project_task_stats import ProjectTaskStats
+
+STATUSES = ("todo", "doing", "done")
+
+# adds to rows a concurrent writer's trigger created after the delete, so
+# its delta isn't lost
+_REBUILD = """
+insert into project_task_stats as s (project_id, assigned_to, todo, doing, done, last_activity_at)
+select project_id, assigned_to,
+       count(*) filter (where status = 'todo'),
+       count(*) filter (where status = 'doing'),
+       count(*) filter (where status = 'done'),
+       max(updated_at)
+from tasks
+where project_id = :project_id
+group by project_id, assigned_to
+order by assigned_to
+on conflict (project_id, assigned_to) do update set
+    todo = s.todo + excluded.todo,
+    doing = s.doing + excluded.doing,
+    done = s.done + excluded.done,
+    last_activity_at = greatest(s.last_activity_at, excluded.last_activity_at)
+"""
+
+def _empty() -> dict:
+    return {"todo": 0, "doing": 0, "done": 0, "total": 0, "last_activity_at": None, "by_assignee": []}
+
+async def for_projects(db: AsyncSession, project_ids: Sequence[uuid.UUID]) -> dict[uuid.UUID, dict]:
+    """project id -> ProjectStatsOut fields; zeros for a project without tasks."""
+    out = {pid: _empty() for pid in project_ids}
+    if not project_ids:
+        return out
+    rows = await db.execute(
+        select(*ProjectTaskStats.__table__.c)
+        .where(ProjectTaskStats.project_id.in_(project_ids))
+        .order_by(ProjectTaskStats.project_id, ProjectTaskStats.assigned_to.nulls_last())
+    )
+    for r in rows:
+        stats = out[r.project_id]
+        counts = {s: getattr(r, s) for s in STATUSES}
+        for s, n in counts.items():
+            stats[s] += n
+        stats["total"] += sum(counts.values())
+        if stats["last_activity_at"] is None or r.last_activity_at > stats["last_activity_at"]:
+            stats["last_activity_at"] = r.last_activity_at
+        if any(counts.values()):
+            stats["by_assignee"].append({"assigned_to": r.assigned_to, **counts})
+    return out
+
+async def _counts(db: AsyncSession, project_id: uuid.UUID) -> dict:
+    rows = await db.execute(
+        select(ProjectTaskStats.assigned_to, *(getattr(ProjectTaskStats, s) for s in STATUSES)).where(
+            ProjectTaskStats.project_id == project_id
+        )
+    )
+    return {r[0]: tuple(r[1:]) for r in rows if any(r[1:])}
+
+async def rebuild(db: AsyncSession, project_id: uuid.UUID) -> bool:
+    """recount the project from tasks; True if the rollup was off. caller commits."""
+    before = await _counts(db, project_id)
+    await db.execute(delete(ProjectTaskStats).where(ProjectTaskStats.project_id == project_id))
+    await db.execute(text(_REBUILD), {"project_id": project_id})
+    return await _counts(db, project_id) != before
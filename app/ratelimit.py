@@ -1,34 +1,374 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
-from fastapi import HTTPException, Request
+import math
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
 
+from fastapi import HTTPException, Request, Response
+
+from app.auth.tokens import decode_access_token
 from app.config import settings
-from app.redis_client import redis_client
+from app.models.enums import Plan
+from app.redis_client import Script, mark_redis_failed, redis_backing_off
+
+Algorithm = Literal["token_bucket", "sliding_window"]
+KeyPart = Literal["ip", "user", "org"]
+Budget = Literal["read", "write"]
+
+# both scripts read the clock from redis (TIME) so workers never disagree
+# on "now", and return {allowed, remaining, retry_after_ms, reset_ms}
+
+# KEYS[1] = bucket hash; ARGV = capacity, window_ms, cost
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = capacity / tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1])
+local ts = tonumber(b[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+if now > ts then
+  tokens = math.min(capacity, tokens + (now - ts) * rate)
+end
+
+local allowed = 0
+local retry_ms = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_ms = math.ceil((cost - tokens) / rate)
+end
+
+local reset_ms = math.ceil((capacity - tokens) / rate)
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], reset_ms + 1000)
+return {allowed, math.floor(tokens), retry_ms, reset_ms}
+"""
+
+# KEYS[1] = zset of request timestamps; ARGV = limit, window_ms, member
+_SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local n = redis.call('ZCARD', KEYS[1])
+
+local allowed = 0
+if n < limit then
+  redis.call('ZADD', KEYS[1], now, ARGV[3])
+  redis.call('PEXPIRE', KEYS[1], window)
+  n = n + 1
+  allowed = 1
+end
+
+local reset_ms = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+  reset_ms = math.max(0, tonumber(oldest[2]) + window - now)
+end
+
+local retry_ms = 0
+if allowed == 0 then
+  retry_ms = reset_ms
+end
+return {allowed, limit - n, retry_ms, reset_ms}
+"""
+
+# KEYS[1] = bucket hash; ARGV = capacity, window_ms, want, returned
+# same bucket as above, but hands out up to `want` tokens at once (a lease)
+# and takes back what the previous lease didn't use
+_LEASE_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = capacity / tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local returned = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1])
+local ts = tonumber(b[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+if now > ts then
+  tokens = tokens + (now - ts) * rate
+end
+tokens = math.min(capacity, tokens + returned)
+
+local granted = math.min(want, math.floor(tokens))
+tokens = tokens - granted
+
+local retry_ms = 0
+if granted == 0 then
+  retry_ms = math.ceil((1 - tokens) / rate)
+end
+
+local reset_ms = math.ceil((capacity - tokens) / rate)
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], reset_ms + 1000)
+return {granted, math.floor(tokens), retry_ms, reset_ms}
+"""
+
+_token_bucket = Script(_TOKEN_BUCKET_LUA)
+_sliding_window = Script(_SLIDING_WINDOW_LUA)
+_lease = Script(_LEASE_LUA)
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    window_seconds: int
+    remaining: int
+    retry_after_ms: int
+    reset_ms: int
+
+    def headers(self) -> dict[str, str]:
+        h = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(0, self.remaining)),
+            "RateLimit-Reset": str(math.ceil(self.reset_ms / 1000)),
+            "RateLimit-Policy": f"{self.limit};w={self.window_seconds}",
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(max(1, math.ceil(self.retry_after_ms / 1000)))
+        return h
+
+async def check_limit(
+    key: str,
+    limit: int,
+    window_seconds: int,
+    algorithm: Algorithm = "token_bucket",
+    cost: int = 1,
+) -> RateLimitResult | None:
+    # returns None when redis is unavailable (callers fail open)
+    if redis_backing_off():
+        return None
+
+    window_ms = int(window_seconds * 1000)
+    try:
+        if algorithm == "token_bucket":
+            raw = await _token_bucket([key], [limit, window_ms, cost])
+        else:
+            raw = await _sliding_window([key], [limit, window_ms, uuid.uuid4().hex])
+    except Exception:
+        mark_redis_failed()
+        return None
+
+    allowed, remaining, retry_ms, reset_ms = (int(x) for x in raw)
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=int(limit),
+        window_seconds=int(window_seconds),
+        remaining=remaining,
+        retry_after_ms=retry_ms,
+        reset_ms=reset_ms,
+    )
+
+@dataclass(slots=True)
+class _Lease:
+    tokens: int
+    # global tokens left in redis at the time of the lease (for headers)
+    remote_remaining: int
+    reset_ms: int
+    expires_at: float
+    # set when redis had nothing to give: deny locally until then
+    denied_until: float = 0.0
+
+# per-worker leases, LRU-bounded, and refills currently in flight
+_leases: OrderedDict[str, _Lease] = OrderedDict()
+_refills: dict[str, asyncio.Future] = {}
+
+def lease_chunk(limit: int) -> int:
+    # never lease more than a tenth of the bucket, so a handful of workers
+    # can't strand the whole budget in their local leases
+    return max(1, min(settings.rate_limit_lease_chunk, limit // 10))
+
+async def check_limit_leased(key: str, limit: int, window_seconds: int) -> RateLimitResult | None:
+    """two-tier token bucket: spend from a local lease, refill from redis.
+
+    each worker takes up to lease_chunk(limit) tokens per round trip and
+    spends them locally, handing back leftovers on the next refill. tokens
+    always come out of the shared redis bucket, so the limit is never
+    exceeded; the error is one-sided (early rejects while tokens sit in
+    other workers' leases), bounded by workers * chunk tokens and by the
+    lease ttl. once redis is empty the worker denies locally until the
+    bucket's retry-after, so rejected floods cost no round trips either.
+    concurrent misses on one key share a single in-flight refill.
+    """
+    while True:
+        now = time.monotonic()
+        lease = _leases.get(key)
+        if lease is not None:
+            _leases.move_to_end(key)
+            if now < lease.denied_until:
+                return RateLimitResult(
+                    allowed=False,
+                    limit=int(limit),
+                    window_seconds=int(window_seconds),
+                    remaining=0,
+                    retry_after_ms=max(1, int((lease.denied_until - now) * 1000)),
+                    reset_ms=lease.reset_ms,
+                )
+            if lease.tokens > 0 and now < lease.expires_at:
+                lease.tokens -= 1
+                return RateLimitResult(
+                    allowed=True,
+                    limit=int(limit),
+                    window_seconds=int(window_seconds),
+                    remaining=lease.remote_remaining + lease.tokens,
+                    retry_after_ms=0,
+                    reset_ms=lease.reset_ms,
+                )
+
+        if redis_backing_off():
+            return None
+
+        pending = _refills.get(key)
+        if pending is None:
+            break
+        # someone on this worker is already refilling this key
+        await asyncio.shield(pending)
+
+    done = asyncio.get_running_loop().create_future()
+    _refills[key] = done
+    # hand back whatever an expired lease didn't use. it keeps them until
+    # the refill succeeds: after a failed one they're still there to return
+    returned = lease.tokens if lease is not None else 0
+    try:
+        raw = await _lease([key], [limit, int(window_seconds * 1000), lease_chunk(limit), returned])
+    except Exception:
+        mark_redis_failed()
+        return None
+    finally:
+        del _refills[key]
+        done.set_result(None)
+
+    granted, remaining, retry_ms, reset_ms = (int(x) for x in raw)
+    now = time.monotonic()
+    lease = _Lease(
+        tokens=max(0, granted - 1),
+        remote_remaining=remaining,
+        reset_ms=reset_ms,
+        expires_at=now + settings.rate_limit_lease_ttl_seconds,
+    )
+    if granted == 0:
+        lease.denied_until = now + retry_ms / 1000.0
+
+    _leases[key] = lease
+    _leases.move_to_end(key)
+    while len(_leases) > settings.rate_limit_lease_max_keys:
+        _leases.popitem(last=False)
+
+    return RateLimitResult(
+        allowed=granted > 0,
+        limit=int(limit),
+        window_seconds=int(window_seconds),
+        remaining=remaining + lease.tokens,
+        retry_after_ms=retry_ms,
+        reset_ms=reset_ms,
+    )
 
 def _hash(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()[:24]
 
-# fixed-window limiter using redis INCR + EXPIRE
-def rate_limit(name: str, limit_per_window: int, window_seconds: int):
-    async def _dep(request: Request) -> None:
+def _client_ip(request: Request) -> str:
+    return (request.client.host if request.client else "unknown").strip()
+
+def _user_id(request: Request) -> str | None:
+    # claims only, no db: an unverifiable token just doesn't key by user
+    auth = request.headers.get("authorization") or ""
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return str(decode_access_token(token.strip())["sub"])
+    except Exception:
+        return None
+
+def _key_for(request: Request, name: str, key_by: tuple[KeyPart, ...]) -> str:
+    parts: list[str] = []
+    for part in key_by:
+        if part == "user":
+            uid = _user_id(request)
+            # anonymous callers fall back to their ip
+            parts.append(f"u={uid}" if uid else f"ip={_client_ip(request)}")
+        elif part == "org":
+            parts.append(f"o={request.path_params.get('org_id', '-')}")
+        else:
+            parts.append(f"ip={_client_ip(request)}")
+    return f"rl:{name}:{_hash('|'.join(parts))}"
+
+def rate_limit(
+    name: str,
+    limit_per_window: int,
+    window_seconds: int,
+    algorithm: Algorithm = "token_bucket",
+    key_by: tuple[KeyPart, ...] = ("ip",),
+    leased: bool = False,
+):
+    # leased: token bucket served from a per-worker lease (check_limit_leased)
+    if leased and algorithm != "token_bucket":
+        raise RuntimeError("leased rate limits require the token_bucket algorithm")
+
+    async def _dep(request: Request, response: Response) -> None:
         if not settings.rate_limit_enabled:
             return
 
-        ip = (request.client.host if request.client else "unknown").strip()
-        key = f"rl:{name}:{_hash(ip)}"
-
-        try:
-            pipe = redis_client.pipeline()
-            pipe.incr(key)
-            pipe.expire(key, window_seconds, nx=True)
-            count, _ = pipe.execute()
-            if int(count) > int(limit_per_window):
-                raise HTTPException(status_code=429, detail="rate_limited")
-        except HTTPException:
-            raise
-        except Exception:
+        key = _key_for(request, name, key_by)
+        if leased and settings.rate_limit_lease_chunk > 0:
+            result = await check_limit_leased(key, limit_per_window, window_seconds)
+        else:
+            result = await check_limit(key, limit_per_window, window_seconds, algorithm)
+        if result is None:
             # fail-open if redis is down
             return
 
+        if not result.allowed:
+            raise HTTPException(status_code=429, detail="rate_limited", headers=result.headers())
+        response.headers.update(result.headers())
+
     return _dep
+
+def tenant_budget(plan: str, budget: Budget) -> int:
+    if plan == Plan.pro:
+        if budget == "read":
+            return settings.tenant_quota_pro_read_per_min
+        return settings.tenant_quota_pro_write_per_min
+    if budget == "read":
+        return settings.tenant_quota_free_read_per_min
+    return settings.tenant_quota_free_write_per_min
+
+async def enforce_tenant_quota(org_id: uuid.UUID, plan: str, budget: Budget, response: Response) -> None:
+    # one shared bucket per (org, budget) across all members and workers
+    if not (settings.rate_limit_enabled and settings.tenant_quota_enabled):
+        return
+
+    limit = tenant_budget(plan, budget)
+    result = await check_limit_leased(f"tq:{budget}:{org_id}", limit, 60)
+    if result is None:
+        # fail-open if redis is down
+        return
+
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"tenant_{budget}_quota_exceeded",
+            headers=result.headers(),
+        )
+    response.headers.update(result.headers())
@@ -0,0 +1,319 @@
+"""(user_id, org_id) -> role, plan, subscription_status, two levels.
+
+L1 is a per-worker LRU with a short ttl, L2 a redis hash per org
+(`ac:{org_id}`, one field per member, one for the org alone (used when the
+role comes from token claims), plus a version field `v`). writers
+that change memberships or billing state invalidate both levels after
+commit; a loader only writes back to redis if the org's version is still
+the one it saw before reading postgres, so a load racing an invalidation
+can't resurrect the old state.
+
+staleness bounds for a change that went through invalidate_*():
+  - same worker: none (its L1 entries are dropped)
+  - other workers: auth_cache_local_ttl_seconds (their L1 entries)
+  - invalidation lost (redis down at the time): auth_cache_ttl_seconds,
+    carried per entry so a busy org's hash ttl can't extend it
+
+users' membership versions (the stamp on membership claims, see
+app.auth.claims) are mirrored the same way: `mv:{user_id}` in redis, with
+the same local ttl in front.
+
+neither kind of entry says the user still exists, so get_org_context
+checks that separately; a check that passed is kept in L1 only
+(user_known), so a deleted user is turned away within the local ttl.
+"""
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+from app.models.enums import Role
+from app.redis_client import Script, get_redis, mark_redis_failed, redis_backing_off
+
+@dataclass(frozen=True, slots=True)
+class AuthEntry:
+    role: Role
+    org_name: str
+    plan: str
+    subscription_status: str
+
+@dataclass(frozen=True, slots=True)
+class OrgEntry:
+    name: str
+    plan: str
+    subscription_status: str
+
+# KEYS[1] = org hash; ARGV = version seen before the load ('' = none),
+# field, value, hash ttl (s)
+_PUT_LUA = """
+local v = redis.call('HGET', KEYS[1], 'v') or ''
+if v ~= ARGV[1] then
+  return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+_put = Script(_PUT_LUA)
+
+# KEYS[1] = membership version key; ARGV = version, ttl (s). versions only
+# go up: a publish older than what's there (a read that predates a bump,
+# or bumps published out of order) is dropped
+_PUBLISH_LUA = """
+local v = tonumber(redis.call('GET', KEYS[1]))
+if v and v > tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+_publish = Script(_PUBLISH_LUA)
+
+_local: OrderedDict[tuple[uuid.UUID, uuid.UUID], tuple[float, AuthEntry]] = OrderedDict()
+_local_orgs: OrderedDict[uuid.UUID, tuple[float, OrgEntry]] = OrderedDict()
+_local_versions: OrderedDict[uuid.UUID, tuple[float, int]] = OrderedDict()
+_local_users: OrderedDict[uuid.UUID, tuple[float, bool]] = OrderedDict()
+
+_stats = {
+    "l1_hits": 0,
+    "l2_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "invalidations": 0,
+    "stale_writes_skipped": 0,
+}
+
+def stats() -> dict[str, int]:
+    return dict(_stats, l1_size=len(_local) + len(_local_orgs) + len(_local_versions) + len(_local_users))
+
+def _key(org_id: uuid.UUID) -> str:
+    return f"ac:{org_id}"
+
+def _field(user_id: uuid.UUID) -> str:
+    return f"u:{user_id}"
+
+_ORG_FIELD = "org"
+
+def _version_key(user_id: uuid.UUID) -> str:
+    return f"mv:{user_id}"
+
+def _encode(entry: AuthEntry | OrgEntry, expires_at: float) -> str:
+    if isinstance(entry, OrgEntry):
+        d = {"n": entry.name, "p": entry.plan, "s": entry.subscription_status}
+    else:
+        d = {
+            "r": entry.role.value,
+            "n": entry.org_name,
+            "p": entry.plan,
+            "s": entry.subscription_status,
+        }
+    d["e"] = expires_at
+    return json.dumps(d, separators=(",", ":"))
+
+def _decode(raw: str) -> tuple[float, AuthEntry | OrgEntry]:
+    d = json.loads(raw)
+    if "r" not in d:
+        return d["e"], OrgEntry(name=d["n"], plan=d["p"], subscription_status=d["s"])
+    return d["e"], AuthEntry(role=Role(d["r"]), org_name=d["n"], plan=d["p"], subscription_status=d["s"])
+
+def _remember(local: OrderedDict, key, value) -> None:
+    local[key] = (time.monotonic() + settings.auth_cache_local_ttl_seconds, value)
+    local.move_to_end(key)
+    while len(local) > settings.auth_cache_local_max_entries:
+        local.popitem(last=False)
+        _stats["evictions"] += 1
+
+def _recall(local: OrderedDict, key):
+    hit = local.get(key)
+    if hit is None:
+        return None
+    if time.monotonic() < hit[0]:
+        local.move_to_end(key)
+        _stats["l1_hits"] += 1
+        return hit[1]
+    del local[key]
+    return None
+
+async def _lookup(org_id: uuid.UUID, field: str):
+    # -> (entry, version) from redis; version None = redis not consulted
+    if redis_backing_off():
+        _stats["misses"] += 1
+        return None, None
+
+    try:
+        raw, version = await get_redis().hmget(_key(org_id), [field, "v"])
+    except Exception:
+        mark_redis_failed()
+        _stats["misses"] += 1
+        return None, None
+
+    if raw is not None:
+        expires_at, entry = _decode(raw)
+        if time.time() < expires_at:
+            _stats["l2_hits"] += 1
+            return entry, None
+
+    _stats["misses"] += 1
+    return None, version or ""
+
+async def _store(org_id: uuid.UUID, field: str, entry: AuthEntry | OrgEntry, version: str | None) -> bool:
+    # False when the org was invalidated since `version` was read
+    if version is None or redis_backing_off():
+        return True
+
+    ttl = settings.auth_cache_ttl_seconds
+    try:
+        stored = await _put(
+            [_key(org_id)],
+            [version, field, _encode(entry, time.time() + ttl), max(1, int(ttl))],
+        )
+    except Exception:
+        mark_redis_failed()
+        return True
+    if not int(stored):
+        # invalidated while we were reading postgres; don't cache what we read
+        _stats["stale_writes_skipped"] += 1
+        return False
+    return True
+
+async def get(user_id: uuid.UUID, org_id: uuid.UUID) -> tuple[AuthEntry | None, str | None]:
+    """returns (entry, version); pass the version back to put() after a miss.
+
+    version None means redis wasn't consulted and put() won't write to it.
+    """
+    if not settings.auth_cache_enabled:
+        return None, None
+
+    entry = _recall(_local, (user_id, org_id))
+    if entry is not None:
+        return entry, None
+
+    entry, version = await _lookup(org_id, _field(user_id))
+    if entry is not None:
+        _remember(_local, (user_id, org_id), entry)
+    return entry, version
+
+async def put(user_id: uuid.UUID, org_id: uuid.UUID, entry: AuthEntry, version: str | None) -> None:
+    if not settings.auth_cache_enabled:
+        return
+
+    _remember(_local, (user_id, org_id), entry)
+    if not await _store(org_id, _field(user_id), entry, version):
+        _local.pop((user_id, org_id), None)
+
+async def get_org(org_id: uuid.UUID) -> tuple[OrgEntry | None, str | None]:
+    # org alone, for requests whose role came from token claims
+    if not settings.auth_cache_enabled:
+        return None, None
+
+    entry = _recall(_local_orgs, org_id)
+    if entry is not None:
+        return entry, None
+
+    entry, version = await _lookup(org_id, _ORG_FIELD)
+    if entry is not None:
+        _remember(_local_orgs, org_id, entry)
+    return entry, version
+
+async def put_org(org_id: uuid.UUID, entry: OrgEntry, version: str | None) -> None:
+    if not settings.auth_cache_enabled:
+        return
+
+    _remember(_local_orgs, org_id, entry)
+    if not await _store(org_id, _ORG_FIELD, entry, version):
+        _local_orgs.pop(org_id, None)
+
+def user_known(user_id: uuid.UUID) -> bool:
+    # the user row was there less than the local ttl ago, in this worker.
+    # not an auth context lookup, so not in the hit/miss stats
+    if not settings.auth_cache_enabled:
+        return False
+    hit = _local_users.get(user_id)
+    return hit is not None and time.monotonic() < hit[0]
+
+def remember_user(user_id: uuid.UUID) -> None:
+    if settings.auth_cache_enabled:
+        _remember(_local_users, user_id, True)
+
+async def membership_version(user_id: uuid.UUID) -> int | None:
+    # None = unknown here (callers fall back to postgres)
+    if not settings.auth_cache_enabled:
+        return None
+
+    v = _recall(_local_versions, user_id)
+    if v is not None:
+        return v
+    if redis_backing_off():
+        _stats["misses"] += 1
+        return None
+
+    try:
+        raw = await get_redis().get(_version_key(user_id))
+    except Exception:
+        mark_redis_failed()
+        _stats["misses"] += 1
+        return None
+    if raw is None:
+        _stats["misses"] += 1
+        return None
+
+    _stats["l2_hits"] += 1
+    _remember(_local_versions, user_id, int(raw))
+    return int(raw)
+
+async def publish_membership_version(user_id: uuid.UUID, version: int, *, loaded: bool = False) -> None:
+    """mirror users.membership_version after it was read or bumped.
+
+    redis keeps the highest version published (for as long as the key
+    lasts, a token's lifetime), so neither a read that predates a bump nor
+    two bumps published out of order can put an old version back.
+    loaded=True (a plain read) also leaves this worker's L1 alone.
+    """
+    if not settings.auth_cache_enabled:
+        return
+
+    if not loaded:
+        _remember(_local_versions, user_id, version)
+    if redis_backing_off():
+        return
+
+    ttl = max(1, settings.jwt_expires_minutes * 60)
+    try:
+        await _publish([_version_key(user_id)], [version, ttl])
+    except Exception:
+        # other workers fall back to postgres until they see a version again
+        mark_redis_failed()
+
+async def _bump(org_id: uuid.UUID, drop_field: str | None) -> None:
+    pipe = get_redis().pipeline(transaction=True)
+    if drop_field is None:
+        pipe.delete(_key(org_id))
+    else:
+        pipe.hdel(_key(org_id), drop_field)
+    pipe.hset(_key(org_id), "v", uuid.uuid4().hex)
+    pipe.expire(_key(org_id), max(1, int(settings.auth_cache_ttl_seconds)))
+    try:
+        await pipe.execute()
+    except Exception:
+        # entries still expire on their own within auth_cache_ttl_seconds
+        mark_redis_failed()
+
+async def invalidate_member(org_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    # call after commit
+    _stats["invalidations"] += 1
+    _local.pop((user_id, org_id), None)
+    await _bump(org_id, _field(user_id))
+
+async def invalidate_org(org_id: uuid.UUID) -> None:
+    # call after commit; drops every member's entry (plan/status changed)
+    _stats["invalidations"] += 1
+    for k in [k for k in _local if k[1] == org_id]:
+        del _local[k]
+    _local_orgs.pop(org_id, None)
+    await _bump(org_id, None)
@@ -1,47 +1,243 @@
 import uuid
+from dataclasses import dataclass
 
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import and_, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.deps import get_current_user
+from app.auth.claims import role_from_claims
+from app.auth.deps import get_token_claims
+from app.config import settings
 from app.db import get_db
 from app.models.enums import Role
 from app.models.membership import Membership
 from app.models.org import Org
+from app.models.project import Project
 from app.models.user import User
-from app.rbac.perms import PERMS
+from app.ratelimit import enforce_tenant_quota
+from app.rbac import cache as auth_cache
+from app.rbac.perms import PERMS, budget_for
+
+# read-only snapshots (possibly served from cache); routes that need to write
+# the org itself load the ORM row
+
+@dataclass(frozen=True, slots=True)
+class OrgInfo:
+    id: uuid.UUID
+    name: str
+    plan: str
+    subscription_status: str
+
+@dataclass(frozen=True, slots=True)
+class MembershipInfo:
+    user_id: uuid.UUID
+    org_id: uuid.UUID
+    role: Role
 
 class OrgContext:
-    def __init__(self, org: Org, membership: Membership):
+    def __init__(
+        self,
+        org: OrgInfo,
+        membership: MembershipInfo,
+        project_id: uuid.UUID | None = None,
+    ):
         self.org = org
         self.membership = membership
+        self.user_id = membership.user_id
+        # set when the path has a project_id that belongs to this org (and
+        # isn't being deleted)
+        self.project_id = project_id
+
+    @classmethod
+    def from_entry(
+        cls,
+        user_id: uuid.UUID,
+        org_id: uuid.UUID,
+        entry: auth_cache.AuthEntry,
+        project_id: uuid.UUID | None = None,
+    ) -> "OrgContext":
+        return cls(
+            org=OrgInfo(
+                id=org_id,
+                name=entry.org_name,
+                plan=entry.plan,
+                subscription_status=entry.subscription_status,
+            ),
+            membership=MembershipInfo(user_id=user_id, org_id=org_id, role=entry.role),
+            project_id=project_id,
+        )
+
+    def require_project(self, project_id: uuid.UUID) -> None:
+        if self.project_id != project_id:
+            raise HTTPException(status_code=404, detail="project not found")
+
+def _path_project_id(request: Request) -> uuid.UUID | None:
+    raw = request.path_params.get("project_id")
+    if raw is None:
+        return None
+    try:
+        return uuid.UUID(str(raw))
+    except ValueError:
+        # the route's own path validation answers with a 422
+        return None
 
-def get_org_context(
+def _context_query(user_id: uuid.UUID, org_id: uuid.UUID, project_id: uuid.UUID | None):
+    # one round trip: anchored on the user, everything else outer-joined so a
+    # missing org / membership / project shows up as NULLs instead of no row
+    q = (
+        select(
+            Org.id,
+            Org.name,
+            Org.plan,
+            Org.subscription_status,
+            Membership.role,
+            User.membership_version,
+        )
+        .select_from(User)
+        .outerjoin(Org, Org.id == org_id)
+        .outerjoin(
+            Membership,
+            and_(Membership.user_id == User.id, Membership.org_id == org_id),
+        )
+        .where(User.id == user_id)
+    )
+    if project_id is None:
+        return q.add_columns(null().label("project_id"))
+    return q.add_columns(Project.id).outerjoin(
+        Project,
+        and_(Project.id == project_id, Project.org_id == Org.id, Project.deleting_at.is_(None)),
+    )
+
+async def _project_in_org(
+    db: AsyncSession, org_id: uuid.UUID, project_id: uuid.UUID | None
+) -> uuid.UUID | None:
+    if project_id is None:
+        return None
+    return await db.scalar(
+        select(Project.id).where(Project.id == project_id, Project.org_id == org_id, Project.deleting_at.is_(None))
+    )
+
+async def _require_user(db: AsyncSession, user_id: uuid.UUID) -> None:
+    # the cached and claims paths don't read the user row; a deleted user's
+    # token must still stop working (app.rbac.cache.user_known)
+    if auth_cache.user_known(user_id):
+        return
+    if await db.scalar(select(User.id).where(User.id == user_id)) is None:
+        raise HTTPException(status_code=401, detail="user not found")
+    auth_cache.remember_user(user_id)
+
+async def _context_from_claims(
+    db: AsyncSession,
+    user_id: uuid.UUID,
     org_id: uuid.UUID,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    role: Role,
+    path_project_id: uuid.UUID | None,
 ) -> OrgContext:
-    org = db.get(Org, org_id)
-    if org is None:
+    # membership vouched for by the token; only the org itself is looked up
+    membership = MembershipInfo(user_id=user_id, org_id=org_id, role=role)
+
+    org, version = await auth_cache.get_org(org_id)
+    if org is not None:
+        project_id = await _project_in_org(db, org_id, path_project_id)
+        return OrgContext(
+            org=OrgInfo(id=org_id, name=org.name, plan=org.plan, subscription_status=org.subscription_status),
+            membership=membership,
+            project_id=project_id,
+        )
+
+    q = select(Org.name, Org.plan, Org.subscription_status).where(Org.id == org_id)
+    if path_project_id is None:
+        q = q.add_columns(null().label("project_id"))
+    else:
+        q = q.add_columns(Project.id).outerjoin(
+            Project,
+            and_(Project.id == path_project_id, Project.org_id == Org.id, Project.deleting_at.is_(None)),
+        )
+    row = (await db.execute(q)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="org not found")
 
-    membership = db.get(Membership, {"user_id": user.id, "org_id": org_id})
-    if membership is None:
+    name, plan, subscription_status, project_id = row
+    await auth_cache.put_org(
+        org_id,
+        auth_cache.OrgEntry(name=name, plan=plan, subscription_status=subscription_status),
+        version,
+    )
+    return OrgContext(
+        org=OrgInfo(id=org_id, name=name, plan=plan, subscription_status=subscription_status),
+        membership=membership,
+        project_id=project_id,
+    )
+
+async def get_org_context(
+    org_id: uuid.UUID,
+    request: Request,
+    claims: dict = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db),
+) -> OrgContext:
+    user_id = uuid.UUID(claims["sub"])
+    path_project_id = _path_project_id(request)
+
+    # membership claims in the token are trusted only while their stamp is
+    # the user's current membership version
+    claimed = role_from_claims(claims, org_id) if settings.jwt_membership_claims_enabled else None
+    if claimed is not None:
+        role, stamp = claimed
+        if await auth_cache.membership_version(user_id) == stamp:
+            await _require_user(db, user_id)
+            return await _context_from_claims(db, user_id, org_id, role, path_project_id)
+
+    entry, version = await auth_cache.get(user_id, org_id)
+    if entry is not None:
+        await _require_user(db, user_id)
+        project_id = await _project_in_org(db, org_id, path_project_id)
+        return OrgContext.from_entry(user_id, org_id, entry, project_id)
+
+    row = (await db.execute(_context_query(user_id, org_id, path_project_id))).first()
+    if row is None:
+        raise HTTPException(status_code=401, detail="user not found")
+    auth_cache.remember_user(user_id)
+
+    found_org_id, org_name, plan, subscription_status, role, membership_version, project_id = row
+    if "mv" in claims:
+        # lets the next request with this token authorize from its claims
+        await auth_cache.publish_membership_version(user_id, membership_version, loaded=True)
+
+    if found_org_id is None:
+        raise HTTPException(status_code=404, detail="org not found")
+
+    if role is None:
         raise HTTPException(status_code=403, detail="not a member of this org")
 
-    return OrgContext(org=org, membership=membership)
+    entry = auth_cache.AuthEntry(
+        role=Role(role),
+        org_name=org_name,
+        plan=plan,
+        subscription_status=subscription_status,
+    )
+    await auth_cache.put(user_id, org_id, entry, version)
+    return OrgContext.from_entry(user_id, org_id, entry, project_id)
 
 def require_perm(action: str):
     allowed = PERMS.get(action)
     if allowed is None:
         raise RuntimeError(f"unknown permission action: {action}")
 
-    def _checker(org_id: uuid.UUID, ctx: OrgContext = Depends(get_org_context)) -> OrgContext:
+    budget = budget_for(action)
+
+    async def _checker(
+        org_id: uuid.UUID,
+        response: Response,
+        ctx: OrgContext = Depends(get_org_context),
+    ) -> OrgContext:
         if ctx.org.id != org_id:
             raise HTTPException(status_code=400, detail="org context mismatch")
 
         if ctx.membership.role not in allowed:
             raise HTTPException(status_code=403, detail="forbidden")
+
+        # only authorized calls count against the tenant's budget
+        await enforce_tenant_quota(ctx.org.id, ctx.org.plan, budget, response)
         return ctx
 
     return _checker
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from app.models.enums import Role
 
 PERMS: dict[str, set[Role]] = {
@@ -14,3 +16,7 @@ PERMS: dict[str, set[Role]] = {
     "tasks:update": {Role.owner, Role.admin, Role.member},
     "tasks:delete": {Role.owner, Role.admin},
 }
+
+# which tenant quota an action draws from
+def budget_for(action: str) -> Literal["read", "write"]:
+    return "read" if action.endswith((":read", ":view")) else "write"
@@ -1,12 +1,77 @@
-import redis
+import hashlib
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 
 from app.config import settings
 
-redis_client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+# one pool per worker, opened/closed by the app lifespan (app.main)
+_client: redis.Redis | None = None
+
+def _build_client() -> redis.Redis:
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        decode_responses=True,
+        max_connections=settings.redis_max_connections,
+        # wait this long for a free pooled connection before erroring
+        timeout=settings.redis_pool_timeout_seconds,
+        socket_timeout=settings.redis_socket_timeout_seconds,
+        socket_connect_timeout=settings.redis_connect_timeout_seconds,
+        health_check_interval=30,
+    )
+    # from_pool: the client owns the pool and disconnects it on aclose()
+    return redis.Redis.from_pool(pool)
+
+async def init_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+def get_redis() -> redis.Redis:
+    # outside a lifespan (scripts, bare test apps) fall back to a lazy client
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+# monotonic deadline: while redis is failing, callers skip it instead of
+# paying a socket timeout on every request
+_down_until = 0.0
+
+def redis_backing_off() -> bool:
+    return time.monotonic() < _down_until
+
+def mark_redis_failed() -> None:
+    global _down_until
+    _down_until = time.monotonic() + settings.redis_failure_backoff_seconds
+
+class Script:
+    # EVALSHA with the sha computed once; loads the body only on NOSCRIPT
+    # (first call against a fresh/flushed server), so steady state is one
+    # round trip per call
+    def __init__(self, lua: str):
+        self.lua = lua
+        self.sha = hashlib.sha1(lua.encode("utf-8")).hexdigest()
+
+    async def __call__(self, keys: list[str], args: list) -> list:
+        client = get_redis()
+        try:
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await client.script_load(self.lua)
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
 
 # redis connectivity check
-def redis_ping() -> bool:
+async def redis_ping() -> bool:
     try:
-        return bool(redis_client.ping())
+        return bool(await get_redis().ping())
     except Exception:
         return False
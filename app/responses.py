@@ -0,0 +1,33 @@
+"""pre-encoded JSON for the list endpoints.
+
+a list route selects its response fields as plain column tuples and hands
+them here: one orjson call encodes the page straight into a Response. no
+ORM objects, no pydantic model per row, and FastAPI skips response_model
+validation for a returned Response (the model still documents the route).
+`fields` name the columns in order and must match the response model;
+json() takes a body already shaped like it (the change feed).
+
+headers set on the route's `response: Response` parameter (rate limit and
+quota headers, the ETag) are only sent for returned models, so they are
+copied over.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import orjson
+from fastapi import Response
+
+def page(
+    rows: Sequence[tuple],
+    fields: Sequence[str],
+    next_cursor: str | None,
+    response: Response,
+) -> Response:
+    # rows may carry trailing columns (the keyset's created_at); zip drops them
+    return json({"items": [dict(zip(fields, r)) for r in rows], "next_cursor": next_cursor}, response)
+
+def json(content: dict, response: Response) -> Response:
+    # utc as "Z", like pydantic
+    body = orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select, update
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.claims import load_membership_claims
+from app.auth.deps import get_current_user, get_token_claims
 from app.auth.tokens import (
     hash_magic_token,
     issue_access_token,
@@ -15,31 +17,33 @@ from app.config import settings
 from app.db import get_db
 from app.models.auth_magic_link import AuthMagicLink
 from app.models.user import User
-from app.schemas.auth import AccessTokenOut, RedeemIn, RequestLinkIn, RequestLinkOut
+from app.schemas.auth import AccessTokenOut, RedeemIn, RefreshIn, RequestLinkIn, RequestLinkOut
 from app.ratelimit import rate_limit
+from app.rbac import cache as auth_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/request-link", response_model=RequestLinkOut)
-def request_link(
+async def request_link(
     payload: RequestLinkIn,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     _: None = Depends(
         rate_limit(
             "auth:request_link",
             limit_per_window=settings.rate_limit_auth_request_link_per_min,
             window_seconds=60,
+            algorithm="sliding_window",
         )
     ),
 ) -> RequestLinkOut:
     email = payload.email.lower().strip()
 
-    user = db.scalar(select(User).where(User.email == email))
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         user = User(email=email)
         db.add(user)
-        db.flush()
+        await db.flush()
 
     token = new_magic_token()
     token_hash = hash_magic_token(token)
@@ -52,7 +56,7 @@ def request_link(
             used_at=None,
         )
     )
-    db.commit()
+    await db.commit()
 
     if settings.app_env == "prod":
         return RequestLinkOut(token=None, link=f"{settings.base_url}/auth/redeem?token={token}")
@@ -60,15 +64,16 @@ def request_link(
     return RequestLinkOut(sent=True, token=token, link=None)
 
 @router.post("/redeem", response_model=AccessTokenOut)
-def redeem(
+async def redeem(
     payload: RedeemIn,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     _: None = Depends(
         rate_limit(
             "auth:redeem",
             limit_per_window=settings.rate_limit_auth_redeem_per_min,
             window_seconds=60,
+            algorithm="sliding_window",
         )
     ),
 ) -> AccessTokenOut:
@@ -85,9 +90,9 @@ def redeem(
         .returning(AuthMagicLink.user_id)
     )
 
-    user_id = db.scalar(stmt)
+    user_id = await db.scalar(stmt)
     if user_id is None:
-        row = db.get(AuthMagicLink, hash_magic_token(token))
+        row = await db.get(AuthMagicLink, hash_magic_token(token))
         if row is None:
             raise HTTPException(status_code=400, detail="invalid token")
         if row.used_at is not None:
@@ -96,9 +101,40 @@ def redeem(
             raise HTTPException(status_code=400, detail="token expired")
         raise HTTPException(status_code=400, detail="invalid token")
 
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(status_code=400, detail="invalid token")
 
-    db.commit()
-    return AccessTokenOut(access_token=issue_access_token(str(user.id)))
+    await db.commit()
+    return AccessTokenOut(access_token=await _issue(db, user, payload.include_memberships))
+
+@router.post("/refresh", response_model=AccessTokenOut)
+async def refresh(
+    payload: RefreshIn | None = None,
+    claims: dict = Depends(get_token_claims),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(
+        rate_limit(
+            "auth:refresh",
+            limit_per_window=settings.rate_limit_auth_redeem_per_min,
+            window_seconds=60,
+            algorithm="sliding_window",
+            key_by=("user",),
+        )
+    ),
+) -> AccessTokenOut:
+    # new expiry, and a fresh membership map for tokens that carry one
+    include = payload.include_memberships if payload is not None else None
+    if include is None:
+        include = "mv" in claims
+    return AccessTokenOut(access_token=await _issue(db, user, include))
+
+async def _issue(db: AsyncSession, user: User, include_memberships: bool) -> str:
+    if not (include_memberships and settings.jwt_membership_claims_enabled):
+        return issue_access_token(str(user.id))
+
+    extra = await load_membership_claims(db, user.id)
+    if extra:
+        await auth_cache.publish_membership_version(user.id, extra["mv"], loaded=True)
+    return issue_access_token(str(user.id), extra)
@@ -0,0 +1,25 @@
+import uuid
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import change_feed, responses
+from app.db import get_db
+from app.rbac.deps import OrgContext, require_perm
+from app.schemas.changes import ChangesOut
+
+router = APIRouter(prefix="/orgs/{org_id}", tags=["changes"])
+
+@router.get("/changes", response_model=ChangesOut)
+async def list_changes(
+    org_id: uuid.UUID,
+    response: Response,
+    since: str | None = Query(None),
+    limit: int = Query(500, ge=1, le=1000),
+    ctx: OrgContext = Depends(require_perm("tasks:read")),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    # projects and tasks changed after `since`, tombstones for deleted ones
+    # (app.change_feed); no since: everything, for a first sync
+    items, token, more = await change_feed.page(db, org_id, since, limit)
+    return responses.json({"items": items, "since": token, "has_more": more}, response)
@@ -3,7 +3,10 @@ import sqlalchemy as sa
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 
+from app.auth.tokens import jwt_cache_stats
+from app.billing import entitlements
 from app.db import db_ping
+from app.rbac import cache as auth_cache
 from app.redis_client import redis_ping
 
 router = APIRouter(tags=["health"])
@@ -12,15 +15,20 @@ router = APIRouter(tags=["health"])
 def health() -> dict:
     return {"status": "ok"}
 
+# per-worker cache counters
+@router.get("/health/caches")
+def caches() -> dict:
+    return {"auth_context": auth_cache.stats(), "entitlements": entitlements.stats(), "jwt": jwt_cache_stats()}
+
 # readiness probe
 @router.get("/ready")
-def ready():
+async def ready():
     checks: dict[str, bool] = {}
     errors: dict[str, str] = {}
 
     for name, fn in (("db", db_ping), ("redis", redis_ping)):
         try:
-            checks[name] = bool(fn())
+            checks[name] = bool(await fn())
         except Exception as e:
             checks[name] = False
             msg = str(e).strip()
@@ -2,64 +2,72 @@ import uuid
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.claims import bump_membership_version
 from app.auth.deps import get_current_user
 from app.db import get_db
 from app.models.enums import Role
 from app.models.membership import Membership
 from app.models.org import Org
+from app.models.org_usage import OrgUsage
 from app.models.user import User
-from app.rbac.deps import get_org_context, require_perm
+from app.pagination import PageParams, keyset, split_page
+from app.rbac import cache as auth_cache
+from app.rbac.deps import require_perm
 from app.schemas.orgs import InviteIn, MemberOut, OrgCreateIn, OrgOut
-from app.billing.gates import enforce_billing_writable, enforce_free_limits
+from app.schemas.pagination import Page
+from app.billing import entitlements
 
 router = APIRouter(prefix="/orgs", tags=["orgs"])
 
 @router.post("", response_model=OrgOut)
-def create_org(
+async def create_org(
     payload: OrgCreateIn,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> OrgOut:
     org = Org(name=payload.name)
     db.add(org)
-    db.flush()
+    await db.flush()
 
     db.add(Membership(user_id=user.id, org_id=org.id, role=Role.owner))
-    db.commit()
+    db.add(OrgUsage(org_id=org.id, members=1))
+    membership_version = await bump_membership_version(db, user.id)
+    await db.commit()
+    await auth_cache.invalidate_member(org.id, user.id)
+    await auth_cache.publish_membership_version(user.id, membership_version)
 
     return OrgOut(id=org.id, name=org.name)
 
-@router.get("", response_model=list[OrgOut])
-def list_orgs(
+@router.get("", response_model=Page[OrgOut])
+async def list_orgs(
+    page: PageParams = Depends(),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-) -> list[OrgOut]:
+    db: AsyncSession = Depends(get_db),
+) -> Page[OrgOut]:
+    # newest membership first: the keyset runs on the user's memberships
+    # (ix_memberships_user_created_org), then one org lookup per row
     q = (
-        select(Org)
+        select(Org.id, Org.name, Membership.created_at)
         .join(Membership, Membership.org_id == Org.id)
         .where(Membership.user_id == user.id)
-        .order_by(Org.created_at.desc())
     )
-    orgs = db.scalars(q).all()
-    return [OrgOut(id=o.id, name=o.name) for o in orgs]
+    rows = (await db.execute(keyset(q, Membership.created_at, Membership.org_id, page))).all()
+    rows, next_cursor = split_page(rows, page)
+    return Page(items=[OrgOut(id=r.id, name=r.name) for r in rows], next_cursor=next_cursor)
 
 @router.get("/{org_id}", response_model=OrgOut)
-def get_org(ctx=Depends(get_org_context)) -> OrgOut:
+async def get_org(ctx=Depends(require_perm("org:view"))) -> OrgOut:
     return OrgOut(id=ctx.org.id, name=ctx.org.name)
 
 @router.post("/{org_id}/invites", response_model=MemberOut)
-def invite_user(
+async def invite_user(
     org_id: uuid.UUID,
     payload: InviteIn,
     ctx=Depends(require_perm("org:invite")),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> MemberOut:
-    enforce_billing_writable(ctx.org)
-    if ctx.org.plan == "free":
-        enforce_free_limits(db, org_id, "members")
     allowed_roles_by_inviter = {
         Role.owner: {Role.admin, Role.member},
         Role.admin: {Role.member},
@@ -68,17 +76,21 @@ def invite_user(
     if payload.role not in allowed:
         raise HTTPException(status_code=403, detail="forbidden")
     email = payload.email.lower().strip()
-    invited = db.scalar(select(User).where(User.email == email))
+    invited = await db.scalar(select(User).where(User.email == email))
+    if invited is not None:
+        existing = await db.get(Membership, {"user_id": invited.id, "org_id": org_id})
+        if existing is not None:
+            return MemberOut(user_id=existing.user_id, org_id=existing.org_id, role=existing.role)
+
+    await entitlements.check_write(db, org_id, "members", adding=1)
     if invited is None:
         invited = User(email=email)
         db.add(invited)
-        db.flush()
-
-    existing = db.get(Membership, {"user_id": invited.id, "org_id": org_id})
-    if existing is not None:
-        return MemberOut(user_id=existing.user_id, org_id=existing.org_id, role=existing.role)
-
+        await db.flush()
     m = Membership(user_id=invited.id, org_id=org_id, role=payload.role)
     db.add(m)
-    db.commit()
+    membership_version = await bump_membership_version(db, invited.id)
+    await db.commit()
+    await auth_cache.invalidate_member(org_id, invited.id)
+    await auth_cache.publish_membership_version(invited.id, membership_version)
     return MemberOut(user_id=m.user_id, org_id=m.org_id, role=m.role)
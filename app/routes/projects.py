@@ -1,73 +1,160 @@
 import uuid
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db import get_db
+from app import change_version, project_deletion, project_stats, responses
+from app.billing import entitlements
+from app.db import get_db, get_sessionmaker
 from app.models.project import Project
+from app.models.project_deletion import ProjectDeletion
+from app.pagination import PageParams, keyset, split_page
 from app.rbac.deps import OrgContext, require_perm
-from app.schemas.projects import ProjectCreateIn, ProjectOut, ProjectUpdateIn
-from app.billing.gates import enforce_billing_writable, enforce_free_limits
+from app.schemas.pagination import Page
+from app.schemas.projects import (
+    ProjectCreateIn,
+    ProjectDeleteOut,
+    ProjectDeletionOut,
+    ProjectOut,
+    ProjectStatsOut,
+    ProjectUpdateIn,
+    ProjectWithStatsOut,
+)
 
 router = APIRouter(prefix="/orgs/{org_id}/projects", tags=["projects"])
 
 @router.post("", response_model=ProjectOut)
-def create_project(
+async def create_project(
     org_id: uuid.UUID,
     payload: ProjectCreateIn,
     ctx: OrgContext = Depends(require_perm("projects:create")),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> ProjectOut:
-    enforce_billing_writable(ctx.org)
-    if ctx.org.plan == "free":
-        enforce_free_limits(db, org_id, "projects")
+    await entitlements.check_write(db, org_id, "projects", adding=1)
 
     p = Project(org_id=org_id, name=payload.name)
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    await db.flush()
+    await change_version.bump(db, org_id, [p.id])
+    await db.commit()
+    await db.refresh(p)
     return ProjectOut(id=p.id, org_id=p.org_id, name=p.name)
 
-@router.get("", response_model=list[ProjectOut])
-def list_projects(
+@router.get("", response_model=Page[ProjectOut] | Page[ProjectWithStatsOut])
+async def list_projects(
     org_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    include: Literal["stats"] | None = Query(None),
+    page: PageParams = Depends(),
     ctx: OrgContext = Depends(require_perm("projects:read")),
-    db: Session = Depends(get_db),
-) -> list[ProjectOut]:
-    q = select(Project).where(Project.org_id == org_id).order_by(Project.created_at.desc())
-    rows = db.scalars(q).all()
-    return [ProjectOut(id=r.id, org_id=r.org_id, name=r.name) for r in rows]
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    # the org's version moves on task writes too; a poll after one of those
+    # gets the (unchanged) list again
+    tag = change_version.etag(request, await change_version.of_org(db, org_id))
+    if (not_modified := change_version.not_modified(request, tag, response)) is not None:
+        return not_modified
+
+    q = select(Project.id, Project.org_id, Project.name, Project.created_at).where(
+        Project.org_id == org_id, Project.deleting_at.is_(None)
+    )
+    rows, next_cursor = split_page(
+        (await db.execute(keyset(q, Project.created_at, Project.id, page))).all(), page
+    )
+    fields = ("id", "org_id", "name")
+    if include == "stats":
+        # from the rollup: a lookup per project on the page, not a task count
+        stats = await project_stats.for_projects(db, [r.id for r in rows])
+        rows = [(r.id, r.org_id, r.name, stats[r.id]) for r in rows]
+        fields += ("stats",)
+    return responses.page(rows, fields, next_cursor, response)
 
 @router.patch("/{project_id}", response_model=ProjectOut)
-def update_project(
+async def update_project(
     org_id: uuid.UUID,
     project_id: uuid.UUID,
     payload: ProjectUpdateIn,
     ctx: OrgContext = Depends(require_perm("projects:update")),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> ProjectOut:
-    enforce_billing_writable(ctx.org)
-    p = db.scalar(select(Project).where(Project.id == project_id, Project.org_id == org_id))
+    await entitlements.check_write(db, org_id, "projects")
+    p = await db.scalar(
+        select(Project).where(Project.id == project_id, Project.org_id == org_id, Project.deleting_at.is_(None))
+    )
     if p is None:
         raise HTTPException(status_code=404, detail="project not found")
     p.name = payload.name
+    p.change_seq = change_version.CHANGE_SEQ
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    await change_version.bump(db, org_id, [p.id])
+    await db.commit()
+    await db.refresh(p)
     return ProjectOut(id=p.id, org_id=p.org_id, name=p.name)
 
-@router.delete("/{project_id}")
-def delete_project(
+@router.get("/{project_id}/stats", response_model=ProjectStatsOut)
+async def get_project_stats(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    ctx: OrgContext = Depends(require_perm("projects:read")),
+    db: AsyncSession = Depends(get_db),
+) -> ProjectStatsOut:
+    ctx.require_project(project_id)
+    tag = change_version.etag(request, await change_version.of_project(db, project_id))
+    if (not_modified := change_version.not_modified(request, tag, response)) is not None:
+        return not_modified
+    return ProjectStatsOut(**(await project_stats.for_projects(db, [project_id]))[project_id])
+
+def _deletion_out(d: ProjectDeletion) -> ProjectDeletionOut:
+    return ProjectDeletionOut(
+        project_id=d.project_id,
+        status=d.status,
+        tasks_total=d.tasks_total,
+        tasks_purged=d.tasks_purged,
+        error=d.error,
+        created_at=d.created_at,
+        finished_at=d.finished_at,
+    )
+
+@router.delete("/{project_id}", response_model=ProjectDeleteOut)
+async def delete_project(
     org_id: uuid.UUID,
     project_id: uuid.UUID,
     ctx: OrgContext = Depends(require_perm("projects:delete")),
-    db: Session = Depends(get_db),
-) -> dict:
-    enforce_billing_writable(ctx.org)
-    p = db.scalar(select(Project).where(Project.id == project_id, Project.org_id == org_id))
+    db: AsyncSession = Depends(get_db),
+    sessions: async_sessionmaker[AsyncSession] = Depends(get_sessionmaker),
+) -> ProjectDeleteOut:
+    # the project disappears now; its tasks are purged in the background
+    # (app.project_deletion), progress at GET .../{project_id}/deletion
+    await entitlements.check_write(db, org_id, "projects")
+    p = await db.scalar(select(Project).where(Project.id == project_id, Project.org_id == org_id))
     if p is None:
         raise HTTPException(status_code=404, detail="project not found")
-    db.delete(p)
-    db.commit()
-    return {"deleted": True}
+
+    d = await db.get(ProjectDeletion, project_id)
+    if d is None:
+        # a concurrent DELETE may record it first; then this one reports that
+        await project_deletion.mark(db, p, ctx.user_id)
+        await db.commit()
+        d = await db.get(ProjectDeletion, project_id)
+    # deleting again resumes a purge that stalled; a running one is left alone
+    project_deletion.spawn(project_id, sessions)
+    return ProjectDeleteOut(deleted=True, deletion=_deletion_out(d))
+
+@router.get("/{project_id}/deletion", response_model=ProjectDeletionOut)
+async def get_project_deletion(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    ctx: OrgContext = Depends(require_perm("projects:read")),
+    db: AsyncSession = Depends(get_db),
+) -> ProjectDeletionOut:
+    d = await db.scalar(
+        select(ProjectDeletion).where(ProjectDeletion.project_id == project_id, ProjectDeletion.org_id == org_id)
+    )
+    if d is None:
+        raise HTTPException(status_code=404, detail="deletion not found")
+    return _deletion_out(d)
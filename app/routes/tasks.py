@@ -1,47 +1,67 @@
 import uuid
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.auth.deps import get_current_user
-from app.db import get_db
+from app.db import get_db, get_sessionmaker
+from app.config import settings
 from app.models.enums import Role
 from app.models.project import Project
 from app.models.task import Task
+from app.models.tombstone import Tombstone
 from app.models.user import User
+from app.pagination import PageParams, decode_cursor, keyset, split_page
 from app.rbac.deps import OrgContext, require_perm
-from app.schemas.tasks import TaskCreateIn, TaskOut, TaskUpdateIn
-from app.billing.gates import enforce_billing_writable, enforce_free_limits
+from app.task_filters import TaskFilters, apply_task_filters
+from app import change_version, responses, task_export, task_import, task_search
+from app.project_deletion import live_tasks
+from app.schemas.pagination import Page
+from app.schemas.tasks import (
+    TaskBatchCreateIn,
+    TaskBatchError,
+    TaskBatchOut,
+    TaskBatchUpdateIn,
+    TaskBatchUpdateOut,
+    TaskChangesIn,
+    TaskCreateIn,
+    TaskImportError,
+    TaskImportOut,
+    TaskImportStatusOut,
+    TaskOut,
+    TaskSearchOut,
+    TaskUpdateIn,
+)
+from app.billing import entitlements, usage
 
 router = APIRouter(prefix="/orgs/{org_id}", tags=["tasks"])
 
 @router.post("/projects/{project_id}/tasks", response_model=TaskOut)
-def create_task(
+async def create_task(
     org_id: uuid.UUID,
     project_id: uuid.UUID,
     payload: TaskCreateIn,
     ctx: OrgContext = Depends(require_perm("tasks:create")),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> TaskOut:
-    enforce_billing_writable(ctx.org)
-    if ctx.org.plan == "free":
-        enforce_free_limits(db, org_id, "tasks")
-    project = db.scalar(select(Project).where(Project.id == project_id, Project.org_id == org_id))
-    if project is None:
-        raise HTTPException(status_code=404, detail="project not found")
+    # 402 before 404, as before the project came with the auth context; a
+    # 404 rolls the usage counter back with the rest
+    await entitlements.check_write(db, org_id, "tasks", adding=1)
+    ctx.require_project(project_id)
 
     t = Task(
         org_id=org_id,
         project_id=project_id,
         title=payload.title,
-        created_by=user.id,
+        created_by=ctx.user_id,
         assigned_to=payload.assigned_to,
     )
     db.add(t)
-    db.commit()
-    db.refresh(t)
+    await change_version.bump(db, org_id, [project_id])
+    await db.commit()
+    await db.refresh(t)
     return TaskOut(
         id=t.id,
         org_id=t.org_id,
@@ -52,55 +72,398 @@ def create_task(
         assigned_to=t.assigned_to,
     )
 
-@router.get("/projects/{project_id}/tasks", response_model=list[TaskOut])
-def list_tasks(
+_TITLE_MAX = Task.__table__.c.title.type.length
+
+# TaskOut's fields, for INSERT/UPDATE ... RETURNING
+_OUT_COLUMNS = (
+    Task.id,
+    Task.org_id,
+    Task.project_id,
+    Task.title,
+    Task.status,
+    Task.created_by,
+    Task.assigned_to,
+)
+_OUT_FIELDS = tuple(c.key for c in _OUT_COLUMNS)
+
+@router.post("/projects/{project_id}/tasks:batch", response_model=TaskBatchOut)
+async def create_tasks_batch(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    payload: TaskBatchCreateIn,
+    ctx: OrgContext = Depends(require_perm("tasks:create")),
+    db: AsyncSession = Depends(get_db),
+) -> TaskBatchOut:
+    # one auth, one project check, one cap check and one INSERT for the lot.
+    # items that would fail the insert are reported and skipped; the rest
+    # are created together or not at all
+    ctx.require_project(project_id)
+
+    assignees = {t.assigned_to for t in payload.tasks if t.assigned_to is not None}
+    known = set(await db.scalars(select(User.id).where(User.id.in_(assignees)))) if assignees else set()
+
+    rows: list[dict] = []
+    errors: list[TaskBatchError] = []
+    for i, item in enumerate(payload.tasks):
+        if len(item.title) > _TITLE_MAX:
+            errors.append(TaskBatchError(index=i, detail="title too long"))
+        elif item.assigned_to is not None and item.assigned_to not in known:
+            errors.append(TaskBatchError(index=i, detail="assignee not found"))
+        else:
+            rows.append(
+                {
+                    "org_id": org_id,
+                    "project_id": project_id,
+                    "title": item.title,
+                    "created_by": ctx.user_id,
+                    "assigned_to": item.assigned_to,
+                }
+            )
+    await entitlements.check_write(db, org_id, "tasks", adding=len(rows))
+    if not rows:
+        return TaskBatchOut(created=[], errors=errors)
+
+    # executemany with RETURNING goes out as one multi-row INSERT (sqlalchemy
+    # "insertmanyvalues") from a cached statement, rows back in request order
+    returned = await db.execute(insert(Task).returning(*_OUT_COLUMNS, sort_by_parameter_order=True), rows)
+    created = [TaskOut(**r._mapping) for r in returned]
+    await change_version.bump(db, org_id, [project_id])
+    await db.commit()
+
+    return TaskBatchOut(created=created, errors=errors)
+
+@router.post("/projects/{project_id}/tasks:import", response_model=TaskImportOut)
+async def import_tasks(
     org_id: uuid.UUID,
     project_id: uuid.UUID,
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    import_id: uuid.UUID | None = Query(None),
+    ctx: OrgContext = Depends(require_perm("tasks:create")),
+    db: AsyncSession = Depends(get_db),
+) -> TaskImportOut:
+    # streamed body, validated in chunks and COPYed into staging, merged in
+    # one statement (app.task_import); all or nothing. progress at
+    # GET .../tasks:import/{import_id}: pick the id up front to follow a
+    # running upload
+    ctx.require_project(project_id)
+    import_id = import_id or uuid.uuid4()
+    result = task_import.ImportResult()
+
+    async def progress(r: task_import.ImportResult) -> None:
+        # the live counts, for the failed status too
+        nonlocal result
+        result = r
+        await task_import.save_status(org_id, project_id, import_id, "running", r)
+
+    await progress(result)
+    try:
+        result = await task_import.run(db, org_id, project_id, ctx.user_id, request.stream(), format, progress)
+        await db.commit()
+    except HTTPException as e:
+        await task_import.save_status(org_id, project_id, import_id, "failed", result, str(e.detail))
+        raise
+    except Exception:
+        await task_import.save_status(org_id, project_id, import_id, "failed", result, "import failed")
+        raise
+    await task_import.save_status(org_id, project_id, import_id, "done", result)
+    return TaskImportOut(
+        id=import_id,
+        imported=result.imported,
+        rejected=result.rejected,
+        errors=[TaskImportError(line=line, detail=detail) for line, detail in result.errors],
+    )
+
+@router.get("/projects/{project_id}/tasks:import/{import_id}", response_model=TaskImportStatusOut)
+async def get_task_import(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    import_id: uuid.UUID,
     ctx: OrgContext = Depends(require_perm("tasks:read")),
-    db: Session = Depends(get_db),
-) -> list[TaskOut]:
-    project = db.scalar(select(Project).where(Project.id == project_id, Project.org_id == org_id))
-    if project is None:
-        raise HTTPException(status_code=404, detail="project not found")
-
-    q = (
-        select(Task)
-        .where(Task.org_id == org_id, Task.project_id == project_id)
-        .order_by(Task.created_at.desc())
+) -> TaskImportStatusOut:
+    ctx.require_project(project_id)
+    status = await task_import.load_status(org_id, project_id, import_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="import not found")
+    return TaskImportStatusOut(id=import_id, **status)
+
+def _change_values(c: TaskChangesIn) -> dict:
+    values = {}
+    if c.title is not None:
+        values["title"] = c.title
+    if c.status is not None:
+        values["status"] = c.status
+    # explicit null unassigns, as in update_task
+    if "assigned_to" in c.model_fields_set:
+        values["assigned_to"] = c.assigned_to
+    if c.project_id is not None:
+        values["project_id"] = c.project_id
+    return values
+
+async def _change_errors(db: AsyncSession, org_id: uuid.UUID, change_sets: list[dict]) -> list[str | None]:
+    # what would make each change set fail the UPDATE; two queries for all
+    assignees = {v["assigned_to"] for v in change_sets if v.get("assigned_to") is not None}
+    projects = {v["project_id"] for v in change_sets if "project_id" in v}
+    known_users = set(await db.scalars(select(User.id).where(User.id.in_(assignees)))) if assignees else set()
+    known_projects = (
+        set(
+            await db.scalars(
+                select(Project.id).where(
+                    Project.org_id == org_id, Project.id.in_(projects), Project.deleting_at.is_(None)
+                )
+            )
+        )
+        if projects
+        else set()
     )
-    rows = db.scalars(q).all()
-    return [
-        TaskOut(
-            id=r.id,
-            org_id=r.org_id,
-            project_id=r.project_id,
-            title=r.title,
-            status=r.status,
-            created_by=r.created_by,
-            assigned_to=r.assigned_to,
+
+    errors: list[str | None] = []
+    for v in change_sets:
+        if not v:
+            errors.append("nothing to change")
+        elif len(v.get("title", "")) > _TITLE_MAX:
+            errors.append("title too long")
+        elif v.get("assigned_to") is not None and v["assigned_to"] not in known_users:
+            errors.append("assignee not found")
+        elif "project_id" in v and v["project_id"] not in known_projects:
+            errors.append("project not found")
+        else:
+            errors.append(None)
+    return errors
+
+async def _moved_from(db: AsyncSession, values: dict, scope: list, ids) -> set[uuid.UUID]:
+    # projects the tasks are in before a move, to bump their versions too.
+    # locks the rows first so a concurrent move can't slip in between
+    if "project_id" not in values:
+        return set()
+    return set(await db.scalars(select(Task.project_id).where(*scope, Task.id.in_(ids)).with_for_update()))
+
+@router.patch("/tasks:batch", response_model=TaskBatchUpdateOut)
+async def update_tasks_batch(
+    org_id: uuid.UUID,
+    payload: TaskBatchUpdateIn,
+    project_id: uuid.UUID | None = Query(None),
+    filters: TaskFilters = Depends(),
+    ctx: OrgContext = Depends(require_perm("tasks:update")),
+    db: AsyncSession = Depends(get_db),
+) -> TaskBatchUpdateOut:
+    """set-based batch update, one transaction.
+
+    items: per-task changes; tasks sharing a change set go out as one UPDATE.
+    changes: one change set for every task matched by project_id and the list
+    filters in the query string (at most task_batch_max_items of them). in
+    items mode the query string narrows too, e.g. ?status=todo to only move
+    tasks nobody has moved since.
+    """
+    await entitlements.check_write(db, org_id, "tasks")
+
+    scope = [Task.org_id == org_id, live_tasks(org_id)]
+    if project_id is not None:
+        scope.append(Task.project_id == project_id)
+    if ctx.membership.role == Role.member:
+        # only creator or assignee can edit (update_task's rule, in the WHERE)
+        scope.append(or_(Task.created_by == ctx.user_id, Task.assigned_to == ctx.user_id))
+
+    if payload.changes is not None:
+        if project_id is None and not filters.active():
+            raise HTTPException(status_code=400, detail="filter required")
+        values = _change_values(payload.changes)
+        error = (await _change_errors(db, org_id, [values]))[0]
+        if error is not None:
+            raise HTTPException(status_code=400, detail=error)
+
+        cap = settings.task_batch_max_items
+        matched = apply_task_filters(select(Task.id).where(*scope), filters).limit(cap + 1)
+        moved_from = await _moved_from(db, values, scope, matched)
+        stmt = apply_task_filters(update(Task).where(*scope, Task.id.in_(matched)), filters)
+        rows = (
+            await db.execute(
+                stmt.values({**values, "change_seq": change_version.CHANGE_SEQ})
+                .returning(*_OUT_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+        if len(rows) > cap:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=f"filter matches more than {cap} tasks")
+        if not rows:
+            # nothing written, no new version
+            return TaskBatchUpdateOut(updated=[], errors=[])
+        await change_version.bump(db, org_id, moved_from | {r.project_id for r in rows})
+        await db.commit()
+        return TaskBatchUpdateOut(updated=[TaskOut(**r._mapping) for r in rows], errors=[])
+
+    items = payload.items
+    change_sets = [_change_values(item) for item in items]
+    change_errors = await _change_errors(db, org_id, change_sets)
+
+    errors: list[TaskBatchError] = []
+    seen: set[uuid.UUID] = set()
+    groups: dict[tuple, list[tuple[int, uuid.UUID]]] = {}
+    for i, (item, values, error) in enumerate(zip(items, change_sets, change_errors)):
+        if item.id in seen:
+            error = "duplicate id"
+        seen.add(item.id)
+        if error is not None:
+            errors.append(TaskBatchError(index=i, detail=error))
+            continue
+        groups.setdefault(tuple(sorted(values.items(), key=lambda kv: kv[0])), []).append((i, item.id))
+    if not groups:
+        return TaskBatchUpdateOut(updated=[], errors=errors)
+
+    moved_from: set[uuid.UUID] = set()
+    for key, members in groups.items():
+        moved_from |= await _moved_from(db, dict(key), scope, [tid for _, tid in members])
+
+    updated: dict[uuid.UUID, TaskOut] = {}
+    for key, members in groups.items():
+        stmt = apply_task_filters(update(Task).where(*scope, Task.id.in_([tid for _, tid in members])), filters)
+        returned = await db.execute(
+            stmt.values({**dict(key), "change_seq": change_version.CHANGE_SEQ})
+            .returning(*_OUT_COLUMNS)
+            .execution_options(synchronize_session=False)
         )
-        for r in rows
-    ]
+        updated.update((r.id, TaskOut(**r._mapping)) for r in returned)
+
+    missing = [(i, tid) for members in groups.values() for i, tid in members if tid not in updated]
+    if missing:
+        # say why each one was left alone
+        found = {
+            r.id: r
+            for r in await db.execute(
+                select(Task.id, Task.created_by, Task.assigned_to).where(
+                    Task.org_id == org_id, live_tasks(org_id), Task.id.in_([tid for _, tid in missing])
+                )
+            )
+        }
+        for i, tid in missing:
+            r = found.get(tid)
+            if r is None:
+                detail = "task not found"
+            elif ctx.membership.role == Role.member and ctx.user_id not in (r.created_by, r.assigned_to):
+                detail = "forbidden"
+            else:
+                detail = "not matched"
+            errors.append(TaskBatchError(index=i, detail=detail))
+    if updated:
+        await change_version.bump(db, org_id, moved_from | {t.project_id for t in updated.values()})
+        await db.commit()
+
+    return TaskBatchUpdateOut(
+        updated=[updated[tid] for tid in dict.fromkeys(item.id for item in items) if tid in updated],
+        errors=sorted(errors, key=lambda e: e.index),
+    )
+
+def _list_statement(org_id: uuid.UUID, project_id: uuid.UUID, filters: TaskFilters, page: PageParams):
+    # list_tasks' query (tests/test_task_filter_plans.py EXPLAINs it)
+    q = select(*_OUT_COLUMNS, Task.created_at).where(Task.org_id == org_id, Task.project_id == project_id)
+    return keyset(apply_task_filters(q, filters), Task.created_at, Task.id, page)
+
+@router.get("/projects/{project_id}/tasks", response_model=Page[TaskOut])
+async def list_tasks(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    filters: TaskFilters = Depends(),
+    ctx: OrgContext = Depends(require_perm("tasks:read")),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    ctx.require_project(project_id)
+    tag = change_version.etag(request, await change_version.of_project(db, project_id))
+    if (not_modified := change_version.not_modified(request, tag, response)) is not None:
+        return not_modified
+
+    rows, next_cursor = split_page((await db.execute(_list_statement(org_id, project_id, filters, page))).all(), page)
+    # column tuples encoded in one go (app.responses), no ORM objects
+    return responses.page(rows, _OUT_FIELDS, next_cursor, response)
+
+@router.get("/tasks/export", response_class=StreamingResponse)
+async def export_tasks(
+    org_id: uuid.UUID,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    project_id: uuid.UUID | None = Query(None),
+    cursor: str | None = Query(None),
+    filters: TaskFilters = Depends(),
+    ctx: OrgContext = Depends(require_perm("tasks:read")),
+    sessions: async_sessionmaker[AsyncSession] = Depends(get_sessionmaker),
+) -> StreamingResponse:
+    # every task in the org (or project), newest first, streamed from one
+    # snapshot; resume an interrupted export with the last row's cursor
+    after = decode_cursor(cursor) if cursor else None
+    stmt = task_export.statement(org_id, project_id, filters, after)
+    return StreamingResponse(
+        task_export.stream(sessions, stmt, format),
+        media_type=task_export.MEDIA_TYPES[format],
+        headers={"content-disposition": f'attachment; filename="tasks-{org_id}.{format}"'},
+    )
+
+@router.get("/tasks/search", response_model=Page[TaskSearchOut])
+async def search_tasks(
+    org_id: uuid.UUID,
+    q: str = Query(..., min_length=1, max_length=200),
+    project_id: uuid.UUID | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    filters: TaskFilters = Depends(),
+    ctx: OrgContext = Depends(require_perm("tasks:read")),
+    db: AsyncSession = Depends(get_db),
+) -> Page[TaskSearchOut]:
+    after = task_search.decode_cursor(cursor) if cursor else None
+    tsquery_text = task_search.to_tsquery_text(q)
+    if tsquery_text is None:
+        return Page(items=[])
+    tsquery = await task_search.tsquery(db, org_id, tsquery_text)
+
+    stmt = select(*Task.__table__.c).where(Task.org_id == org_id, live_tasks(org_id))
+    if project_id is not None:
+        stmt = stmt.where(Task.project_id == project_id)
+    stmt = task_search.search(apply_task_filters(stmt, filters), org_id, tsquery, after, limit)
+
+    rows = (await db.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        t, r = rows[-1]
+        next_cursor = task_search.encode_cursor(r, t.created_at, t.id)
+
+    return Page(
+        items=[
+            TaskSearchOut(
+                id=t.id,
+                org_id=t.org_id,
+                project_id=t.project_id,
+                title=t.title,
+                status=t.status,
+                created_by=t.created_by,
+                assigned_to=t.assigned_to,
+                rank=r,
+            )
+            for t, r in rows
+        ],
+        next_cursor=next_cursor,
+    )
 
 @router.patch("/tasks/{task_id}", response_model=TaskOut)
-def update_task(
+async def update_task(
     org_id: uuid.UUID,
     task_id: uuid.UUID,
     payload: TaskUpdateIn,
     ctx: OrgContext = Depends(require_perm("tasks:update")),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> TaskOut:
-    enforce_billing_writable(ctx.org)
-    t = db.scalar(select(Task).where(Task.id == task_id, Task.org_id == org_id))
+    await entitlements.check_write(db, org_id, "tasks")
+    t = await db.scalar(select(Task).where(Task.id == task_id, Task.org_id == org_id, live_tasks(org_id)))
     if t is None:
         raise HTTPException(status_code=404, detail="task not found")
 
     # only creator or assignee can edit
     if ctx.membership.role == Role.member:
-        if t.created_by != user.id and t.assigned_to != user.id:
+        if t.created_by != ctx.user_id and t.assigned_to != ctx.user_id:
             raise HTTPException(status_code=403, detail="forbidden")
 
+    t.change_seq = change_version.CHANGE_SEQ
     if payload.title is not None:
         t.title = payload.title
     if payload.status is not None:
@@ -111,8 +474,9 @@ def update_task(
         t.assigned_to = payload.assigned_to
 
     db.add(t)
-    db.commit()
-    db.refresh(t)
+    await change_version.bump(db, org_id, [t.project_id])
+    await db.commit()
+    await db.refresh(t)
     return TaskOut(
         id=t.id,
         org_id=t.org_id,
@@ -124,16 +488,20 @@ def update_task(
     )
 
 @router.delete("/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     org_id: uuid.UUID,
     task_id: uuid.UUID,
     ctx: OrgContext = Depends(require_perm("tasks:delete")),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
-    enforce_billing_writable(ctx.org)
-    t = db.scalar(select(Task).where(Task.id == task_id, Task.org_id == org_id))
+    await entitlements.check_write(db, org_id, "tasks")
+    t = await db.scalar(select(Task).where(Task.id == task_id, Task.org_id == org_id, live_tasks(org_id)))
     if t is None:
         raise HTTPException(status_code=404, detail="task not found")
-    db.delete(t)
-    db.commit()
+    # the usage counter before the delete's stats trigger (app.project_stats)
+    await usage.release(db, org_id, "tasks")
+    await db.delete(t)
+    db.add(Tombstone(id=t.id, org_id=org_id, kind="task"))
+    await change_version.bump(db, org_id, [t.project_id])
+    await db.commit()
     return {"deleted": True}
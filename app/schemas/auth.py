@@ -10,6 +10,12 @@ class RequestLinkOut(BaseModel):
 
 class RedeemIn(BaseModel):
     token: str
+    # opt in to org_id -> role claims in the access token
+    include_memberships: bool = False
+
+class RefreshIn(BaseModel):
+    # None keeps whatever the presented token had
+    include_memberships: bool | None = None
 
 class RedeemOut(BaseModel):
     access_token: str
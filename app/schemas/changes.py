@@ -0,0 +1,23 @@
+import uuid
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app.schemas.projects import ProjectOut
+from app.schemas.tasks import TaskOut
+
+class ChangeOut(BaseModel):
+    # the transaction the row was last written in (app.change_feed)
+    seq: int
+    type: Literal["project", "task"]
+    op: Literal["upsert", "delete"]
+    id: uuid.UUID
+    # the row as it is now; None for a delete
+    data: ProjectOut | TaskOut | None
+
+class ChangesOut(BaseModel):
+    items: list[ChangeOut]
+    # pass as ?since= next time, whether or not there were changes
+    since: str
+    # more changes are already waiting: ask again right away
+    has_more: bool
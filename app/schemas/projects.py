@@ -1,4 +1,6 @@
 import uuid
+from datetime import datetime
+
 from pydantic import BaseModel
 
 class ProjectCreateIn(BaseModel):
@@ -11,3 +13,36 @@ class ProjectOut(BaseModel):
     id: uuid.UUID
     org_id: uuid.UUID
     name: str
+
+class AssigneeStatsOut(BaseModel):
+    # null: unassigned tasks
+    assigned_to: uuid.UUID | None
+    todo: int
+    doing: int
+    done: int
+
+class ProjectStatsOut(BaseModel):
+    todo: int
+    doing: int
+    done: int
+    total: int
+    # last task insert, update or delete; None for a project that never had tasks
+    last_activity_at: datetime | None
+    by_assignee: list[AssigneeStatsOut]
+
+class ProjectWithStatsOut(ProjectOut):
+    stats: ProjectStatsOut
+
+class ProjectDeletionOut(BaseModel):
+    project_id: uuid.UUID
+    status: str
+    # None until the purge has counted them
+    tasks_total: int | None
+    tasks_purged: int
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+class ProjectDeleteOut(BaseModel):
+    deleted: bool
+    deletion: ProjectDeletionOut
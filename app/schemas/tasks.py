@@ -1,6 +1,7 @@
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
+from app.config import settings
 from app.models.enums import TaskStatus
 
 class TaskCreateIn(BaseModel):
@@ -20,3 +21,64 @@ class TaskOut(BaseModel):
     status: TaskStatus
     created_by: uuid.UUID
     assigned_to: uuid.UUID | None
+
+class TaskSearchOut(TaskOut):
+    rank: float
+
+class TaskBatchCreateIn(BaseModel):
+    tasks: list[TaskCreateIn] = Field(..., min_length=1, max_length=settings.task_batch_max_items)
+
+class TaskBatchError(BaseModel):
+    index: int
+    detail: str
+
+class TaskBatchOut(BaseModel):
+    # created keeps request order; errors point back into the request by index
+    created: list[TaskOut]
+    errors: list[TaskBatchError]
+
+class TaskImportError(BaseModel):
+    line: int
+    detail: str
+
+class TaskImportOut(BaseModel):
+    # rejected counts every skipped record, errors lists the first 100
+    id: uuid.UUID
+    imported: int
+    rejected: int
+    errors: list[TaskImportError]
+
+class TaskImportStatusOut(BaseModel):
+    id: uuid.UUID
+    # running, done or failed
+    state: str
+    read: int
+    staged: int
+    rejected: int
+    # set once done
+    imported: int
+    # why it failed
+    detail: str | None
+
+class TaskChangesIn(TaskUpdateIn):
+    # moves the task when set
+    project_id: uuid.UUID | None = None
+
+class TaskBatchUpdateItem(TaskChangesIn):
+    id: uuid.UUID
+
+class TaskBatchUpdateIn(BaseModel):
+    # either per-task changes, or one change set for every task the query
+    # string filters match
+    items: list[TaskBatchUpdateItem] | None = Field(None, min_length=1, max_length=settings.task_batch_max_items)
+    changes: TaskChangesIn | None = None
+
+    @model_validator(mode="after")
+    def _one_mode(self) -> "TaskBatchUpdateIn":
+        if (self.items is None) == (self.changes is None):
+            raise ValueError("send either items or changes")
+        return self
+
+class TaskBatchUpdateOut(BaseModel):
+    updated: list[TaskOut]
+    errors: list[TaskBatchError]
@@ -0,0 +1,87 @@
+"""streaming task export (GET /orgs/{org_id}/tasks/export).
+
+rows come off a server-side cursor task_export_batch_size at a time and
+each batch goes out as one chunk of the response, so memory is one batch
+whatever the size of the org. the query runs on its own session (the
+request's is closed before the body streams) in a REPEATABLE READ, read
+only transaction: every row comes from the snapshot taken when the first
+batch is read.
+
+order is the list endpoints' keyset, newest first on (created_at, id), and
+every row carries the cursor of its position. a client that lost the
+connection asks again with ?cursor= set to the last cursor it received and
+gets the rest. the resumed part reads a new snapshot: tasks created since
+the first request aren't in it (they sort before the cursor), ones deleted
+since are gone.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.task import Task
+from app.pagination import encode_cursor
+from app.project_deletion import live_tasks
+from app.task_filters import TaskFilters, apply_task_filters
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+COLUMNS = ("id", "project_id", "title", "status", "created_by", "assigned_to", "created_at", "updated_at")
+
+def statement(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID | None,
+    filters: TaskFilters,
+    after: tuple[datetime, uuid.UUID] | None,
+) -> Select:
+    stmt = select(*(Task.__table__.c[c] for c in COLUMNS)).where(Task.org_id == org_id, live_tasks(org_id))
+    if project_id is not None:
+        stmt = stmt.where(Task.project_id == project_id)
+    if after is not None:
+        stmt = stmt.where(tuple_(Task.created_at, Task.id) < tuple_(*after))
+    return apply_task_filters(stmt, filters).order_by(Task.created_at.desc(), Task.id.desc())
+
+def _values(r) -> list:
+    return [
+        str(r.id),
+        str(r.project_id),
+        r.title,
+        r.status.value,
+        str(r.created_by),
+        str(r.assigned_to) if r.assigned_to is not None else None,
+        r.created_at.isoformat(),
+        r.updated_at.isoformat(),
+        encode_cursor(r.created_at, r.id),
+    ]
+
+_KEYS = (*COLUMNS, "cursor")
+
+def _ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(_KEYS, _values(r))), ensure_ascii=False, separators=(",", ":")) + "\n" for r in rows
+    ).encode("utf-8")
+
+def _csv(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(_values(r) for r in rows)
+    return buf.getvalue().encode("utf-8")
+
+async def stream(sessions: async_sessionmaker[AsyncSession], stmt: Select, fmt: str) -> AsyncIterator[bytes]:
+    encode = _csv if fmt == "csv" else _ndjson
+    if fmt == "csv":
+        yield (",".join(_KEYS) + "\n").encode("utf-8")
+
+    async with sessions() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+        # yield_per: psycopg named (server-side) cursor, fetched a batch at a time
+        result = await db.stream(stmt.execution_options(yield_per=settings.task_export_batch_size))
+        async for rows in result.partitions():
+            yield encode(rows)
@@ -0,0 +1,291 @@
+"""bulk task import (POST .../tasks:import, scripts/import_tasks.py).
+
+the upload is parsed as it arrives, task_import_chunk_size records at a
+time, and every record that validates is written straight into a temp
+staging table through psycopg's `COPY ... FROM STDIN`; nothing is held
+beyond one chunk. once the stream ends, one set-based statement finds
+staged rows whose assignee doesn't exist, the free plan cap is checked for
+the rest in one go, and one `INSERT ... SELECT` merges them into tasks.
+all of it is one transaction: the import lands whole or not at all.
+
+formats: NDJSON (one object per line) or CSV with a header row. fields
+are title (required), status (default todo) and assigned_to; anything else
+is ignored, so an export (app.task_export) imports as is. tasks keep the
+file's order (the last record is the newest).
+
+over http, an import's progress is kept in redis under an id the client
+can choose (import_id) and read back from another request while the upload
+runs: GET .../tasks:import/{import_id}. it is best effort, like the caches:
+if redis is down the import still runs, only its status is missing.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import inspect
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import change_version
+from app.billing import entitlements, usage
+from app.config import settings
+from app.models.enums import TaskStatus
+from app.models.task import Task
+from app.redis_client import get_redis, mark_redis_failed, redis_backing_off
+
+FORMATS = ("ndjson", "csv")
+MAX_ERRORS = 100
+
+_TITLE_MAX = Task.__table__.c.title.type.length
+_STATUSES = {s.value for s in TaskStatus}
+
+_STAGE = """
+create temp table task_import (
+    line integer not null,
+    title text not null,
+    status task_status not null,
+    assigned_to uuid
+) on commit drop
+"""
+
+_COPY = "copy task_import (line, title, status, assigned_to) from stdin"
+
+_UNKNOWN_ASSIGNEES = """
+select s.line, count(*) over () as total from task_import s
+where s.assigned_to is not null
+  and not exists (select 1 from users u where u.id = s.assigned_to)
+order by s.line
+limit :n
+"""
+
+# created_at steps back a microsecond per record from the end of the file,
+# so lists show the import in file order
+_MERGE = """
+insert into tasks (id, org_id, project_id, title, status, created_by, assigned_to, created_at, updated_at)
+select gen_random_uuid(), :org_id, :project_id, s.title, s.status, :user_id, s.assigned_to, t.ts, t.ts
+from task_import s,
+     lateral (select now() - make_interval(secs => (:last_line - s.line) / 1000000.0) as ts) t
+where s.assigned_to is null or exists (select 1 from users u where u.id = s.assigned_to)
+"""
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    staged: int = 0
+    imported: int = 0
+    rejected: int = 0
+    # (line, detail), the first MAX_ERRORS of them
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    # upload parsed and copied into staging / everything
+    staged_seconds: float = 0.0
+    seconds: float = 0.0
+
+    def reject(self, line: int, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, detail))
+
+def _validate(fields: dict) -> tuple[str, str, str | None] | str:
+    # -> (title, status, assigned_to) or an error detail
+    title = fields.get("title")
+    if not isinstance(title, str) or not title.strip():
+        return "title missing"
+    if len(title) > _TITLE_MAX:
+        return "title too long"
+    status = fields.get("status") or "todo"
+    if not isinstance(status, str) or status not in _STATUSES:
+        return "unknown status"
+    assigned_to = fields.get("assigned_to") or None
+    if assigned_to is not None:
+        try:
+            assigned_to = str(uuid.UUID(assigned_to))
+        except (TypeError, ValueError, AttributeError):
+            return "invalid assigned_to"
+    return title, status, assigned_to
+
+class _Parser:
+    """bytes in, (line, fields dict | error detail) out, a chunk at a time."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._decode = codecs.getincrementaldecoder("utf-8")(errors="replace").decode
+        self._tail = ""
+        self._line = 0
+        # csv: physical lines of a record whose quoted field spans lines
+        self._record: list[str] = []
+        self._record_line = 0
+        self._header: list[str] | None = None
+
+    def feed(self, data: bytes, final: bool = False) -> list[tuple[int, dict | str]]:
+        lines = (self._tail + self._decode(data, final)).split("\n")
+        self._tail = "" if final else lines.pop()
+        out: list[tuple[int, dict | str]] = []
+        for raw in lines:
+            self._line += 1
+            line = raw[:-1] if raw.endswith("\r") else raw
+            if self.fmt == "csv":
+                self._csv_line(line, out)
+            elif line.strip():
+                out.append((self._line, self._ndjson(line)))
+        if final and self._record:
+            out.append((self._record_line, "unterminated quoted field"))
+        return out
+
+    @staticmethod
+    def _ndjson(line: str) -> dict | str:
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            return "invalid json"
+        return fields if isinstance(fields, dict) else "not a json object"
+
+    def _csv_line(self, line: str, out: list) -> None:
+        if not self._record:
+            if not line.strip():
+                return
+            self._record_line = self._line
+        self._record.append(line)
+        # rfc 4180 doubles quotes inside quoted fields: an odd count so far
+        # means the record goes on past this line
+        if sum(part.count('"') for part in self._record) % 2:
+            return
+        values = next(csv.reader(["\n".join(self._record)]))
+        self._record = []
+        if self._header is None:
+            self._header = [v.strip().lower() for v in values]
+            if "title" not in self._header:
+                raise HTTPException(status_code=400, detail="csv header needs a title column")
+            return
+        out.append((self._record_line, dict(zip(self._header, values))))
+
+async def _report(on_progress, result: ImportResult) -> None:
+    if on_progress is not None and inspect.isawaitable(out := on_progress(result)):
+        await out
+
+def _status_key(org_id: uuid.UUID, project_id: uuid.UUID, import_id: uuid.UUID) -> str:
+    return f"import:{org_id}:{project_id}:{import_id}"
+
+async def save_status(
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    import_id: uuid.UUID,
+    state: str,
+    result: ImportResult,
+    detail: str | None = None,
+) -> None:
+    """record an import's progress: state is running, done or failed."""
+    if redis_backing_off():
+        return
+    key = _status_key(org_id, project_id, import_id)
+    fields = {
+        "state": state,
+        "read": result.read,
+        "staged": result.staged,
+        "rejected": result.rejected,
+        "imported": result.imported,
+        "detail": detail or "",
+    }
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.hset(key, mapping=fields)
+    pipe.expire(key, max(1, int(settings.task_import_status_ttl_seconds)))
+    try:
+        await pipe.execute()
+    except Exception:
+        mark_redis_failed()
+
+async def load_status(org_id: uuid.UUID, project_id: uuid.UUID, import_id: uuid.UUID) -> dict | None:
+    """what save_status last recorded, None if nothing (or redis is down)."""
+    if redis_backing_off():
+        return None
+    try:
+        raw = await get_redis().hgetall(_status_key(org_id, project_id, import_id))
+    except Exception:
+        mark_redis_failed()
+        return None
+    if not raw:
+        return None
+    out: dict = {k: int(raw[k]) for k in ("read", "staged", "rejected", "imported")}
+    return out | {"state": raw["state"], "detail": raw["detail"] or None}
+
+async def run(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    project_id: uuid.UUID,
+    user_id: uuid.UUID,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    on_progress: Callable[[ImportResult], Awaitable[None] | None] | None = None,
+) -> ImportResult:
+    """stage, check and merge an upload into the project, with its change
+    versions (app.change_version). caller commits. on_progress (sync or
+    async) gets the running counts after every chunk and once at the end.
+
+    raises 402 (billing, free plan cap) before anything is merged; the
+    free cap also stops the upload early once it can't fit any more.
+    """
+    t0 = time.perf_counter()
+    ent = await entitlements.check_write(db, org_id, "tasks")
+    cap = ent.limit("tasks")
+    result = ImportResult()
+    parser = _Parser(fmt)
+    last_line = 0
+
+    await db.execute(text(_STAGE))
+    raw = await (await db.connection()).get_raw_connection()
+    async with raw.driver_connection.cursor() as cur:
+        async with cur.copy(_COPY) as copy:
+
+            async def stage(records: list[tuple[int, dict | str]]) -> None:
+                nonlocal last_line
+                for line, fields in records:
+                    result.read += 1
+                    row = _validate(fields) if isinstance(fields, dict) else fields
+                    if isinstance(row, str):
+                        result.reject(line, row)
+                        continue
+                    await copy.write_row((line, *row))
+                    result.staged += 1
+                    last_line = line
+                if cap is not None and result.staged > cap:
+                    raise HTTPException(status_code=402, detail="free_plan_task_limit")
+                await _report(on_progress, result)
+
+            pending: list[tuple[int, dict | str]] = []
+            async for data in chunks:
+                pending.extend(parser.feed(data))
+                if len(pending) >= settings.task_import_chunk_size:
+                    await stage(pending)
+                    pending = []
+            await stage(pending + parser.feed(b"", final=True))
+    result.staged_seconds = time.perf_counter() - t0
+
+    unknown = (await db.execute(text(_UNKNOWN_ASSIGNEES), {"n": MAX_ERRORS})).all()
+    if unknown:
+        result.rejected += unknown[0].total
+        result.errors = sorted(result.errors + [(r.line, "assignee not found") for r in unknown])[:MAX_ERRORS]
+
+    # counted (and capped on free) for what the merge will insert, before it
+    # writes tasks: the usage row comes before the project's stats rows
+    # (app.project_stats), which the merge locks
+    adding = result.read - result.rejected
+    await entitlements.check_write(db, org_id, "tasks", adding=adding)
+    if adding:
+        merged = await db.execute(
+            text(_MERGE),
+            {"org_id": org_id, "project_id": project_id, "user_id": user_id, "last_line": last_line},
+        )
+        result.imported = merged.rowcount
+        if result.imported < adding:
+            # an assignee deleted since the check
+            await usage.release(db, org_id, "tasks", adding - result.imported)
+        await change_version.bump(db, org_id, [project_id])
+    result.seconds = time.perf_counter() - t0
+    await _report(on_progress, result)
+    return result
@@ -0,0 +1,128 @@
+"""ranked title search over an org's tasks (tasks.search_tsv, migrations 0007, 0015).
+
+the query string is reduced to words; every word must match, the last one
+as a prefix while it is still being typed. the newest task_search_max_candidates
+matches are ranked by ts_rank_cd, then newest first, and paged with an
+opaque (rank, created_at, id) cursor.
+
+ranking has to read every candidate's tsvector from the heap, so the
+candidate cap is what keeps broad terms ("bug", "fix") bounded: postgres
+walks ix_tasks_org_created_id until it has enough matches instead of
+ranking a sizeable share of the org. selective terms go through the gin
+index and are ranked in full.
+
+search_tsv lexemes are keyed by org, so the gin index only reads the
+searching org's postings. a prefix term is looked up in the org's words
+(task_search_words) first and searched as those words ("log" -> 'login' |
+'logout'): gin can skip through exact entries, but a prefix match collects
+every posting the prefix covers before the other words narrow it down. a
+prefix that matches no words, or more than MAX_PREFIX_WORDS, stays a prefix
+match.
+"""
+from __future__ import annotations
+
+import base64
+import re
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Double, Select, cast, desc, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSQUERY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import settings
+
+from app.models.task import Task
+from app.models.task_search_word import TaskSearchWord
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+MAX_PREFIX_WORDS = 64
+
+def to_tsquery_text(q: str) -> str | None:
+    # "fix login bu" -> "fix & login & bu:*"; None if nothing searchable.
+    # a trailing separator ("fix login ") means the last word is complete:
+    # exact lookups are much cheaper than prefix ones on common words.
+    # words are \w+ only, so no tsquery operators get through
+    words = [w.lower() for w in _WORD.findall(q)][:MAX_TERMS]
+    if not words:
+        return None
+    if not _WORD.match(q[-1]):
+        return " & ".join(words)
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+def _tsquery(tsquery_text: str):
+    return func.to_tsquery(literal("simple", REGCONFIG), tsquery_text)
+
+def _quote(word: str) -> str:
+    # a lexeme as tsquery input, taken as is (to_tsquery would parse it again)
+    return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+
+async def tsquery(db: AsyncSession, org_id: uuid.UUID, tsquery_text: str) -> ColumnElement:
+    """the query for to_tsquery_text() output, its prefix term expanded to
+    the org's words."""
+    if not tsquery_text.endswith(":*"):
+        return _tsquery(tsquery_text)
+    *complete, prefix = tsquery_text.split(" & ")
+    # \w+ words: "_" is the only LIKE wildcard they can hold
+    pattern = prefix[:-2].replace("_", "\\_") + "%"
+    words = (
+        await db.scalars(
+            select(TaskSearchWord.word)
+            .where(TaskSearchWord.org_id == org_id, TaskSearchWord.word.like(pattern))
+            .limit(MAX_PREFIX_WORDS + 1)
+        )
+    ).all()
+    if not words or len(words) > MAX_PREFIX_WORDS:
+        return _tsquery(tsquery_text)
+    expanded = cast(literal(" | ".join(map(_quote, words))), TSQUERY)
+    return _tsquery(" & ".join(complete)).op("&&")(expanded) if complete else expanded
+
+def encode_cursor(rank: float, created_at: datetime, id_: uuid.UUID) -> str:
+    raw = f"{rank!r}|{created_at.isoformat()}|{id_}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple[float, datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        rank, ts, id_ = raw.split("|", 2)
+        created_at = datetime.fromisoformat(ts)
+        if created_at.tzinfo is None:
+            raise ValueError("naive timestamp")
+        return float(rank), created_at, uuid.UUID(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def search(
+    candidates: Select,
+    org_id: uuid.UUID,
+    query: ColumnElement,
+    after: tuple[float, datetime, uuid.UUID] | None,
+    limit: int,
+) -> Select:
+    """rows of (Task, rank) for one page of tsquery() matches.
+
+    candidates selects the tasks.* columns, already narrowed to org_id (and
+    project / list filters). one extra row tells us whether there is a next
+    page.
+    """
+    # constant, so postgres keys the lexemes at plan time and estimates
+    # from search_tsv's statistics
+    query = func.task_search_tsquery(org_id, query)
+    newest = (
+        candidates.where(Task.search_tsv.op("@@")(query))
+        .order_by(Task.created_at.desc(), Task.id.desc())
+        .limit(settings.task_search_max_candidates)
+        .subquery("candidates")
+    )
+    t = aliased(Task, newest)
+    # ts_rank_cd is float4; as float8 its text form round-trips through the
+    # cursor exactly, so (rank, ...) < cursor neither skips nor repeats rows
+    rank = cast(func.ts_rank_cd(newest.c.search_tsv, query), Double)
+
+    q = select(t, rank.label("rank"))
+    if after is not None:
+        q = q.where(tuple_(rank, t.created_at, t.id) < tuple_(*after))
+    return q.order_by(desc(rank), t.created_at.desc(), t.id.desc()).limit(limit + 1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""client sync: re-downloading every task list vs the change feed.
+
+drives the app in-process (httpx ASGI transport, no server). an org on the
+pro plan gets --projects projects and --tasks tasks straight into postgres,
+then --changed of them are edited (and one deleted) through the api. a
+client that already has everything catches up by:
+
+- full resync: every project's task list, page by page (limit --limit)
+- change feed: GET /orgs/{org_id}/changes?since=<token from before the edits>
+
+the first sync through the feed (no token) is timed too. last, --writers
+concurrent task creates check that the feed hands out every write once,
+each with its own transaction id. run with RATE_LIMIT_ENABLED=false and
+TENANT_QUOTA_ENABLED=false. needs postgres (DATABASE_URL) and redis
+(REDIS_URL); the seed is removed at the end.
+
+    python -m scripts.bench_change_feed --tasks 100000 --changed 20 --runs 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from app import change_feed
+from app.db import async_engine
+from app.main import app
+from app.redis_client import close_redis
+
+_SEED = """
+update orgs set plan = 'pro', subscription_status = 'active' where id = :org;
+insert into projects(id, org_id, name)
+select gen_random_uuid(), :org, 'bench feed ' || g from generate_series(2, :projects) g;
+insert into tasks(id, org_id, project_id, title, status, created_by, created_at, updated_at)
+select gen_random_uuid(), :org, p.ids[1 + g % array_length(p.ids, 1)], 'synced task ' || g, 'todo', :user, ts, ts
+from (select array_agg(id) as ids from projects where org_id = :org) p,
+     generate_series(1, :n) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts) t;
+analyze tasks
+"""
+
+_CLEANUP = """
+delete from tombstones where org_id = :org;
+delete from tasks where org_id = :org;
+delete from project_deletions where org_id = :org;
+delete from projects where org_id = :org;
+delete from org_usage where org_id = :org;
+delete from memberships where org_id = :org;
+delete from orgs where id = :org;
+delete from auth_magic_links where user_id = :user;
+delete from users where id = :user
+"""
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _setup(c: httpx.AsyncClient) -> tuple[dict[str, str], str]:
+    r = await c.post("/auth/request-link", json={"email": f"bench_feed_{uuid.uuid4().hex[:10]}@example.com"})
+    r.raise_for_status()
+    r = await c.post("/auth/redeem", json={"token": r.json()["token"]})
+    r.raise_for_status()
+    h = {"authorization": f"bearer {r.json()['access_token']}"}
+    r = await c.post("/orgs", json={"name": "bench feed"}, headers=h)
+    r.raise_for_status()
+    org_id = r.json()["id"]
+    r = await c.post(f"/orgs/{org_id}/projects", json={"name": "bench feed 1"}, headers=h)
+    r.raise_for_status()
+    return h, org_id
+
+async def _get_all(
+    c: httpx.AsyncClient, path: str, params: dict, h: dict[str, str], cursor_key: str
+) -> tuple[int, int, int]:
+    # follow a paged list to its end -> requests, items, body bytes
+    requests = items = size = 0
+    params = dict(params)
+    while True:
+        r = await c.get(path, params=params, headers=h)
+        r.raise_for_status()
+        body = r.json()
+        requests, items, size = requests + 1, items + len(body["items"]), size + len(r.content)
+        if cursor_key == "since":
+            if not body["has_more"]:
+                return requests, items, size
+            params["since"] = body["since"]
+        else:
+            if body["next_cursor"] is None:
+                return requests, items, size
+            params["cursor"] = body["next_cursor"]
+
+async def _resync(c, org_id: str, h: dict[str, str], limit: int) -> tuple[int, int, int]:
+    r = await c.get(f"/orgs/{org_id}/projects", params={"limit": 200}, headers=h)
+    r.raise_for_status()
+    total = (1, 0, len(r.content))
+    for p in r.json()["items"]:
+        got = await _get_all(c, f"/orgs/{org_id}/projects/{p['id']}/tasks", {"limit": limit}, h, "cursor")
+        total = tuple(a + b for a, b in zip(total, got))
+    return total
+
+async def _timed(runs: int, fn) -> tuple[dict, tuple[int, int, int]]:
+    lat = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = await fn()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50": statistics.median(lat), "p95": _pct(lat, 95)}, out
+
+async def _main(ns: argparse.Namespace) -> tuple[list[dict], dict]:
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        h, org_id = await _setup(c)
+        params = {"org": org_id}
+        async with async_engine.begin() as conn:
+            params["user"] = await conn.scalar(text("select user_id from memberships where org_id = :org"), params)
+            t0 = time.perf_counter()
+            for stmt in filter(str.strip, _SEED.split(";")):
+                await conn.execute(text(stmt), dict(params, n=ns.tasks, projects=ns.projects))
+            edited = list(await conn.scalars(
+                text("select id from tasks where org_id = :org order by random() limit :k"),
+                dict(params, k=ns.changed + 1),
+            ))
+        print(f"seeded {ns.tasks} tasks in {ns.projects} projects in {time.perf_counter() - t0:.1f}s\n")
+        # a client that had everything up to here: the seed's transaction
+        # and every one before it have ended
+        async with async_engine.connect() as conn:
+            horizon = await conn.scalar(text("select pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+        since = change_feed.encode_token(horizon - 1, 2, uuid.UUID(int=2**128 - 1))
+        try:
+            for tid in edited[:-1]:
+                (await c.patch(f"/orgs/{org_id}/tasks/{tid}", json={"status": "done"}, headers=h)).raise_for_status()
+            (await c.delete(f"/orgs/{org_id}/tasks/{edited[-1]}", headers=h)).raise_for_status()
+
+            feed = f"/orgs/{org_id}/changes"
+
+            async def feed_since():
+                return await _get_all(c, feed, {"since": since, "limit": ns.limit}, h, "since")
+
+            for name, runs, fn in (
+                ("full resync (task list pages)", ns.resync_runs, lambda: _resync(c, org_id, h, ns.limit)),
+                ("first sync (change feed)", ns.resync_runs,
+                 lambda: _get_all(c, feed, {"limit": ns.limit}, h, "since")),
+                (f"catch up after {ns.changed + 1} edits (change feed)", ns.runs, feed_since),
+            ):
+                await fn()
+                stats, (requests, items, size) = await _timed(runs, fn)
+                rows.append({"mode": name, "requests": requests, "items": items, "bytes": size, **stats})
+
+            # concurrent writers: every create shows up once, ids unique
+            since = (await c.get(feed, params={"since": since, "limit": 1000}, headers=h)).json()["since"]
+            project = (await c.get(f"/orgs/{org_id}/projects", headers=h)).json()["items"][0]["id"]
+            t0 = time.perf_counter()
+            created = await asyncio.gather(*(
+                c.post(f"/orgs/{org_id}/projects/{project}/tasks", json={"title": f"w{i}"}, headers=h)
+                for i in range(ns.writers)
+            ))
+            wall = time.perf_counter() - t0
+            ids = {r.json()["id"] for r in created if r.status_code == 200}
+            got = (await c.get(feed, params={"since": since, "limit": 1000}, headers=h)).json()["items"]
+            seqs = [ch["seq"] for ch in got]
+            check = {
+                "writers": ns.writers,
+                "ok": len(ids),
+                "in_feed": len(ids & {ch["id"] for ch in got}),
+                "distinct_seqs": len(set(seqs)),
+                "ms": wall * 1000.0,
+            }
+        finally:
+            async with async_engine.begin() as conn:
+                for stmt in filter(str.strip, _CLEANUP.split(";")):
+                    await conn.execute(text(stmt), params)
+    await close_redis()
+    await async_engine.dispose()
+    return rows, check
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=100000)
+    ap.add_argument("--projects", type=int, default=5)
+    ap.add_argument("--changed", type=int, default=20, help="tasks edited before catching up (plus one deleted)")
+    ap.add_argument("--limit", type=int, default=200, help="page size for both paths")
+    ap.add_argument("--writers", type=int, default=50)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--resync-runs", type=int, default=3)
+    ns = ap.parse_args()
+
+    rows, check = asyncio.run(_main(ns))
+
+    print(f"tasks={ns.tasks} projects={ns.projects} limit={ns.limit}\n")
+    print("| client | requests | items | body bytes | p50 (ms) | p95 (ms) |")
+    print("|:---|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["mode"]} | {r["requests"]} | {r["items"]} | {r["bytes"]} '
+            f'| {r["p50"]:.1f} | {r["p95"]:.1f} |'
+        )
+    print(
+        f'\n{check["writers"]} concurrent creates: {check["ok"]} ok in {check["ms"]:.0f} ms, '
+        f'{check["in_feed"]} in the feed with {check["distinct_seqs"]} distinct transaction ids'
+    )
+    return 0 if check["in_feed"] == check["ok"] == check["distinct_seqs"] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
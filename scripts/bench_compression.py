@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""response compression: CPU time vs bytes on list_tasks payloads.
+
+builds list_tasks pages (as app.responses encodes them) of --sizes tasks
+with realistic titles and assignees, then compresses each with every
+available encoding (app.compression; br and zstd need the brotli /
+zstandard packages) at a few levels. times are per response on one core,
+the median of --runs. needs nothing running.
+
+    python -m scripts.bench_compression --sizes 50,200 --runs 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from fastapi import Response
+
+from app import compression, responses
+from app.config import settings
+from app.models.enums import TaskStatus
+
+FIELDS = ("id", "org_id", "project_id", "title", "status", "created_by", "assigned_to")
+
+_WORDS = (
+    "fix login bug deploy release api cache billing invoice report export import search index "
+    "query slow timeout retry webhook email notify signup onboarding mobile dashboard chart metric"
+).split()
+
+LEVELS = {
+    "gzip": ("compression_gzip_level", (1, 6, 9)),
+    "br": ("compression_brotli_quality", (1, 4, 6)),
+    "zstd": ("compression_zstd_level", (1, 3, 9)),
+}
+
+def _payload(n: int, rnd: random.Random) -> bytes:
+    org, project = uuid.uuid4(), uuid.uuid4()
+    people = [uuid.uuid4() for _ in range(8)]
+    rows = [
+        (
+            uuid.uuid4(),
+            org,
+            project,
+            " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(3, 8))),
+            rnd.choice(list(TaskStatus)),
+            rnd.choice(people),
+            rnd.choice(people + [None]),
+        )
+        for _ in range(n)
+    ]
+    return responses.page(rows, FIELDS, "MjAyNC0wMS0wMVQwMDowMDowMCswMDowMHwx", Response()).body
+
+def _time(encoding: str, body: bytes, runs: int) -> tuple[float, int]:
+    # -> median ms per response, compressed bytes
+    lat = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = compression.ENCODERS[encoding]().chunk(body, True)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(lat), len(out)
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="50,200", help="tasks per page, comma separated")
+    ap.add_argument("--runs", type=int, default=200)
+    ns = ap.parse_args()
+
+    rnd = random.Random(1)
+    print(f"encodings available: {', '.join(compression.ENCODERS)}; runs={ns.runs}\n")
+    print("| tasks | encoding | level | bytes | ratio | compress (ms) | MB/s |")
+    print("|---:|:---|---:|---:|---:|---:|---:|")
+    for n in (int(s) for s in ns.sizes.split(",")):
+        body = _payload(n, rnd)
+        print(f"| {n} | identity | - | {len(body)} | 1.00 | - | - |")
+        for encoding in compression.ENCODERS:
+            setting, levels = LEVELS[encoding]
+            default = getattr(settings, setting)
+            for level in levels:
+                setattr(settings, setting, level)
+                ms, size = _time(encoding, body, ns.runs)
+                mark = "*" if level == default else ""
+                print(
+                    f"| {n} | {encoding} | {level}{mark} | {size} | {len(body) / size:.2f} "
+                    f"| {ms:.3f} | {len(body) / 1e6 / (ms / 1000.0):.0f} |"
+                )
+            setattr(settings, setting, default)
+    print("\n* default level")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
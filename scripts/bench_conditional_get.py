@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""dashboard polling: list requests answered in full vs 304 Not Modified.
+
+drives the app in-process (httpx ASGI transport, no server) the way a
+polling dashboard does: one GET of a project's task page and of the
+org's project list, then the same GETs again with If-None-Match. the org
+is seeded with --tasks tasks in one project straight into postgres and
+moved to the pro plan. run with RATE_LIMIT_ENABLED=false and
+TENANT_QUOTA_ENABLED=false so the limiters stay out of it. needs postgres
+(DATABASE_URL) and redis (REDIS_URL); the seed is removed at the end.
+
+    python -m scripts.bench_conditional_get --tasks 100000 --runs 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from app.db import async_engine
+from app.main import app
+from app.redis_client import close_redis
+
+_SEED = """
+update orgs set plan = 'pro', subscription_status = 'active' where id = :org;
+insert into tasks(id, org_id, project_id, title, status, created_by, created_at, updated_at)
+select gen_random_uuid(), :org, :project, 'polled task ' || g,
+       (case when g % 3 = 0 then 'done' else 'todo' end)::task_status,
+       :user, ts, ts
+from generate_series(1, :n) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts) t;
+analyze tasks
+"""
+
+_CLEANUP = """
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from org_usage where org_id = :org;
+delete from memberships where org_id = :org;
+delete from orgs where id = :org;
+delete from auth_magic_links where user_id = :user;
+delete from users where id = :user
+"""
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _setup(c: httpx.AsyncClient) -> tuple[dict[str, str], str, str]:
+    r = await c.post("/auth/request-link", json={"email": f"bench_etag_{uuid.uuid4().hex[:10]}@example.com"})
+    r.raise_for_status()
+    r = await c.post("/auth/redeem", json={"token": r.json()["token"]})
+    r.raise_for_status()
+    h = {"authorization": f"bearer {r.json()['access_token']}"}
+    r = await c.post("/orgs", json={"name": "bench etag"}, headers=h)
+    r.raise_for_status()
+    org_id = r.json()["id"]
+    for i in range(3):  # the free plan's limit
+        r = await c.post(f"/orgs/{org_id}/projects", json={"name": f"bench project {i}"}, headers=h)
+        r.raise_for_status()
+    return h, org_id, r.json()["id"]
+
+async def _time(c: httpx.AsyncClient, path: str, h: dict[str, str], runs: int) -> tuple[list[float], int, int]:
+    # -> latencies (ms), status, body bytes
+    for _ in range(10):
+        r = await c.get(path, headers=h)
+    lat = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        r = await c.get(path, headers=h)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return lat, r.status_code, len(r.content)
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        h, org_id, project_id = await _setup(c)
+        params = {"org": org_id, "project": project_id}
+        async with async_engine.begin() as conn:
+            params["user"] = await conn.scalar(
+                text("select user_id from memberships where org_id = :org"), params
+            )
+            t0 = time.perf_counter()
+            for stmt in filter(str.strip, _SEED.split(";")):
+                await conn.execute(text(stmt), dict(params, n=ns.tasks))
+        print(f"seeded {ns.tasks} tasks in {time.perf_counter() - t0:.1f}s\n")
+        try:
+            for name, path in (
+                (f"tasks, limit {ns.limit}", f"/orgs/{org_id}/projects/{project_id}/tasks?limit={ns.limit}"),
+                (f"tasks, status=done, limit {ns.limit}", f"/orgs/{org_id}/projects/{project_id}/tasks?status=done&limit={ns.limit}"),
+                ("projects", f"/orgs/{org_id}/projects"),
+            ):
+                etag = (await c.get(path, headers=h)).headers["etag"]
+                for mode, headers in (("full", h), ("If-None-Match", {**h, "if-none-match": etag})):
+                    lat, status, size = await _time(c, path, headers, ns.runs)
+                    rows.append({
+                        "list": name, "mode": mode, "status": status, "bytes": size,
+                        "p50": statistics.median(lat), "p95": _pct(lat, 95),
+                    })
+        finally:
+            async with async_engine.begin() as conn:
+                for stmt in filter(str.strip, _CLEANUP.split(";")):
+                    await conn.execute(text(stmt), params)
+    await close_redis()
+    await async_engine.dispose()
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=100000, help="tasks in the polled project")
+    ap.add_argument("--limit", type=int, default=200)
+    ap.add_argument("--runs", type=int, default=500)
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"tasks={ns.tasks} runs={ns.runs}\n")
+    print("| list | request | status | body bytes | p50 (ms) | p95 (ms) |")
+    print("|:---|:---|---:|---:|---:|---:|")
+    for r in rows:
+        print(f'| {r["list"]} | {r["mode"]} | {r["status"]} | {r["bytes"]} | {r["p50"]:.2f} | {r["p95"]:.2f} |')
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""per-write cost of the billing check: Org row from postgres vs
+app.billing.entitlements.check_write (redis, in-process).
+
+each check runs in its own session, as each request has its own; the
+check_write numbers leave the org_usage increment out (adding=0), it costs
+the same on either path. needs postgres (DATABASE_URL) and redis
+(REDIS_URL); the orgs it creates are removed at the end.
+
+    python -m scripts.bench_entitlements --orgs 100 --checks 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, insert
+
+from app.billing import entitlements
+from app.billing.gates import FREE_PROJECT_LIMIT, enforce_billing_writable
+from app.db import AsyncSessionLocal, async_engine
+from app.models.org import Org
+from app.redis_client import close_redis
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _orm(org_id: uuid.UUID) -> None:
+    # the pre-entitlements write path: full Org row, gate, plan limit lookup
+    async with AsyncSessionLocal() as db:
+        org = await db.get(Org, org_id)
+        enforce_billing_writable(org)
+        _ = FREE_PROJECT_LIMIT if org.plan == "free" else None
+
+async def _redis(org_id: uuid.UUID) -> None:
+    entitlements._local.pop(org_id, None)
+    async with AsyncSessionLocal() as db:
+        await entitlements.check_write(db, org_id, "projects")
+
+async def _local(org_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as db:
+        await entitlements.check_write(db, org_id, "projects")
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    org_ids = [uuid.uuid4() for _ in range(ns.orgs)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Org), [{"id": o, "name": "bench entitlements"} for o in org_ids])
+        await db.commit()
+    rows = []
+    try:
+        picks = [random.Random(1).choice(org_ids) for _ in range(ns.checks)]
+        for mode, check in (("orm Org row", _orm), ("check_write, redis", _redis), ("check_write, in-process", _local)):
+            for o in org_ids:  # warm connections and caches
+                await check(o)
+            lat = []
+            t0 = time.perf_counter()
+            for o in picks:
+                t1 = time.perf_counter()
+                await check(o)
+                lat.append((time.perf_counter() - t1) * 1e6)
+            wall = time.perf_counter() - t0
+            rows.append({
+                "mode": mode, "p50": statistics.median(lat), "p95": _pct(lat, 95), "per_s": ns.checks / wall,
+            })
+        return rows
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Org).where(Org.id.in_(org_ids)))
+            await db.commit()
+        await async_engine.dispose()
+        await close_redis()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orgs", type=int, default=100)
+    ap.add_argument("--checks", type=int, default=5000)
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"orgs={ns.orgs} checks={ns.checks}\n")
+    print("| path | p50 (us) | p95 (us) | checks/s |")
+    print("|:---|---:|---:|---:|")
+    for r in rows:
+        print(f'| {r["mode"]} | {r["p50"]:.0f} | {r["p95"]:.0f} | {r["per_s"]:.0f} |')
+    print(f"\nper-write overhead saved (p50): {rows[0]['p50'] - rows[2]['p50']:.0f} us")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
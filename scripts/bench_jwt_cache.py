@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""cpu per request spent authenticating the bearer token, cached vs not.
+
+drives the auth dependency (app.auth.deps.get_token_claims, the token half
+of get_current_user) in-process with a pool of live tokens reused the way
+clients reuse them, so the numbers are pure cpu: no db, no network.
+
+    python -m scripts.bench_jwt_cache --tokens 1000 --requests 200000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import tokens
+from app.auth.deps import get_token_claims
+from app.config import settings
+
+async def _drive(creds: list[HTTPAuthorizationCredentials], requests: int, seed: int) -> float:
+    rnd = random.Random(seed)
+    picks = [rnd.choice(creds) for _ in range(requests)]
+    t0 = time.process_time()
+    for c in picks:
+        await get_token_claims(c)
+    return time.process_time() - t0
+
+def _run(mode: str, creds: list[HTTPAuthorizationCredentials], requests: int) -> dict:
+    settings.jwt_cache_max_entries = 0 if mode == "uncached" else max(len(creds), 1)
+    tokens._verified.clear()
+    before = tokens.jwt_cache_stats()
+    cpu = asyncio.run(_drive(creds, requests, seed=1))
+    after = tokens.jwt_cache_stats()
+    hits = after["hits"] - before["hits"]
+    return {
+        "mode": mode,
+        "requests": requests,
+        "cpu_s": cpu,
+        "us_per_req": cpu / requests * 1e6,
+        "req_s": requests / cpu if cpu else 0.0,
+        "hit_rate": hits / requests,
+    }
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, default=1000, help="distinct live tokens (active sessions)")
+    ap.add_argument("--requests", type=int, default=200000)
+    ns = ap.parse_args()
+
+    creds = [
+        HTTPAuthorizationCredentials(scheme="bearer", credentials=tokens.issue_access_token(uuid.uuid4()))
+        for _ in range(ns.tokens)
+    ]
+    rows = [_run(m, creds, ns.requests) for m in ("uncached", "cached")]
+
+    print(f"tokens={ns.tokens} requests={ns.requests}\n")
+    print("| mode | requests | cpu (s) | cpu/request (us) | requests per cpu-second | cache hit rate |")
+    print("|:---|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["mode"]} | {r["requests"]} | {r["cpu_s"]:.3f} | {r["us_per_req"]:.2f} '
+            f'| {r["req_s"]:.0f} | {r["hit_rate"]:.1%} |'
+        )
+    saved = rows[0]["us_per_req"] - rows[1]["us_per_req"]
+    print(f"\ncpu saved per request: {saved:.2f} us ({saved / rows[0]['us_per_req']:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""list_tasks serialization: ORM objects + response_model vs column tuples + orjson.
+
+seeds one project per --sizes entry, then pages through each project
+(limit --limit, a session per page as per request) both ways:
+
+- orm: select(Task) entities, a TaskOut per row, then FastAPI's own
+  response handling (serialize_response: validate against Page[TaskOut],
+  dump to JSON), which is what the route did before app.responses
+- tuples: the route's column select encoded by app.responses.page
+
+reports CPU time (process_time, includes the driver) for the whole walk
+and peak Python heap per page (tracemalloc, in a separate pass). needs
+only postgres (DATABASE_URL); the seed is removed at the end.
+
+    python -m scripts.bench_list_encoding --sizes 1000,10000,100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+
+from fastapi import Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import select, text
+
+from app import responses
+from app.db import AsyncSessionLocal, async_engine
+from app.models.task import Task
+from app.pagination import PageParams, decode_cursor, keyset, split_page
+from app.schemas.pagination import Page
+from app.schemas.tasks import TaskOut
+
+ORG = uuid.UUID("00000000-0000-0000-00b5-000000000051")
+USER = uuid.UUID("00000000-0000-0000-00b5-000000000057")
+
+_COLUMNS = (Task.id, Task.org_id, Task.project_id, Task.title, Task.status, Task.created_by, Task.assigned_to)
+_FIELDS = tuple(c.key for c in _COLUMNS)
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-encoding@example.com');
+insert into orgs(id, name) values (:org, 'bench encoding');
+insert into projects(id, org_id, name)
+select gen_random_uuid(), :org, 'bench encoding ' || n from unnest(cast(:sizes as int[])) n;
+insert into tasks(id, org_id, project_id, title, status, created_by, assigned_to, created_at, updated_at)
+select gen_random_uuid(), :org, p.id, 'encoded task number ' || g,
+       (case when g % 3 = 0 then 'done' else 'todo' end)::task_status,
+       :user, case when g % 2 = 0 then cast(:user as uuid) end, ts, ts
+from projects p,
+     generate_series(1, cast(substring(p.name from 16) as int)) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts) t
+where p.org_id = :org;
+analyze tasks
+"""
+
+_CLEANUP = """
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from orgs where id = :org;
+delete from users where id = :user
+"""
+
+_FIELD = create_model_field(name="Response", type_=Page[TaskOut], mode="serialization")
+
+def _page(cursor: str | None, limit: int) -> PageParams:
+    p = PageParams.__new__(PageParams)
+    p.limit, p.after = limit, decode_cursor(cursor) if cursor else None
+    return p
+
+async def _orm(project_id: uuid.UUID, page: PageParams) -> tuple[bytes, str | None]:
+    async with AsyncSessionLocal() as db:
+        q = select(Task).where(Task.org_id == ORG, Task.project_id == project_id)
+        rows, next_cursor = split_page((await db.scalars(keyset(q, Task.created_at, Task.id, page))).all(), page)
+        items = [
+            TaskOut(
+                id=r.id,
+                org_id=r.org_id,
+                project_id=r.project_id,
+                title=r.title,
+                status=r.status,
+                created_by=r.created_by,
+                assigned_to=r.assigned_to,
+            )
+            for r in rows
+        ]
+        content = Page(items=items, next_cursor=next_cursor)
+    body = await serialize_response(field=_FIELD, response_content=content, dump_json=True)
+    return body, next_cursor
+
+async def _tuples(project_id: uuid.UUID, page: PageParams) -> tuple[bytes, str | None]:
+    async with AsyncSessionLocal() as db:
+        q = select(*_COLUMNS, Task.created_at).where(Task.org_id == ORG, Task.project_id == project_id)
+        rows, next_cursor = split_page((await db.execute(keyset(q, Task.created_at, Task.id, page))).all(), page)
+    return responses.page(rows, _FIELDS, next_cursor, Response()).body, next_cursor
+
+async def _walk(fetch, project_id: uuid.UUID, limit: int, trace: bool) -> tuple[int, int, int]:
+    # -> pages, body bytes, peak heap (bytes) of the biggest page
+    pages = size = peak = 0
+    cursor = None
+    while True:
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        body, cursor = await fetch(project_id, _page(cursor, limit))
+        if trace:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+        pages += 1
+        size += len(body)
+        if cursor is None:
+            return pages, size, peak
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    sizes = [int(s) for s in ns.sizes.split(",")]
+    params = {"org": ORG, "user": USER}
+    t0 = time.perf_counter()
+    async with async_engine.begin() as conn:
+        for stmt in filter(str.strip, _SEED.split(";")):
+            await conn.execute(text(stmt), dict(params, sizes=sizes))
+        projects = {
+            int(r.name.rsplit(" ", 1)[1]): r.id
+            for r in await conn.execute(text("select id, name from projects where org_id = :org"), params)
+        }
+    print(f"seeded {sum(sizes)} tasks in {time.perf_counter() - t0:.1f}s\n")
+
+    rows = []
+    try:
+        for n in sizes:
+            for mode, fetch in (("orm + response_model", _orm), ("tuples + orjson", _tuples)):
+                await _walk(fetch, projects[n], ns.limit, False)  # warm
+                c0, w0 = time.process_time(), time.perf_counter()
+                pages, size, _ = await _walk(fetch, projects[n], ns.limit, False)
+                cpu, wall = time.process_time() - c0, time.perf_counter() - w0
+                tracemalloc.start()
+                _, _, peak = await _walk(fetch, projects[n], ns.limit, True)
+                tracemalloc.stop()
+                rows.append({
+                    "tasks": n, "mode": mode, "pages": pages, "bytes": size,
+                    "cpu_ms": cpu * 1000.0, "wall_ms": wall * 1000.0, "peak_kib": peak / 1024.0,
+                })
+    finally:
+        async with async_engine.begin() as conn:
+            for stmt in filter(str.strip, _CLEANUP.split(";")):
+                await conn.execute(text(stmt), params)
+        await async_engine.dispose()
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000", help="tasks per project, comma separated")
+    ap.add_argument("--limit", type=int, default=200)
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"limit={ns.limit}\n")
+    print("| tasks | path | pages | CPU (ms) | wall (ms) | CPU/page (ms) | peak heap/page (KiB) |")
+    print("|---:|:---|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["tasks"]} | {r["mode"]} | {r["pages"]} | {r["cpu_ms"]:.0f} | {r["wall_ms"]:.0f} '
+            f'| {r["cpu_ms"] / r["pages"]:.2f} | {r["peak_kib"]:.0f} |'
+        )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""does deleting a huge project hold up writes elsewhere in the org?
+
+seeds one org with a --tasks task project and a small project next to it,
+then times single-task writes (insert a task, update a task) in the small
+project: first on a quiet database, then while the big project goes away,
+once as the old single `DELETE` transaction and once through
+app.project_deletion.purge (batches of PROJECT_PURGE_BATCH_SIZE). needs
+only postgres (DATABASE_URL); the seed is removed at the end.
+
+    python -m scripts.bench_project_purge --tasks 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import project_deletion
+from app.config import settings
+from app.models.project import Project
+from app.models.project_deletion import ProjectDeletion
+from app.models.task import Task
+
+ORG = uuid.UUID("00000000-0000-0000-00d3-000000000001")
+SMALL = uuid.UUID("00000000-0000-0000-00d3-000000000002")
+USER = uuid.UUID("00000000-0000-0000-00d3-000000000007")
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-purge@example.com');
+insert into orgs(id, name) values (:org, 'bench purge');
+insert into projects(id, org_id, name) values (:small, :org, 'bench small'), (:big, :org, 'bench big');
+insert into tasks(id, org_id, project_id, title, status, created_by)
+select gen_random_uuid(), :org, :big, 'bench task ' || g, 'todo', :user from generate_series(1, :n) g;
+insert into tasks(id, org_id, project_id, title, status, created_by)
+select gen_random_uuid(), :org, :small, 'bench small ' || g, 'todo', :user from generate_series(1, 100) g;
+analyze tasks
+"""
+
+_CLEANUP = """
+delete from project_deletions where org_id = :org;
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from orgs where id = :org;
+delete from users where id = :user
+"""
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _writes(sessions, stop: asyncio.Event, min_writes: int) -> list[float]:
+    # one insert + one update per round, each its own transaction, as the api does
+    lat = []
+    target = None
+    while not stop.is_set() or len(lat) < min_writes:
+        t0 = time.perf_counter()
+        async with sessions() as db:
+            target = await db.scalar(
+                insert(Task)
+                .values(org_id=ORG, project_id=SMALL, title="bench write", created_by=USER)
+                .returning(Task.id)
+            )
+            await db.commit()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        t0 = time.perf_counter()
+        async with sessions() as db:
+            await db.execute(update(Task).where(Task.id == target).values(title="bench write 2"))
+            await db.commit()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return lat
+
+async def _single_delete(sessions, big: uuid.UUID) -> None:
+    async with sessions() as db:
+        await db.execute(delete(Task).where(Task.project_id == big))
+        await db.execute(delete(Project).where(Project.id == big))
+        await db.commit()
+
+async def _batched_delete(sessions, big: uuid.UUID) -> None:
+    async with sessions() as db:
+        await db.execute(update(Project).where(Project.id == big).values(deleting_at=text("now()")))
+        await db.execute(insert(ProjectDeletion).values(project_id=big, org_id=ORG, requested_by=USER))
+        await db.commit()
+    assert await project_deletion.purge(big, sessions) == "done"
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    engine = create_async_engine(settings.database_url, pool_size=4)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    params = {"org": ORG, "small": SMALL, "user": USER}
+    rows = []
+    try:
+        for mode, work in (("idle", None), ("single DELETE", _single_delete), ("batched purge", _batched_delete)):
+            big = uuid.uuid4()
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _SEED.split(";")):
+                    await conn.execute(text(stmt), dict(params, big=big, n=ns.tasks))
+            stop = asyncio.Event()
+            writer = asyncio.create_task(_writes(sessions, stop, ns.min_writes))
+            t0 = time.perf_counter()
+            if work is not None:
+                await work(sessions, big)
+            else:
+                await asyncio.sleep(ns.idle_seconds)
+            wall = time.perf_counter() - t0
+            stop.set()
+            lat = await writer
+            rows.append({
+                "mode": mode, "wall_s": wall, "writes": len(lat),
+                "p50": statistics.median(lat), "p95": _pct(lat, 95), "max": max(lat),
+            })
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _CLEANUP.split(";")):
+                    await conn.execute(text(stmt), params)
+        return rows
+    finally:
+        async with engine.begin() as conn:
+            for stmt in filter(str.strip, _CLEANUP.split(";")):
+                await conn.execute(text(stmt), params)
+        await engine.dispose()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=1000000, help="tasks in the deleted project")
+    ap.add_argument("--idle-seconds", type=float, default=5.0)
+    ap.add_argument("--min-writes", type=int, default=200)
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"tasks={ns.tasks} batch={settings.project_purge_batch_size}\n")
+    print("| while | delete wall (s) | writes | write p50 (ms) | write p95 (ms) | write max (ms) |")
+    print("|:---|---:|---:|---:|---:|---:|")
+    for r in rows:
+        wall = "-" if r["mode"] == "idle" else f'{r["wall_s"]:.1f}'
+        print(f'| {r["mode"]} | {wall} | {r["writes"]} | {r["p50"]:.2f} | {r["p95"]:.2f} | {r["max"]:.1f} |')
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
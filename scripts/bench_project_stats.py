@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""per-project task counts: counting tasks vs the project_task_stats rollup.
+
+seeds one org with --projects projects and --tasks tasks spread over them
+(a few assignees, mixed statuses), then times:
+
+- reads: status counts for every project in the org, as a GROUP BY over
+  tasks and as app.project_stats.for_projects (the rollup)
+- writes: a single-task INSERT and a --batch-size INSERT, each in its own
+  transaction (rolled back), with the stats triggers on and off
+
+needs only postgres (DATABASE_URL); the triggers are re-enabled and the
+seed removed at the end.
+
+    python -m scripts.bench_project_stats --tasks 1000000 --projects 20 --runs 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import project_stats
+from app.db import async_engine
+from app.models.task import Task
+
+ORG = uuid.UUID("00000000-0000-0000-00b5-000000000061")
+USER = uuid.UUID("00000000-0000-0000-00b5-000000000067")
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-stats@example.com');
+insert into orgs(id, name) values (:org, 'bench stats');
+insert into projects(id, org_id, name)
+select gen_random_uuid(), :org, 'bench stats ' || g from generate_series(1, :projects) g;
+insert into tasks(id, org_id, project_id, title, status, created_by, assigned_to, created_at, updated_at)
+select gen_random_uuid(), :org, p.ids[1 + g % :projects], 'bench stats task ' || g,
+       (array['todo', 'doing', 'done'])[1 + (g / 7) % 3]::task_status,
+       :user, case when g % 4 = 0 then cast(:user as uuid) end, ts, ts
+from (select array_agg(id) as ids from projects where org_id = :org) p,
+     generate_series(1, :n) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts) t;
+analyze tasks;
+analyze project_task_stats
+"""
+
+_CLEANUP = """
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from orgs where id = :org;
+delete from users where id = :user
+"""
+
+_TRIGGERS = ("tasks_stats_insert", "tasks_stats_update", "tasks_stats_delete")
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _timed(runs: int, fn) -> dict:
+    lat = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        await fn()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50": statistics.median(lat), "p95": _pct(lat, 95)}
+
+async def _main(ns: argparse.Namespace) -> tuple[float, list[dict]]:
+    params = {"org": ORG, "user": USER}
+    t0 = time.perf_counter()
+    async with async_engine.begin() as conn:
+        for stmt in filter(str.strip, _SEED.split(";")):
+            await conn.execute(text(stmt), dict(params, n=ns.tasks, projects=ns.projects))
+    seeded = time.perf_counter() - t0
+
+    rows = []
+    try:
+        async with async_engine.connect() as conn:
+            project_ids = list(await conn.scalars(text("select id from projects where org_id = :org"), params))
+        one_project = project_ids[0]
+
+        async def count_tasks() -> None:
+            async with AsyncSession(async_engine) as db:
+                (await db.execute(
+                    select(Task.project_id, Task.status, func.count())
+                    .where(Task.org_id == ORG)
+                    .group_by(Task.project_id, Task.status)
+                )).all()
+
+        async def rollup() -> None:
+            async with AsyncSession(async_engine) as db:
+                await project_stats.for_projects(db, project_ids)
+
+        for mode, fn in ((f"GROUP BY over {ns.tasks} tasks", count_tasks), ("project_task_stats", rollup)):
+            await fn()
+            rows.append({"op": f"read {ns.projects} projects", "mode": mode, **await _timed(ns.runs, fn)})
+
+        insert = text(
+            "insert into tasks(id, org_id, project_id, title, created_by) "
+            "select gen_random_uuid(), :org, :project, 'bench stats insert', :user from generate_series(1, :k)"
+        )
+
+        def inserting(k: int):
+            async def fn() -> None:
+                async with async_engine.connect() as conn:
+                    await conn.execute(insert, dict(params, project=one_project, k=k))
+                    await conn.rollback()
+            return fn
+
+        for on in (True, False):
+            async with async_engine.begin() as conn:
+                for t in _TRIGGERS:
+                    await conn.execute(text(f"alter table tasks {'enable' if on else 'disable'} trigger {t}"))
+            for k in (1, ns.batch_size):
+                fn = inserting(k)
+                await fn()
+                rows.append({
+                    "op": f"insert {k} task{'s' if k > 1 else ''}",
+                    "mode": f"triggers {'on' if on else 'off'}",
+                    **await _timed(ns.runs, fn),
+                })
+    finally:
+        async with async_engine.begin() as conn:
+            for t in _TRIGGERS:
+                await conn.execute(text(f"alter table tasks enable trigger {t}"))
+            for stmt in filter(str.strip, _CLEANUP.split(";")):
+                await conn.execute(text(stmt), params)
+        await async_engine.dispose()
+    return seeded, rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=1000000)
+    ap.add_argument("--projects", type=int, default=20)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--runs", type=int, default=50)
+    ns = ap.parse_args()
+
+    seeded, rows = asyncio.run(_main(ns))
+
+    print(f"seeded {ns.tasks} tasks (one INSERT, triggers on) in {seeded:.1f}s; runs={ns.runs}\n")
+    print("| operation | path | p50 (ms) | p95 (ms) |")
+    print("|:---|:---|---:|---:|")
+    for r in rows:
+        print(f'| {r["op"]} | {r["mode"]} | {r["p50"]:.2f} | {r["p95"]:.2f} |')
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
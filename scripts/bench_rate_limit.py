@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""redis round trips and check latency: plain vs leased token bucket.
+
+simulates the webhook profile from scripts/k6_smoke.js (every VU posts a
+webhook on every 5th iteration, ~1/s per VU, all from one client ip)
+across several worker processes, the way uvicorn --workers would run it.
+needs only redis (REDIS_URL).
+
+    python -m scripts.bench_rate_limit --workers 4 --vus 10 --seconds 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import statistics
+import time
+import uuid
+
+from app.config import settings
+from app.ratelimit import check_limit, check_limit_leased
+from app.redis_client import close_redis, get_redis
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _vu(mode: str, key: str, limit: int, rate: float, deadline: float, out: list) -> None:
+    period = 1.0 / rate
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        if mode == "leased":
+            r = await check_limit_leased(key, limit, 60)
+        else:
+            r = await check_limit(key, limit, 60, "token_bucket")
+        out.append(((time.perf_counter() - t0) * 1000.0, bool(r and r.allowed)))
+        await asyncio.sleep(period)
+
+async def _worker_main(mode: str, key: str, limit: int, vus: int, rate: float, seconds: float) -> list:
+    out: list = []
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(_vu(mode, key, limit, rate, deadline, out) for _ in range(vus)))
+    await close_redis()
+    return out
+
+def _worker(args: tuple) -> list:
+    return asyncio.run(_worker_main(*args))
+
+async def _redis_counters() -> tuple[int, int]:
+    # (limiter round trips, commands executed incl. the ones inside scripts)
+    r = get_redis()
+    stats = await r.info("stats")
+    cmds = await r.info("commandstats")
+    await close_redis()
+    trips = sum(int(cmds.get(f"cmdstat_{c}", {}).get("calls", 0)) for c in ("evalsha", "eval"))
+    return trips, int(stats["total_commands_processed"])
+
+def _run_mode(mode: str, ns: argparse.Namespace) -> dict:
+    key = f"rl:bench:{mode}:{uuid.uuid4().hex[:8]}"
+    vus_per_worker = max(1, ns.vus // ns.workers)
+
+    trips0, cmds0 = asyncio.run(_redis_counters())
+    t0 = time.perf_counter()
+    with mp.get_context("fork").Pool(ns.workers) as pool:
+        parts = pool.map(
+            _worker,
+            [(mode, key, ns.limit, vus_per_worker, ns.rate, ns.seconds)] * ns.workers,
+        )
+    elapsed = time.perf_counter() - t0
+    trips1, cmds1 = asyncio.run(_redis_counters())
+    trips, cmds = trips1 - trips0, cmds1 - cmds0
+
+    samples = [x for part in parts for x in part]
+    lat = [ms for ms, _ in samples]
+    allowed = sum(1 for _, ok in samples if ok)
+    return {
+        "mode": mode,
+        "checks": len(samples),
+        "allowed": allowed,
+        "denied": len(samples) - allowed,
+        "round_trips": trips,
+        "redis_cmds": cmds,
+        "redis_ops_s": cmds / elapsed,
+        "p50": statistics.median(lat) if lat else 0.0,
+        "p95": _pct(lat, 95),
+    }
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4, help="simulated uvicorn workers (processes)")
+    ap.add_argument("--vus", type=int, default=10, help="k6 virtual users, spread over workers")
+    ap.add_argument("--rate", type=float, default=1.0, help="webhooks/s per VU (k6 profile ~1)")
+    ap.add_argument("--limit", type=int, default=settings.rate_limit_webhooks_per_min, help="per minute")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ns = ap.parse_args()
+
+    rows = [_run_mode(m, ns) for m in ("plain", "leased")]
+
+    print(
+        f"workers={ns.workers} vus={ns.vus} rate/vu={ns.rate}/s limit={ns.limit}/min "
+        f"chunk={settings.rate_limit_lease_chunk} lease_ttl={settings.rate_limit_lease_ttl_seconds}s\n"
+    )
+    print("| limiter | checks | allowed | denied | round trips | redis cmds | redis ops/s | p50 (ms) | p95 (ms) |")
+    print("|:---|---:|---:|---:|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["mode"]} | {r["checks"]} | {r["allowed"]} | {r["denied"]} | {r["round_trips"]} | {r["redis_cmds"]} '
+            f'| {r["redis_ops_s"]:.1f} | {r["p50"]:.3f} | {r["p95"]:.3f} |'
+        )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
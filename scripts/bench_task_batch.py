@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""task import throughput: one POST per task vs POST .../tasks:batch.
+
+runs against a live api (make up) and its database (DATABASE_URL). the org
+is moved to the pro plan with an unsigned invoice.paid webhook
+(STRIPE_WEBHOOK_SECRET unset) so the free task cap doesn't stop the import;
+the api applies webhooks in the background, so setup waits for the event's
+webhook_events row. start the api with RATE_LIMIT_ENABLED=false and
+TENANT_QUOTA_ENABLED=false so the limiters don't either.
+
+    python -m scripts.bench_task_batch --tasks 2000 --batch-size 500 --concurrency 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal, async_engine
+from app.models.webhook_event import WebhookEvent
+
+BASE = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _setup(c: httpx.AsyncClient) -> tuple[dict[str, str], str]:
+    email = f"bench_{uuid.uuid4().hex[:10]}@example.com"
+    r = await c.post("/auth/request-link", json={"email": email})
+    r.raise_for_status()
+    r = await c.post("/auth/redeem", json={"token": r.json()["token"]})
+    r.raise_for_status()
+    h = {"authorization": f"bearer {r.json()['access_token']}"}
+
+    r = await c.post("/orgs", json={"name": f"bench batch {int(time.time())}"}, headers=h)
+    r.raise_for_status()
+    org_id = r.json()["id"]
+    event_id = f"evt_bench_{uuid.uuid4().hex}"
+    r = await c.post(
+        "/webhooks/stripe",
+        json={
+            "id": event_id,
+            "type": "invoice.paid",
+            "data": {
+                "object": {
+                    "id": f"in_bench_{org_id}",
+                    "customer": f"cus_bench_{org_id}",
+                    "subscription": f"sub_bench_{org_id}",
+                    "metadata": {"org_id": org_id},
+                }
+            },
+        },
+    )
+    r.raise_for_status()
+    await _wait_applied(event_id)
+    return h, org_id
+
+async def _wait_applied(event_id: str) -> None:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        async with AsyncSessionLocal() as db:
+            status = await db.scalar(
+                select(WebhookEvent.status).where(WebhookEvent.provider == "stripe", WebhookEvent.event_id == event_id)
+            )
+        if status == "processed":
+            return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"webhook {event_id} not processed (status {status})")
+
+async def _project(c: httpx.AsyncClient, h: dict[str, str], org_id: str, name: str) -> str:
+    r = await c.post(f"/orgs/{org_id}/projects", json={"name": name}, headers=h)
+    r.raise_for_status()
+    return r.json()["id"]
+
+async def _run(c: httpx.AsyncClient, bodies: list[tuple[str, dict]], h: dict[str, str], concurrency: int):
+    # -> (wall seconds, per-request latencies in ms)
+    queue: asyncio.Queue = asyncio.Queue()
+    for b in bodies:
+        queue.put_nowait(b)
+    lat: list[float] = []
+
+    async def worker() -> None:
+        while not queue.empty():
+            path, body = queue.get_nowait()
+            t0 = time.perf_counter()
+            r = await c.post(path, json=body, headers=h)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            r.raise_for_status()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - t0, lat
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    rows = []
+    async with httpx.AsyncClient(base_url=BASE, timeout=60.0) as c:
+        h, org_id = await _setup(c)
+        titles = [f"imported task {i}" for i in range(ns.tasks)]
+
+        pid = await _project(c, h, org_id, "single")
+        single = [(f"/orgs/{org_id}/projects/{pid}/tasks", {"title": t}) for t in titles]
+        pid = await _project(c, h, org_id, "batch")
+        batched = [
+            (f"/orgs/{org_id}/projects/{pid}/tasks:batch", {"tasks": [{"title": t} for t in titles[i : i + ns.batch_size]]})
+            for i in range(0, len(titles), ns.batch_size)
+        ]
+
+        for mode, bodies in (("single", single), (f"batch of {ns.batch_size}", batched)):
+            wall, lat = await _run(c, bodies, h, ns.concurrency)
+            rows.append({
+                "mode": mode,
+                "requests": len(bodies),
+                "wall_s": wall,
+                "tasks_s": ns.tasks / wall,
+                "p50": statistics.median(lat),
+                "p95": _pct(lat, 95),
+            })
+    await async_engine.dispose()
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=2000)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"base={BASE} tasks={ns.tasks} concurrency={ns.concurrency}\n")
+    print("| path | requests | wall (s) | tasks/s | request p50 (ms) | request p95 (ms) |")
+    print("|:---|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["mode"]} | {r["requests"]} | {r["wall_s"]:.2f} | {r["tasks_s"]:.0f} '
+            f'| {r["p50"]:.1f} | {r["p95"]:.1f} |'
+        )
+    print(f"\nspeedup: {rows[1]['tasks_s'] / rows[0]['tasks_s']:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""memory and throughput of a full task dump: materialized vs streamed.
+
+seeds one org with --tasks tasks, then dumps it twice in-process: the old
+way (every row fetched into a list, then one JSON array) and through
+app.task_export (server-side cursor, one NDJSON chunk per batch). peak
+python heap comes from tracemalloc in one pass, throughput from a second,
+untraced pass. needs only postgres (DATABASE_URL); the seed is removed at
+the end unless --keep.
+
+    python -m scripts.bench_task_export --tasks 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import task_export
+from app.config import settings
+from app.task_filters import TaskFilters
+
+ORG = uuid.UUID("00000000-0000-0000-00f5-000000000001")
+USER = uuid.UUID("00000000-0000-0000-00f5-000000000007")
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-export@example.com');
+insert into orgs(id, name) values (:org, 'bench export');
+insert into projects(id, org_id, name) select gen_random_uuid(), :org, 'bench export ' || g from generate_series(1, 10) g;
+insert into tasks(id, org_id, project_id, title, status, created_by, created_at, updated_at)
+select gen_random_uuid(), :org, p.ids[1 + g % 10], 'exported task number ' || g, 'todo', :user, ts, ts
+from (select array_agg(id) as ids from projects where org_id = :org) p,
+     generate_series(1, :n) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts) c;
+analyze tasks
+"""
+
+_CLEANUP = """
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from orgs where id = :org;
+delete from users where id = :user
+"""
+
+def _filters() -> TaskFilters:
+    return TaskFilters(None, None, None, None, None, None, None)
+
+async def _materialized(sessions) -> int:
+    # what a full dump cost before: all rows in memory, then one document
+    stmt = task_export.statement(ORG, None, _filters(), None)
+    async with sessions() as db:
+        rows = (await db.execute(stmt)).all()
+    body = json.dumps([dict(zip(task_export._KEYS, task_export._values(r))) for r in rows]).encode("utf-8")
+    return len(body)
+
+async def _streamed(sessions) -> int:
+    n = 0
+    async for chunk in task_export.stream(sessions, task_export.statement(ORG, None, _filters(), None), "ndjson"):
+        n += len(chunk)
+    return n
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    engine = create_async_engine(settings.database_url)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    params = {"org": ORG, "user": USER}
+    try:
+        if not ns.no_seed:
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _SEED.split(";")):
+                    await conn.execute(text(stmt), dict(params, n=ns.tasks))
+
+        rows = []
+        for mode, dump in (("materialized JSON array", _materialized), ("streamed NDJSON", _streamed)):
+            tracemalloc.start()
+            await dump(sessions)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            t0 = time.perf_counter()
+            size = await dump(sessions)
+            wall = time.perf_counter() - t0
+            rows.append({"mode": mode, "peak_mib": peak / 2**20, "wall_s": wall, "mib": size / 2**20})
+        return rows
+    finally:
+        if not ns.keep:
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _CLEANUP.split(";")):
+                    await conn.execute(text(stmt), params)
+        await engine.dispose()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=1000000)
+    ap.add_argument("--no-seed", action="store_true", help="reuse a seed left by --keep")
+    ap.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"tasks={ns.tasks} batch={settings.task_export_batch_size}\n")
+    print("| dump | peak heap (MiB) | body (MiB) | wall (s) | rows/s |")
+    print("|:---|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["mode"]} | {r["peak_mib"]:.1f} | {r["mib"]:.1f} | {r["wall_s"]:.2f} '
+            f'| {ns.tasks / r["wall_s"]:.0f} |'
+        )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""bulk import throughput: app.task_import (COPY into staging + one merge)
+vs multi-row INSERTs of 500 (the tasks:batch path).
+
+seeds a pro org with one project, generates --rows NDJSON records on the
+fly (never held in memory whole) and imports them in-process; the INSERT
+baseline loads --baseline-rows of the same records. needs postgres
+(DATABASE_URL); redis (REDIS_URL) is optional, the entitlements cache
+fails open. the seed is removed at the end.
+
+    python -m scripts.bench_task_import --rows 1000000 --baseline-rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import task_import
+from app.config import settings
+from app.models.task import Task
+from app.redis_client import close_redis
+
+ORG = uuid.UUID("00000000-0000-0000-00a6-000000000001")
+PROJECT = uuid.UUID("00000000-0000-0000-00a6-000000000002")
+USER = uuid.UUID("00000000-0000-0000-00a6-000000000007")
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-import@example.com');
+insert into orgs(id, name, plan, subscription_status) values (:org, 'bench import', 'pro', 'active');
+insert into org_usage(org_id) values (:org);
+insert into projects(id, org_id, name) values (:project, :org, 'bench import')
+"""
+
+_CLEANUP = """
+delete from tasks where org_id = :org;
+delete from projects where org_id = :org;
+delete from orgs where id = :org;
+delete from users where id = :user
+"""
+
+def _record(i: int) -> dict:
+    return {"title": f"imported task {i} from the old tracker", "status": ("todo", "doing", "done")[i % 3]}
+
+async def _ndjson(rows: int, chunk: int = 1 << 20):
+    buf, size = [], 0
+    for i in range(rows):
+        line = json.dumps(_record(i)) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= chunk:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+async def _copy(sessions, rows: int) -> dict:
+    async with sessions() as db:
+        t0 = time.perf_counter()
+        r = await task_import.run(db, ORG, PROJECT, USER, _ndjson(rows), "ndjson")
+        await db.commit()
+        wall = time.perf_counter() - t0
+    assert r.imported == rows, r
+    return {"mode": "COPY + merge", "rows": rows, "wall_s": wall, "staged_s": r.staged_seconds}
+
+async def _inserts(sessions, rows: int) -> dict:
+    t0 = time.perf_counter()
+    async with sessions() as db:
+        for start in range(0, rows, 500):
+            batch = [
+                dict(_record(i), org_id=ORG, project_id=PROJECT, created_by=USER)
+                for i in range(start, min(rows, start + 500))
+            ]
+            await db.execute(insert(Task), batch)
+        await db.commit()
+    return {"mode": "INSERT x500", "rows": rows, "wall_s": time.perf_counter() - t0, "staged_s": None}
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    engine = create_async_engine(settings.database_url)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    params = {"org": ORG, "project": PROJECT, "user": USER}
+    try:
+        async with engine.begin() as conn:
+            for stmt in filter(str.strip, _SEED.split(";")):
+                await conn.execute(text(stmt), params)
+        rows = [await _inserts(sessions, ns.baseline_rows)] if ns.baseline_rows else []
+        rows.append(await _copy(sessions, ns.rows))
+        return rows
+    finally:
+        async with engine.begin() as conn:
+            for stmt in filter(str.strip, _CLEANUP.split(";")):
+                await conn.execute(text(stmt), params)
+        await engine.dispose()
+        await close_redis()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000000)
+    ap.add_argument("--baseline-rows", type=int, default=100000, help="0 skips the INSERT baseline")
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"chunk={settings.task_import_chunk_size}\n")
+    print("| path | rows | parse + stage (s) | total (s) | rows/s |")
+    print("|:---|---:|---:|---:|---:|")
+    for r in rows:
+        staged = "-" if r["staged_s"] is None else f'{r["staged_s"]:.1f}'
+        print(f'| {r["mode"]} | {r["rows"]} | {staged} | {r["wall_s"]:.1f} | {r["rows"] / r["wall_s"]:.0f} |')
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
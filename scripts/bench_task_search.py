@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""latency of task title search (GET /orgs/{org_id}/tasks/search) on a big org.
+
+seeds one org with --tasks tasks (titles of 3-6 words drawn from a small
+vocabulary, so common words match a large share of the org) next to a
+second org of the same size, then times the statement the route builds:
+first page and a deep page, for rare, common, multi-word and prefix
+queries. needs only postgres (DATABASE_URL); the seed is removed at the end
+unless --keep.
+
+    python -m scripts.bench_task_search --tasks 1000000 --runs 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import task_search
+from app.config import settings
+from app.models.task import Task
+
+ORG = uuid.UUID("00000000-0000-0000-00b5-000000000001")
+OTHER_ORG = uuid.UUID("00000000-0000-0000-00b5-000000000002")
+USER = uuid.UUID("00000000-0000-0000-00b5-000000000007")
+
+_WORDS = (
+    "fix login bug deploy release api cache billing invoice report export import "
+    "search index query slow timeout retry webhook email notify signup onboarding "
+    "mobile ios android web dashboard chart metric alert oncall incident refactor "
+    "cleanup migrate upgrade postgres redis queue worker cron backup restore audit "
+    "security token session password reset invite member role permission plan "
+    "stripe checkout pricing trial churn feedback survey docs readme changelog "
+    "design review spec test flaky coverage lint build ci pipeline docker helm "
+    "terraform staging production rollback hotfix crash memory leak latency p95"
+).split()
+
+_SEED = """
+insert into users(id, email) values (:user, 'bench-search@example.com');
+insert into orgs(id, name) values (:org, 'bench search'), (:other, 'bench search other');
+insert into projects(id, org_id, name)
+select gen_random_uuid(), o, 'bench project ' || g
+from unnest(array[cast(:org as uuid), cast(:other as uuid)]) o, generate_series(1, 20) g;
+
+insert into tasks(id, org_id, project_id, title, status, created_by, created_at, updated_at)
+select gen_random_uuid(), p.org_id, p.ids[1 + g % 20],
+       (select string_agg(w[1 + (floor(random() * array_length(w, 1)) + 0 * k)::int], ' ')
+          from generate_series(1, 3 + g % 4) k),
+       (case when random() < 0.6 then 'done' else 'todo' end)::task_status,
+       :user, ts, ts
+from (select org_id, array_agg(id) as ids from projects
+       where org_id in (:org, :other) group by org_id) p,
+     generate_series(1, :n) g,
+     lateral (select timestamptz '2024-01-01' + g * interval '1 second' as ts,
+                     cast(:words as text[]) as w) c;
+
+analyze tasks;
+"""
+
+_CLEANUP = """
+delete from tasks where org_id in (:org, :other);
+delete from projects where org_id in (:org, :other);
+delete from orgs where id in (:org, :other);
+delete from users where id = :user
+"""
+
+# mid-word queries end in a prefix term; "fix login " is a finished query
+QUERIES = ["latency", "fix login ", "fix log", "deploy rollback hotfix ", "postgres migr", "p9"]
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _page(conn, q: str, after, limit: int) -> list:
+    # the route's queries: the prefix term's words, then the page
+    query = await task_search.tsquery(conn, ORG, task_search.to_tsquery_text(q))
+    candidates = select(*Task.__table__.c).where(Task.org_id == ORG)
+    return (await conn.execute(task_search.search(candidates, ORG, query, after, limit))).all()
+
+async def _time(conn, q: str, pages: int, limit: int, runs: int) -> tuple[list[float], int]:
+    # -> per-request latencies (ms) for page `pages`, matching rows in the org
+    lat = []
+    for _ in range(runs):
+        after = None
+        for _ in range(pages - 1):
+            rows = await _page(conn, q, after, limit)
+            if len(rows) <= limit:
+                break  # fewer matches than pages; time the last page there is
+            last = rows[limit - 1]
+            after = (last.rank, last.created_at, last.id)
+        t0 = time.perf_counter()
+        await _page(conn, q, after, limit)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    hits = await conn.scalar(
+        select(text("count(*)")).select_from(Task).where(
+            Task.org_id == ORG,
+            Task.search_tsv.op("@@")(
+                func.task_search_tsquery(ORG, func.to_tsquery("simple", task_search.to_tsquery_text(q)))
+            ),
+        )
+    )
+    return lat, hits
+
+async def _main(ns: argparse.Namespace) -> list[dict]:
+    engine = create_async_engine(settings.database_url)
+    params = {"org": ORG, "other": OTHER_ORG, "user": USER}
+    try:
+        if not ns.no_seed:
+            t0 = time.perf_counter()
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _SEED.split(";")):
+                    await conn.execute(text(stmt), dict(params, n=ns.tasks, words=list(_WORDS)))
+            print(f"seeded {ns.tasks} tasks in each of 2 orgs in {time.perf_counter() - t0:.1f}s\n")
+
+        rows = []
+        async with engine.connect() as conn:
+            for q in QUERIES:
+                for pages in (1, ns.deep_page):
+                    lat, hits = await _time(conn, q, pages, ns.limit, ns.runs)
+                    rows.append({
+                        "q": q, "page": pages, "hits": hits,
+                        "p50": statistics.median(lat), "p95": _pct(lat, 95),
+                    })
+        return rows
+    finally:
+        if not ns.keep:
+            async with engine.begin() as conn:
+                for stmt in filter(str.strip, _CLEANUP.split(";")):
+                    await conn.execute(text(stmt), params)
+        await engine.dispose()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=1000000, help="tasks in the searched org")
+    ap.add_argument("--runs", type=int, default=50)
+    ap.add_argument("--limit", type=int, default=20)
+    ap.add_argument("--deep-page", type=int, default=5)
+    ap.add_argument("--no-seed", action="store_true", help="reuse a seed left by --keep")
+    ap.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    ns = ap.parse_args()
+
+    rows = asyncio.run(_main(ns))
+
+    print(f"tasks/org={ns.tasks} limit={ns.limit} runs={ns.runs}\n")
+    print("| query | page | matching tasks | p50 (ms) | p95 (ms) |")
+    print("|:---|---:|---:|---:|---:|")
+    for r in rows:
+        print(f'| `{r["q"]}` | {r["page"]} | {r["hits"]} | {r["p50"]:.2f} | {r["p95"]:.2f} |')
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
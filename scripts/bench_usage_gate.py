@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""cost of the free plan task limit check as an org grows.
+
+times the old check (`SELECT count(*)` over the org's tasks) against the
+org_usage conditional increment (app.billing.usage.reserve, rolled back)
+on orgs seeded with --sizes tasks, then fires --concurrency task creates
+at an org one slot under the cap to show only one gets through. needs only
+postgres (DATABASE_URL); the seed is removed at the end.
+
+    python -m scripts.bench_usage_gate --sizes 100,10000,1000000 --runs 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.billing import usage
+from app.billing.gates import FREE_TASK_LIMIT
+from app.config import settings
+from app.models.task import Task
+
+USER = uuid.UUID("00000000-0000-0000-00e4-000000000007")
+ORG_PREFIX = "00000000-0000-0000-00e4-"
+
+_SEED = """
+insert into orgs(id, name) values (:org, 'bench usage');
+insert into projects(id, org_id, name) values (:project, :org, 'bench usage');
+insert into tasks(id, org_id, project_id, title, status, created_by)
+select gen_random_uuid(), :org, :project, 'bench task ' || g, 'todo', :user from generate_series(1, :n) g;
+insert into org_usage(org_id, projects, tasks, members) values (:org, 1, :n, 1)
+"""
+
+_CLEANUP = """
+delete from tasks where org_id::text like :prefix;
+delete from projects where org_id::text like :prefix;
+delete from orgs where id::text like :prefix;
+delete from users where id = :user
+"""
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))]
+
+async def _seed(engine, i: int, n: int) -> tuple[uuid.UUID, uuid.UUID]:
+    org, project = uuid.UUID(f"{ORG_PREFIX}{i:012d}"), uuid.uuid4()
+    async with engine.begin() as conn:
+        for stmt in filter(str.strip, _SEED.split(";")):
+            await conn.execute(text(stmt), {"org": org, "project": project, "user": USER, "n": n})
+        await conn.execute(text("analyze tasks"))
+    return org, project
+
+async def _time(sessions, org: uuid.UUID, runs: int) -> tuple[list[float], list[float]]:
+    count, reserve = [], []
+    async with sessions() as db:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            await db.scalar(select(func.count()).select_from(Task).where(Task.org_id == org))
+            count.append((time.perf_counter() - t0) * 1000.0)
+            await db.rollback()
+
+            t0 = time.perf_counter()
+            await usage.reserve(db, org, "tasks", limit=None)
+            reserve.append((time.perf_counter() - t0) * 1000.0)
+            await db.rollback()
+    return count, reserve
+
+async def _race(sessions, org: uuid.UUID, project: uuid.UUID, concurrency: int) -> int:
+    # every create sees one slot left; returns how many got in
+    async def create() -> bool:
+        async with sessions() as db:
+            if await usage.reserve(db, org, "tasks", limit=FREE_TASK_LIMIT) is None:
+                return False
+            await db.execute(insert(Task).values(org_id=org, project_id=project, title="race", created_by=USER))
+            await db.commit()
+            return True
+
+    return sum(await asyncio.gather(*(create() for _ in range(concurrency))))
+
+async def _main(ns: argparse.Namespace) -> tuple[list[dict], int]:
+    engine = create_async_engine(settings.database_url, pool_size=ns.concurrency)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    rows = []
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("insert into users(id, email) values (:user, 'bench-usage@example.com')"), {"user": USER})
+        for i, n in enumerate(ns.sizes):
+            org, _ = await _seed(engine, i, n)
+            count, reserve = await _time(sessions, org, ns.runs)
+            rows.append({
+                "tasks": n,
+                "count_p50": statistics.median(count), "count_p95": _pct(count, 95),
+                "reserve_p50": statistics.median(reserve), "reserve_p95": _pct(reserve, 95),
+            })
+        org, project = await _seed(engine, len(ns.sizes), FREE_TASK_LIMIT - 1)
+        admitted = await _race(sessions, org, project, ns.concurrency)
+        return rows, admitted
+    finally:
+        async with engine.begin() as conn:
+            for stmt in filter(str.strip, _CLEANUP.split(";")):
+                await conn.execute(text(stmt), {"prefix": ORG_PREFIX + "%", "user": USER})
+        await engine.dispose()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[100, 10000, 1000000])
+    ap.add_argument("--runs", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ns = ap.parse_args()
+
+    rows, admitted = asyncio.run(_main(ns))
+
+    print(f"runs={ns.runs}\n")
+    print("| tasks in org | count(*) p50 (ms) | count(*) p95 (ms) | org_usage p50 (ms) | org_usage p95 (ms) |")
+    print("|---:|---:|---:|---:|---:|")
+    for r in rows:
+        print(
+            f'| {r["tasks"]} | {r["count_p50"]:.2f} | {r["count_p95"]:.2f} '
+            f'| {r["reserve_p50"]:.2f} | {r["reserve_p95"]:.2f} |'
+        )
+    print(f"\n{ns.concurrency} concurrent creates at {FREE_TASK_LIMIT - 1}/{FREE_TASK_LIMIT}: {admitted} admitted")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""task-list latency with and without a concurrent stripe webhook burst.
+
+runs against a live api (make up) and its database (DATABASE_URL): the api
+applies webhooks in the background, so the burst phase lasts until every
+event's webhook_events row is processed. for bursts larger than the webhook
+rate limit, start the api with RATE_LIMIT_ENABLED=false. --control sends
+the same burst to a path with no route: what the requests alone cost the
+listers (on a small box that's most of it), to compare against.
+
+    python -m scripts.bench_webhook_burst --listers 10 --webhooks 200
+    python -m scripts.bench_webhook_burst --listers 10 --webhooks 200 --control
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import func, select
+
+from app.db import AsyncSessionLocal, async_engine
+from app.models.webhook_event import WebhookEvent
+
+BASE = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    i = min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs))) - 1))
+    return xs[i]
+
+async def _setup(c: httpx.AsyncClient) -> tuple[str, str, str]:
+    email = f"bench_{uuid.uuid4().hex[:10]}@example.com"
+    r = await c.post("/auth/request-link", json={"email": email})
+    r.raise_for_status()
+    r = await c.post("/auth/redeem", json={"token": r.json()["token"]})
+    r.raise_for_status()
+    jwt = r.json()["access_token"]
+    h = {"authorization": f"bearer {jwt}"}
+
+    r = await c.post("/orgs", json={"name": f"bench org {int(time.time())}"}, headers=h)
+    r.raise_for_status()
+    org_id = r.json()["id"]
+    r = await c.post(f"/orgs/{org_id}/projects", json={"name": "bench"}, headers=h)
+    r.raise_for_status()
+    project_id = r.json()["id"]
+    for i in range(25):
+        r = await c.post(f"/orgs/{org_id}/projects/{project_id}/tasks", json={"title": f"t{i}"}, headers=h)
+        r.raise_for_status()
+    return jwt, org_id, project_id
+
+async def _lister(c: httpx.AsyncClient, path: str, jwt: str, stop: asyncio.Event, out: list[float]) -> None:
+    h = {"authorization": f"bearer {jwt}"}
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        r = await c.get(path, headers=h)
+        out.append((time.perf_counter() - t0) * 1000.0)
+        r.raise_for_status()
+
+async def _webhook(c: httpx.AsyncClient, url: str, org_id: str, event_id: str, i: int) -> int:
+    r = await c.post(
+        url,
+        json={
+            "id": event_id,
+            "type": "invoice.paid",
+            "data": {
+                "object": {
+                    "id": f"in_bench_{i}",
+                    "customer": f"cus_bench_{org_id}",
+                    "subscription": f"sub_bench_{org_id}",
+                    "metadata": {"org_id": org_id},
+                }
+            },
+        },
+    )
+    return r.status_code
+
+async def _burst(base: str, url: str, org_id: str, event_ids: list[str]) -> list[int]:
+    limits = httpx.Limits(max_connections=max(1, len(event_ids)))
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30.0) as c:
+        return list(await asyncio.gather(*(_webhook(c, url, org_id, e, i) for i, e in enumerate(event_ids))))
+
+def _send_burst(base: str, url: str, org_id: str, event_ids: list[str]) -> list[int]:
+    # in a process of its own, like stripe's deliveries: the listers' timings
+    # shouldn't include this client's own work
+    return asyncio.run(_burst(base, url, org_id, event_ids))
+
+async def _applied(event_ids: list[str]) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count())
+            .select_from(WebhookEvent)
+            .where(
+                WebhookEvent.provider == "stripe",
+                WebhookEvent.event_id.in_(event_ids),
+                WebhookEvent.status.in_(("processed", "ignored")),
+            )
+        )
+
+async def _phase(
+    c: httpx.AsyncClient,
+    path: str,
+    jwt: str,
+    listers: int,
+    seconds: float,
+    burst: int,
+    url: str,
+    org_id: str,
+    pool: concurrent.futures.Executor,
+):
+    stop = asyncio.Event()
+    lat: list[float] = []
+    tasks = [asyncio.create_task(_lister(c, path, jwt, stop, lat)) for _ in range(listers)]
+
+    t0 = time.perf_counter()
+    event_ids = [f"evt_bench_{uuid.uuid4().hex}" for _ in range(burst)]
+    sent = None
+    if burst:
+        sent = asyncio.get_running_loop().run_in_executor(pool, _send_burst, str(c.base_url), url, org_id, event_ids)
+    await asyncio.sleep(seconds)
+    codes: list[int] = []
+    if sent is not None:
+        codes = await sent
+        # the listers keep going until the burst has been applied
+        while await _applied(event_ids) < sum(1 for x in codes if x == 200):
+            await asyncio.sleep(0.1)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return lat, codes, time.perf_counter() - t0
+
+async def _run(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(max_connections=args.listers + 4)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=30.0) as c:
+        jwt, org_id, project_id = await _setup(c)
+        path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+        url = "/webhooks/none" if args.control else "/webhooks/stripe"
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+            # started (and its imports done) before either phase
+            await asyncio.get_running_loop().run_in_executor(pool, _send_burst, args.base, url, org_id, [])
+            base_lat, _, _ = await _phase(c, path, jwt, args.listers, args.seconds, 0, url, org_id, pool)
+            burst_lat, codes, burst_s = await _phase(c, path, jwt, args.listers, args.seconds, args.webhooks, url, org_id, pool)
+    await async_engine.dispose()
+
+    print("| phase | requests | p50 (ms) | p95 (ms) | max (ms) |")
+    print("|:---|---:|---:|---:|---:|")
+    burst = "404 burst" if args.control else "webhook burst"
+    for name, xs in (("baseline", base_lat), (f"{burst} x{args.webhooks}", burst_lat)):
+        print(
+            f"| {name} | {len(xs)} | {statistics.median(xs):.2f} | {_pct(xs, 95):.2f} | {max(xs):.2f} |"
+        )
+    ok = sum(1 for x in codes if x == 200)
+    limited = sum(1 for x in codes if x == 429)
+    print(f"\nwebhooks: {ok} ok, {limited} rate limited, {len(codes) - ok - limited} other; all applied within {burst_s:.1f}s")
+
+    p95_base, p95_burst = _pct(base_lat, 95), _pct(burst_lat, 95)
+    print(f"p95 ratio burst/baseline: {p95_burst / p95_base:.2f}x" if p95_base else "")
+    return 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default=BASE)
+    ap.add_argument("--listers", type=int, default=10, help="concurrent task-list clients")
+    ap.add_argument("--webhooks", type=int, default=50, help="webhook burst size")
+    ap.add_argument("--control", action="store_true", help="send the burst to a path with no route")
+    ap.add_argument("--seconds", type=float, default=5.0, help="duration of each phase (at least)")
+    return asyncio.run(_run(ap.parse_args()))
+
+if __name__ == "__main__":
+    raise SystemExit(main())
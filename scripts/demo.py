@@ -7,8 +7,11 @@ from typing import Any
 import requests
 from rich import print
 
+from sqlalchemy import select
+
 from app.db import SessionLocal
 from app.models.org import Org
+from app.models.webhook_event import WebhookEvent
 
 BASE = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
 
@@ -68,6 +71,21 @@ def send_invoice_paid(event_id: str, customer_id: str) -> None:
         },
     ).raise_for_status()
 
+def wait_applied(event_id: str, timeout_s: float = 10.0) -> None:
+    # webhooks are applied in the background: wait for the ledger row
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        with SessionLocal() as db:
+            status = db.scalar(
+                select(WebhookEvent.status).where(WebhookEvent.provider == "stripe", WebhookEvent.event_id == event_id)
+            )
+        if status in {"processed", "ignored"}:
+            return
+        if status == "failed":
+            raise RuntimeError(f"webhook {event_id} failed")
+        time.sleep(0.1)
+    raise RuntimeError(f"webhook {event_id} not applied after {timeout_s}s")
+
 def wait_ready(timeout_s: float = 30.0) -> None:
     deadline = time.time() + timeout_s
     last_err: Exception | None = None
@@ -120,8 +138,12 @@ def main() -> None:
     # upgrade plan via stripe hooks
     customer_id = f"cus_demo_{int(time.time())}"
     attach_customer_id(org_id, customer_id)
-    send_subscription_updated(f"evt_demo_sub_{int(time.time())}", customer_id)
-    send_invoice_paid(f"evt_demo_invoice_{int(time.time())}", customer_id)
+    sub_event_id = f"evt_demo_sub_{int(time.time())}"
+    invoice_event_id = f"evt_demo_invoice_{int(time.time())}"
+    send_subscription_updated(sub_event_id, customer_id)
+    send_invoice_paid(invoice_event_id, customer_id)
+    wait_applied(sub_event_id)
+    wait_applied(invoice_event_id)
     print("upgraded plan via webhook")
 
     # create task as member (rbac ok)
@@ -136,7 +158,7 @@ def main() -> None:
 
     r = get(f"/orgs/{org_id}/projects/{project_id}/tasks", jwt=member_jwt)
     r.raise_for_status()
-    print("listed tasks:", len(r.json()))
+    print("listed tasks:", len(r.json()["items"]))
     print("[bold green]demo complete[/bold green]")
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""import tasks from a CSV or NDJSON file (or stdin) into a project.
+
+same path as POST .../tasks:import (app.task_import), straight against the
+database: records are validated a chunk at a time and COPYed into a staging
+table, then merged in one statement. billing gates and free plan caps apply;
+the tasks are created as --user, who has to be a member of the org. progress
+goes to stderr; nothing is imported unless the whole run succeeds.
+
+    python -m scripts.import_tasks --org ORG_ID --project PROJECT_ID --user USER_ID tasks.ndjson
+    gunzip -c tasks.csv.gz | python -m scripts.import_tasks --format csv ... -
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app import task_import
+from app.db import AsyncSessionLocal, async_engine
+from app.models.membership import Membership
+from app.models.project import Project
+from app.redis_client import close_redis
+
+_READ_SIZE = 1 << 20
+
+async def _chunks(path: str):
+    f = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while data := await asyncio.to_thread(f.read, _READ_SIZE):
+            yield data
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+def _progress(r: task_import.ImportResult) -> None:
+    print(f"\rread {r.read}  staged {r.staged}  rejected {r.rejected}", end="", file=sys.stderr, flush=True)
+
+async def _main(ns: argparse.Namespace) -> task_import.ImportResult:
+    try:
+        async with AsyncSessionLocal() as db:
+            project = await db.scalar(
+                select(Project.id).where(
+                    Project.id == ns.project, Project.org_id == ns.org, Project.deleting_at.is_(None)
+                )
+            )
+            if project is None:
+                raise SystemExit("project not found in that org")
+            if await db.get(Membership, {"user_id": ns.user, "org_id": ns.org}) is None:
+                raise SystemExit("--user is not a member of that org")
+
+            result = await task_import.run(db, ns.org, ns.project, ns.user, _chunks(ns.path), ns.format, _progress)
+            await db.commit()
+            print(file=sys.stderr)
+            return result
+    finally:
+        await async_engine.dispose()
+        await close_redis()
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", help="file to import, - for stdin")
+    ap.add_argument("--org", type=uuid.UUID, required=True)
+    ap.add_argument("--project", type=uuid.UUID, required=True)
+    ap.add_argument("--user", type=uuid.UUID, required=True, help="recorded as the tasks' creator")
+    ap.add_argument("--format", choices=task_import.FORMATS, help="default: from the file extension")
+    ns = ap.parse_args()
+    if ns.format is None:
+        ns.format = "csv" if ns.path.endswith(".csv") else "ndjson"
+
+    try:
+        r = asyncio.run(_main(ns))
+    except HTTPException as e:
+        print(f"\nimport refused: {e.detail}", file=sys.stderr)
+        return 1
+
+    print(f"imported {r.imported} tasks, rejected {r.rejected}, in {r.seconds:.1f}s\n")
+    if r.errors:
+        print("| line | error |")
+        print("|---:|:---|")
+        for line, detail in r.errors:
+            print(f"| {line} | {detail} |")
+        if r.rejected > len(r.errors):
+            print(f"\n(first {len(r.errors)} of {r.rejected})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -43,7 +43,8 @@ function get(path, headers = {}, tags = {}) {
   return http.get(`${BASE}${path}`, { headers, tags });
 }
 
-// tiny retry helper: retries on 429 + 5xx with backoff
+// tiny retry helper: retries on 429 + 5xx; honors Retry-After when the
+// server sends one, otherwise exponential backoff
 function withRetry(fn, { tries = 6, baseSleep = 0.25 } = {}) {
   let last;
   for (let i = 0; i < tries; i++) {
@@ -55,7 +56,12 @@ function withRetry(fn, { tries = 6, baseSleep = 0.25 } = {}) {
 
     // retryable
     if (code === 429 || (code >= 500 && code <= 599)) {
-      sleep(baseSleep * Math.pow(2, i)); // 0.25, 0.5, 1, 2, 4...
+      const retryAfter = parseFloat((last.headers && last.headers["Retry-After"]) || "");
+      if (retryAfter > 0) {
+        sleep(retryAfter);
+      } else {
+        sleep(baseSleep * Math.pow(2, i)); // 0.25, 0.5, 1, 2, 4...
+      }
       continue;
     }
 
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""apply stripe events nobody is working on.
+
+POST /webhooks/stripe queues an event and the worker that took the request
+applies it in the background; if that worker dies (or the event failed) the
+event sits in webhook_events until stripe sends it again, the next app
+worker startup or a run of this script (cron-friendly; events another
+worker is still applying are left to it). failed events are retried.
+
+    python -m scripts.process_webhooks
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import time
+
+from app.billing import stripe_events
+from app.db import AsyncSessionLocal, async_engine
+
+async def _main() -> tuple[int, list[tuple], float]:
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        requeued = await stripe_events.requeue_failed(db)
+        await db.commit()
+    results = await stripe_events.drain(AsyncSessionLocal)
+    await async_engine.dispose()
+    return requeued, results, time.perf_counter() - t0
+
+def main() -> int:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+
+    requeued, results, seconds = asyncio.run(_main())
+
+    if not results:
+        print("no queued events")
+        return 0
+    counts = collections.Counter(status for _, status in results)
+    print(f"{len(results)} events ({requeued} previously failed) in {seconds:.1f}s\n")
+    print("| result | events |")
+    print("|:---|---:|")
+    for status, n in sorted(counts.items()):
+        print(f"| {status} | {n} |")
+    for row_id, status in results:
+        if status == "failed":
+            print(f"failed: {row_id}")
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
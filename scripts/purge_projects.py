@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""finish project deletions nobody is working on.
+
+a DELETE /orgs/{org_id}/projects/{project_id} purges the project's tasks in
+the background of the worker that took the request; if that worker dies
+(or the purge failed) the deletion sits in project_deletions until the next
+DELETE of the same project, the next app worker startup or a run of this
+script (cron-friendly; a deletion another worker is still purging is left
+to it).
+
+    python -m scripts.purge_projects
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app import project_deletion
+from app.db import AsyncSessionLocal, async_engine
+
+async def _main() -> list[dict]:
+    async with AsyncSessionLocal() as db:
+        pending = await project_deletion.resumable(db)
+    rows = []
+    for project_id in pending:
+        t0 = time.perf_counter()
+        status = await project_deletion.purge(project_id, AsyncSessionLocal)
+        rows.append({"project_id": project_id, "status": status, "s": time.perf_counter() - t0})
+    await async_engine.dispose()
+    return rows
+
+def main() -> int:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+
+    rows = asyncio.run(_main())
+
+    if not rows:
+        print("no stalled deletions")
+        return 0
+    print("| project | result | seconds |")
+    print("|:---|:---|---:|")
+    for r in rows:
+        print(f'| {r["project_id"]} | {r["status"]} | {r["s"]:.1f} |')
+    return 1 if any(r["status"] == "failed" for r in rows) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""recount project_task_stats from tasks and repair rollups that drifted.
+
+each project is recounted in its own short transaction, so writes to its
+tasks wait for one recount at most. prints the projects that were off;
+exit status 1 if any were.
+
+    python -m scripts.rebuild_task_stats [--org ORG_ID ...] [--project PROJECT_ID ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import select
+
+from app import project_stats
+from app.db import AsyncSessionLocal, async_engine
+from app.models.project import Project
+
+async def _main(org_ids: list[uuid.UUID], project_ids: list[uuid.UUID]) -> tuple[int, list[tuple]]:
+    repaired = []
+    async with AsyncSessionLocal() as db:
+        if not project_ids:
+            q = select(Project.id, Project.org_id).order_by(Project.created_at)
+            if org_ids:
+                q = q.where(Project.org_id.in_(org_ids))
+            projects = list(await db.execute(q))
+        else:
+            projects = list(await db.execute(select(Project.id, Project.org_id).where(Project.id.in_(project_ids))))
+        for project_id, org_id in projects:
+            if await project_stats.rebuild(db, project_id):
+                repaired.append((org_id, project_id))
+            await db.commit()
+    await async_engine.dispose()
+    return len(projects), repaired
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--org", type=uuid.UUID, action="append", default=[], help="only these orgs (repeatable)")
+    ap.add_argument("--project", type=uuid.UUID, action="append", default=[], help="only these projects (repeatable)")
+    ns = ap.parse_args()
+
+    checked, repaired = asyncio.run(_main(ns.org, ns.project))
+
+    print(f"projects checked={checked} rollups repaired={len(repaired)}\n")
+    if repaired:
+        print("| org | project |")
+        print("|:---|:---|")
+        for org_id, project_id in repaired:
+            print(f"| {org_id} | {project_id} |")
+    return 1 if repaired else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""recount org_usage from the tables and repair counters that drifted.
+
+each org is locked, recounted and fixed in its own short transaction, so
+creates in that org wait for one recount at most. prints the orgs that were
+off; exit status 1 if any were.
+
+    python -m scripts.reconcile_usage [--org ORG_ID ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import select
+
+from app.billing import usage
+from app.db import AsyncSessionLocal, async_engine
+from app.models.org import Org
+
+async def _main(org_ids: list[uuid.UUID]) -> tuple[int, list[dict]]:
+    rows = []
+    async with AsyncSessionLocal() as db:
+        if not org_ids:
+            org_ids = list(await db.scalars(select(Org.id).order_by(Org.created_at)))
+        for org_id in org_ids:
+            drift = await usage.reconcile_org(db, org_id)
+            await db.commit()
+            rows.extend({"org_id": org_id, "kind": k, "stored": s, "actual": a} for k, (s, a) in drift.items())
+    await async_engine.dispose()
+    return len(org_ids), rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--org", type=uuid.UUID, action="append", default=[], help="only these orgs (repeatable)")
+    ns = ap.parse_args()
+
+    checked, rows = asyncio.run(_main(ns.org))
+
+    print(f"orgs checked={checked} counters repaired={len(rows)}\n")
+    if rows:
+        print("| org | counter | stored | actual |")
+        print("|:---|:---|---:|---:|")
+        for r in rows:
+            print(f'| {r["org_id"]} | {r["kind"]} | {r["stored"]} | {r["actual"]} |')
+    return 1 if rows else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
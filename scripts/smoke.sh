@@ -138,7 +138,7 @@ log "tasks: update task (basic patch)"
 TASK_PATCH="$(auth_patch "$BASE_URL/orgs/$ORG_ID/tasks/$TASK_ID" '{"title":"smoke task updated"}')"
 echo "$TASK_PATCH" | jq . >/dev/null || fail "task patch did not return json"
 
-log "stripe webhook: first delivery should be ok"
+log "stripe webhook: first delivery should be queued"
 EVENT_ID="evt_smoke_$(date +%s)"
 PAYLOAD="$(jq -nc --arg eid "$EVENT_ID" '{
   id: $eid,
@@ -148,7 +148,7 @@ PAYLOAD="$(jq -nc --arg eid "$EVENT_ID" '{
 
 code="$(http_code POST "$BASE_URL/webhooks/stripe" "$PAYLOAD")"
 [[ "$code" == "200" ]] || { echo "body: $(json)"; fail "webhook first post returned $code"; }
-jq -e --arg eid "$EVENT_ID" '.status=="ok" and .event_id==$eid' /tmp/resp.json >/dev/null || {
+jq -e --arg eid "$EVENT_ID" '.status=="queued" and .event_id==$eid' /tmp/resp.json >/dev/null || {
   echo "body: $(json)"
   fail "webhook first response unexpected"
 }
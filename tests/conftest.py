@@ -4,50 +4,87 @@ import uuid
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from app.db import get_db
+from app.billing import stripe_events
+from app.config import settings
+from app.db import get_db, get_sessionmaker
 from app.main import create_app
+from app.models.base import Base
 from app.models.org import Org
 
+def _truncate_all(engine) -> None:
+    tables = ", ".join(t.name for t in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+
 @pytest.fixture()
-def db_session() -> Session:
+def db_engine():
     database_url = os.environ["DATABASE_URL"]
 
+    # the app commits through its own (async) connections, so tests share
+    # real committed state and wipe it afterwards instead of rolling back
     engine = create_engine(database_url, pool_pre_ping=True)
+    try:
+        yield engine
+    finally:
+        _truncate_all(engine)
+        engine.dispose()
 
-    connection = engine.connect()
-    transaction = connection.begin()
-
-    TestingSessionLocal = sessionmaker(bind=connection, autoflush=False, autocommit=False)
+@pytest.fixture()
+def db_session(db_engine) -> Session:
+    TestingSessionLocal = sessionmaker(bind=db_engine, autoflush=False, autocommit=False)
     session: Session = TestingSessionLocal()
 
-    # savepoint
-    session.begin_nested()
-
-    @event.listens_for(session, "after_transaction_end")
-    def _restart_savepoint(sess: Session, trans) -> None:  # type: ignore[no-untyped-def]
-        if trans.nested and not trans._parent.nested:
-            sess.begin_nested()
+    # rows change underneath us (app commits), never serve stale identities
+    @event.listens_for(session, "do_orm_execute")
+    def _populate_existing(state) -> None:  # type: ignore[no-untyped-def]
+        if state.is_select:
+            state.update_execution_options(populate_existing=True)
 
     try:
         yield session
     finally:
         session.close()
-        transaction.rollback()
-        connection.close()
-        engine.dispose()
 
 @pytest.fixture()
-def client(db_session: Session) -> TestClient:
+def client(db_engine, monkeypatch) -> TestClient:
+    # limiter behaviour has its own tests; don't let the suite's logins
+    # (all from the same test client ip) trip the auth limits
+    monkeypatch.setattr(settings, "rate_limit_enabled", False)
+
     app = create_app()
 
-    def _override_get_db():
-        yield db_session
+    # NullPool: each TestClient runs its own event loop, async connections
+    # must not be pooled across loops
+    async_engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+    TestingAsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def _override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = _override_get_db
-    return TestClient(app)
+    app.dependency_overrides[get_sessionmaker] = lambda: TestingAsyncSessionLocal
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture()
+def drain_webhooks(client):
+    # webhooks are applied in the background (app.billing.stripe_events);
+    # returns a function that waits until the queued ones are done
+    def drain() -> None:
+        deadline = time.monotonic() + 10
+        while stripe_events._running:
+            assert time.monotonic() < deadline, "stripe events still running"
+            time.sleep(0.01)
+
+    return drain
 
 def _login(client, email: str) -> str:
     r = client.post("/auth/request-link", json={"email": email})
@@ -76,4 +113,3 @@ def seeded_org(client, db_session, owner_jwt) -> Org:
     org = db_session.get(Org, org_id)
     assert org is not None
     return org
-
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import uuid
+
+from app.models.enums import Role
+from app.models.org import Org
+from app.rbac import cache as auth_cache
+from app.redis_client import close_redis
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def test_repeat_requests_hit_the_cache_and_webhook_invalidates(client, db_session, drain_webhooks):
+    jwt = login(client, f"cache+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "cache-org"}, headers=auth(jwt)).json()["id"]
+    org = db_session.get(Org, org_id)
+    org.stripe_customer_id = f"cus_cache_{uuid.uuid4().hex[:8]}"
+    db_session.commit()
+
+    before = client.get("/health/caches").json()["auth_context"]
+    for _ in range(3):
+        assert client.get(f"/orgs/{org_id}/projects", headers=auth(jwt)).status_code == 200
+    after = client.get("/health/caches").json()["auth_context"]
+    assert after["misses"] - before["misses"] == 1
+    assert after["l1_hits"] - before["l1_hits"] == 2
+
+    r = client.post(
+        "/webhooks/stripe",
+        json={
+            "id": f"evt_cache_{int(time.time())}_{uuid.uuid4().hex[:6]}",
+            "type": "invoice.payment_failed",
+            "data": {"object": {"id": "in_cache", "customer": org.stripe_customer_id}},
+        },
+    )
+    assert r.status_code == 200
+    drain_webhooks()
+
+    # no waiting for a ttl: the first write after the event is applied sees past_due
+    r = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt))
+    assert r.status_code == 402
+
+def test_webhook_that_changes_nothing_keeps_the_cache(client, db_session, drain_webhooks):
+    jwt = login(client, f"cache-noop+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "cache-org-noop"}, headers=auth(jwt)).json()["id"]
+    org = db_session.get(Org, org_id)
+    org.stripe_customer_id = f"cus_noop_{uuid.uuid4().hex[:8]}"
+    db_session.commit()
+
+    def paid() -> None:
+        r = client.post(
+            "/webhooks/stripe",
+            json={
+                "id": f"evt_noop_{uuid.uuid4().hex}",
+                "type": "invoice.paid",
+                "data": {"object": {"id": "in_noop", "customer": org.stripe_customer_id}},
+            },
+        )
+        assert r.status_code == 200
+        drain_webhooks()
+
+    # free -> pro: invalidated
+    paid()
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(jwt)).status_code == 200
+    before = client.get("/health/caches").json()["auth_context"]
+    # the renewal's invoice.paid: already pro and active
+    paid()
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(jwt)).status_code == 200
+    after = client.get("/health/caches").json()["auth_context"]
+    assert after["misses"] == before["misses"]
+
+def test_invite_is_visible_immediately(client):
+    owner = login(client, f"cache-owner+{uuid.uuid4().hex[:8]}@example.com")
+    email = f"cache-invitee+{uuid.uuid4().hex[:8]}@example.com"
+    invitee = login(client, email)
+    org_id = client.post("/orgs", json={"name": "cache-org-2"}, headers=auth(owner)).json()["id"]
+
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(invitee)).status_code == 403
+    r = client.post(f"/orgs/{org_id}/invites", json={"email": email, "role": "member"}, headers=auth(owner))
+    assert r.status_code == 200
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(invitee)).status_code == 200
+
+def test_load_racing_an_invalidation_is_not_written_back():
+    user_id, org_id = uuid.uuid4(), uuid.uuid4()
+    entry = auth_cache.AuthEntry(role=Role.owner, org_name="o", plan="free", subscription_status="active")
+
+    async def scenario():
+        try:
+            cached, version = await auth_cache.get(user_id, org_id)
+            assert cached is None and version == ""
+
+            # billing changes between our postgres read and the write-back
+            await auth_cache.invalidate_org(org_id)
+            skipped = auth_cache.stats()["stale_writes_skipped"]
+            await auth_cache.put(user_id, org_id, entry, version)
+            assert auth_cache.stats()["stale_writes_skipped"] == skipped + 1
+
+            cached, version = await auth_cache.get(user_id, org_id)
+            assert cached is None and version not in (None, "")
+
+            # a load that started after the invalidation is cached normally
+            await auth_cache.put(user_id, org_id, entry, version)
+            auth_cache._local.clear()
+            cached, _ = await auth_cache.get(user_id, org_id)
+            assert cached == entry
+        finally:
+            await close_redis()
+
+    asyncio.run(scenario())
+
+def test_membership_versions_only_go_up():
+    user_id = uuid.uuid4()
+
+    async def scenario() -> list[int | None]:
+        seen = []
+        try:
+            # a bump is published, then a read from before it arrives late
+            await auth_cache.publish_membership_version(user_id, 5)
+            await auth_cache.publish_membership_version(user_id, 4, loaded=True)
+            auth_cache._local_versions.clear()
+            seen.append(await auth_cache.membership_version(user_id))
+            # two bumps published out of order
+            await auth_cache.publish_membership_version(user_id, 7)
+            await auth_cache.publish_membership_version(user_id, 6)
+            auth_cache._local_versions.clear()
+            seen.append(await auth_cache.membership_version(user_id))
+        finally:
+            await close_redis()
+        return seen
+
+    assert asyncio.run(scenario()) == [5, 7]
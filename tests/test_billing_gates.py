@@ -28,6 +28,9 @@ def test_blocks_writes_when_past_due(client, db_session: Session):
 
     r = client.post(f"/orgs/{org_id}/projects", json={"name": "p1"}, headers=auth(jwt))
     assert r.status_code == 402
+    # billing is checked before the project
+    r = client.post(f"/orgs/{org_id}/projects/{uuid.uuid4()}/tasks", json={"title": "t"}, headers=auth(jwt))
+    assert r.status_code == 402
 
 def test_free_project_limit(client, db_session: Session):
     jwt = login(client, "freelimit@example.com")
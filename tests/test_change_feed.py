@@ -0,0 +1,144 @@
+import asyncio
+import os
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import change_feed, change_version
+from app.models.task import Task
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def changes(client, jwt: str, org_id: str, since: str | None = None, limit: int = 500) -> dict:
+    params = {"limit": limit} | ({"since": since} if since else {})
+    r = client.get(f"/orgs/{org_id}/changes", params=params, headers=auth(jwt))
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def test_feed_returns_only_what_changed_since_the_token(client):
+    jwt = login(client, f"feed+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "feed"}, headers=auth(jwt)).json()["id"]
+    a = client.post(f"/orgs/{org_id}/projects", json={"name": "a"}, headers=auth(jwt)).json()["id"]
+    b = client.post(f"/orgs/{org_id}/projects", json={"name": "b"}, headers=auth(jwt)).json()["id"]
+    created = client.post(
+        f"/orgs/{org_id}/projects/{a}/tasks:batch", json={"tasks": [{"title": "t1"}, {"title": "t2"}]}, headers=auth(jwt)
+    ).json()["created"]
+    doomed = client.post(f"/orgs/{org_id}/projects/{b}/tasks", json={"title": "in b"}, headers=auth(jwt)).json()
+
+    first = changes(client, jwt, org_id)
+    assert [(c["type"], c["op"]) for c in first["items"]] == [("project", "upsert")] * 2 + [("task", "upsert")] * 3
+    assert first["items"][0]["data"] == {"id": a, "org_id": org_id, "name": "a"}
+    assert first["has_more"] is False
+    seqs = [c["seq"] for c in first["items"]]
+    assert seqs == sorted(seqs)
+
+    # caught up: nothing, same token
+    again = changes(client, jwt, org_id, first["since"])
+    assert again == {"items": [], "since": first["since"], "has_more": False}
+
+    client.patch(f"/orgs/{org_id}/tasks/{created[0]['id']}", json={"status": "done"}, headers=auth(jwt))
+    client.delete(f"/orgs/{org_id}/tasks/{created[1]['id']}", headers=auth(jwt))
+    client.patch(f"/orgs/{org_id}/projects/{a}", json={"name": "a2"}, headers=auth(jwt))
+    client.delete(f"/orgs/{org_id}/projects/{b}", headers=auth(jwt))
+
+    delta = changes(client, jwt, org_id, first["since"])["items"]
+    assert [(c["type"], c["op"], c["id"]) for c in delta] == [
+        ("task", "upsert", created[0]["id"]),
+        ("task", "delete", created[1]["id"]),
+        ("project", "upsert", a),
+        ("project", "delete", b),
+    ]
+    assert delta[0]["data"]["status"] == "done"
+    assert delta[1]["data"] is None
+    # the project's tombstone stands for its tasks; they aren't listed
+    assert doomed["id"] not in {c["id"] for c in changes(client, jwt, org_id)["items"]}
+
+def test_feed_pages_through_one_big_write_without_gaps(client):
+    jwt = login(client, f"feed-pages+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "feed"}, headers=auth(jwt)).json()["id"]
+    pid = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    r = client.post(
+        f"/orgs/{org_id}/projects/{pid}/tasks:import?format=ndjson",
+        content=b"".join(b'{"title": "imported %d"}\n' % i for i in range(7)),
+        headers=auth(jwt),
+    )
+    assert r.json()["imported"] == 7
+
+    seen, since, pages = [], None, 0
+    while True:
+        page = changes(client, jwt, org_id, since, limit=3)
+        seen += [c["id"] for c in page["items"]]
+        since, pages = page["since"], pages + 1
+        if not page["has_more"]:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 8
+
+    assert client.get(f"/orgs/{org_id}/changes?since=nope", headers=auth(jwt)).status_code == 400
+    other_jwt = login(client, f"feed-other+{uuid.uuid4().hex[:8]}@example.com")
+    assert client.get(f"/orgs/{org_id}/changes", headers=auth(other_jwt)).status_code == 403
+
+def test_a_reader_never_passes_a_write_that_is_still_running(client, db_session: Session):
+    email = f"feed-race+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = db_session.scalar(select(User.id).where(User.email == email))
+    org_id = client.post("/orgs", json={"name": "feed"}, headers=auth(jwt)).json()["id"]
+    # two projects: writes to one project's tasks take turns on its stats rows
+    projects = [
+        uuid.UUID(client.post(f"/orgs/{org_id}/projects", json={"name": n}, headers=auth(jwt)).json()["id"])
+        for n in ("p", "q")
+    ]
+    since = changes(client, jwt, org_id)["since"]
+    org = uuid.UUID(org_id)
+
+    async def scenario() -> tuple[list[str], list[str], int, int]:
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        async def write(db, project: uuid.UUID, title: str) -> int:
+            db.add(Task(org_id=org, project_id=project, title=title, created_by=me))
+            await db.flush()
+            return await db.scalar(select(change_version.CHANGE_SEQ))
+
+        async def fast_writer() -> int:
+            async with sessions() as db:
+                seq = await write(db, projects[1], "fast")
+                await db.commit()
+                return seq
+
+        try:
+            async with sessions() as slow, sessions() as reader:
+                slow_seq = await write(slow, projects[0], "slow")
+                # writers don't wait for each other: the later one commits first
+                fast_seq = await asyncio.wait_for(fast_writer(), 5)
+                before, token, _ = await change_feed.page(reader, org, since, 100)
+                await reader.rollback()
+
+                await slow.commit()
+                after, _, _ = await change_feed.page(reader, org, token, 100)
+                return (
+                    [c["data"]["title"] for c in before],
+                    [c["data"]["title"] for c in after],
+                    slow_seq,
+                    fast_seq,
+                )
+        finally:
+            await engine.dispose()
+
+    before, after, slow_seq, fast_seq = asyncio.run(scenario())
+    assert before == []
+    assert after == ["slow", "fast"]
+    assert fast_seq > slow_seq
@@ -0,0 +1,82 @@
+import gzip
+import json
+import uuid
+
+from app import compression
+from app.config import settings
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str, encoding: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}", "accept-encoding": encoding}
+
+def make_tasks(client, jwt: str, n: int) -> tuple[str, str]:
+    h = auth(jwt, "identity")
+    org_id = client.post("/orgs", json={"name": "gz"}, headers=h).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=h).json()["id"]
+    r = client.post(
+        f"/orgs/{org_id}/projects/{project_id}/tasks:batch",
+        json={"tasks": [{"title": f"compressible task title {i}"} for i in range(n)]},
+        headers=h,
+    )
+    assert r.status_code == 200
+    return org_id, project_id
+
+def test_negotiation_follows_q_values_and_server_order(monkeypatch):
+    monkeypatch.setattr(settings, "compression_encodings", "zstd,br,gzip")
+    monkeypatch.setattr(compression, "ENCODERS", {"gzip": object, "br": object, "zstd": object})
+
+    assert compression.negotiate("gzip, br, zstd") == "zstd"
+    assert compression.negotiate("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert compression.negotiate("zstd;q=0, *") == "br"
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("") is None
+
+    monkeypatch.setattr(compression, "ENCODERS", {"gzip": object})
+    assert compression.negotiate("br, zstd") is None
+    assert compression.negotiate("br, gzip;q=0.1") == "gzip"
+
+def test_large_lists_are_compressed_small_ones_are_not(client):
+    jwt = login(client, f"gz+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_tasks(client, jwt, 60)
+    path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+
+    plain = client.get(path, headers=auth(jwt, "identity"))
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+
+    for encoding in compression.ENCODERS:
+        r = client.get(path, headers=auth(jwt, encoding))
+        assert r.headers["content-encoding"] == encoding
+        assert r.headers["vary"] == "Accept-Encoding"
+        assert int(r.headers["content-length"]) < len(plain.content) // 3
+        assert r.json() == plain.json()
+        # the compressed body is a different representation of the same version
+        assert r.headers["etag"] == f"W/{plain.headers['etag']}"
+        again = client.get(path, headers=auth(jwt, encoding) | {"if-none-match": r.headers["etag"]})
+        assert again.status_code == 304
+        # the same validator the 200 carried
+        assert again.headers["etag"] == r.headers["etag"]
+
+    r = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt, "gzip"))
+    assert len(r.content) < settings.compression_min_size
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept-Encoding"
+
+def test_streamed_export_is_compressed_chunk_by_chunk(client, monkeypatch):
+    monkeypatch.setattr(settings, "task_export_batch_size", 10)
+    jwt = login(client, f"gz-export+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, _ = make_tasks(client, jwt, 45)
+
+    with client.stream("GET", f"/orgs/{org_id}/tasks/export", headers=auth(jwt, "gzip")) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert "content-length" not in r.headers
+        raw = b"".join(r.iter_raw())
+    rows = [json.loads(line) for line in gzip.decompress(raw).splitlines()]
+    assert len(rows) == 45
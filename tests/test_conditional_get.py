@@ -0,0 +1,104 @@
+import uuid
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str, etag: str | None = None) -> dict[str, str]:
+    h = {"authorization": f"bearer {jwt}"}
+    if etag is not None:
+        h["if-none-match"] = etag
+    return h
+
+def test_project_list_is_not_modified_until_a_write(client):
+    jwt = login(client, f"etag+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "etag"}, headers=auth(jwt)).json()["id"]
+    client.post(f"/orgs/{org_id}/projects", json={"name": "a"}, headers=auth(jwt))
+
+    r = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt))
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "private, no-cache"
+
+    r = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt, etag))
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(jwt, f"W/{etag}")).status_code == 304
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(jwt, "*")).status_code == 304
+    # another page is another representation
+    assert client.get(f"/orgs/{org_id}/projects?limit=1", headers=auth(jwt, etag)).status_code == 200
+
+    client.post(f"/orgs/{org_id}/projects", json={"name": "b"}, headers=auth(jwt))
+    r = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt, etag))
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert [p["name"] for p in r.json()["items"]] == ["b", "a"]
+
+def test_task_list_etag_follows_its_own_project(client):
+    jwt = login(client, f"etag-tasks+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "etag"}, headers=auth(jwt)).json()["id"]
+    a = client.post(f"/orgs/{org_id}/projects", json={"name": "a"}, headers=auth(jwt)).json()["id"]
+    b = client.post(f"/orgs/{org_id}/projects", json={"name": "b"}, headers=auth(jwt)).json()["id"]
+    task_id = client.post(f"/orgs/{org_id}/projects/{a}/tasks", json={"title": "t"}, headers=auth(jwt)).json()["id"]
+
+    def etag(project_id: str) -> str:
+        return client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).headers["etag"]
+
+    def unchanged(project_id: str, tag: str) -> bool:
+        r = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt, tag))
+        return r.status_code == 304
+
+    tag_a, tag_b = etag(a), etag(b)
+    client.post(f"/orgs/{org_id}/projects/{b}/tasks", json={"title": "other"}, headers=auth(jwt))
+    assert unchanged(a, tag_a)
+    assert not unchanged(b, tag_b)
+
+    tag_a = etag(a)
+    client.patch(f"/orgs/{org_id}/tasks/{task_id}", json={"status": "done"}, headers=auth(jwt))
+    assert not unchanged(a, tag_a)
+
+    # a move changes both lists
+    tag_a, tag_b = etag(a), etag(b)
+    r = client.patch(
+        f"/orgs/{org_id}/tasks:batch",
+        json={"items": [{"id": task_id, "project_id": b}]},
+        headers=auth(jwt),
+    )
+    assert r.status_code == 200, r.text
+    assert not unchanged(a, tag_a)
+    assert not unchanged(b, tag_b)
+
+    tag_b = etag(b)
+    client.delete(f"/orgs/{org_id}/tasks/{task_id}", headers=auth(jwt))
+    assert not unchanged(b, tag_b)
+
+def test_failed_writes_leave_the_version_alone(client):
+    jwt = login(client, f"etag-cap+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "etag"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+    tag = client.get(path, headers=auth(jwt)).headers["etag"]
+
+    r = client.post(f"{path}:batch", json={"tasks": [{"title": f"t{i}"} for i in range(101)]}, headers=auth(jwt))
+    assert r.status_code == 402
+    assert client.get(path, headers=auth(jwt, tag)).status_code == 304
+
+    # batch updates that write nothing
+    projects = f"/orgs/{org_id}/projects"
+    tag = client.get(projects, headers=auth(jwt)).headers["etag"]
+    r = client.patch(
+        f"/orgs/{org_id}/tasks:batch", json={"items": [{"id": str(uuid.uuid4()), "status": "done"}]}, headers=auth(jwt)
+    )
+    assert r.status_code == 200
+    assert r.json()["errors"][0]["detail"] == "task not found"
+    r = client.patch(
+        f"/orgs/{org_id}/tasks:batch?project_id={project_id}&status=done", json={"changes": {"status": "todo"}},
+        headers=auth(jwt),
+    )
+    assert r.json() == {"updated": [], "errors": []}
+    assert client.get(projects, headers=auth(jwt, tag)).status_code == 304
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+import uuid
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.billing import entitlements
+from app.models.org import Org
+from app.redis_client import close_redis
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def webhook(client, drain, event_type: str, customer: str):
+    r = client.post(
+        "/webhooks/stripe",
+        json={
+            "id": f"evt_ent_{int(time.time())}_{uuid.uuid4().hex[:6]}",
+            "type": event_type,
+            "data": {"object": {"id": "in_ent", "customer": customer}},
+        },
+    )
+    assert r.status_code == 200
+    drain()
+
+def test_writes_reuse_cached_entitlements_until_the_webhook_changes_them(client, db_session: Session, drain_webhooks):
+    jwt = login(client, f"ent+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "ent"}, headers=auth(jwt)).json()["id"]
+    org = db_session.get(Org, org_id)
+    org.stripe_customer_id = f"cus_ent_{uuid.uuid4().hex[:8]}"
+    db_session.commit()
+
+    before = client.get("/health/caches").json()["entitlements"]
+    for i in range(3):
+        assert client.post(f"/orgs/{org_id}/projects", json={"name": f"p{i}"}, headers=auth(jwt)).status_code == 200
+    r = client.post(f"/orgs/{org_id}/projects", json={"name": "p3"}, headers=auth(jwt))
+    assert r.status_code == 402
+    assert r.json()["detail"] == "free_plan_project_limit"
+    after = client.get("/health/caches").json()["entitlements"]
+    assert after["misses"] - before["misses"] == 1
+    assert after["l1_hits"] - before["l1_hits"] == 3
+
+    # upgraded: the free cap is gone on the very next write
+    webhook(client, drain_webhooks, "invoice.paid", org.stripe_customer_id)
+    assert client.post(f"/orgs/{org_id}/projects", json={"name": "p3"}, headers=auth(jwt)).status_code == 200
+
+    webhook(client, drain_webhooks, "invoice.payment_failed", org.stripe_customer_id)
+    r = client.post(f"/orgs/{org_id}/projects", json={"name": "p4"}, headers=auth(jwt))
+    assert r.status_code == 402
+    assert r.json()["detail"] == "billing_required"
+
+def test_load_racing_an_invalidation_is_not_written_back(client, db_session: Session):
+    org = Org(name="ent race")
+    db_session.add(org)
+    db_session.commit()
+
+    async def scenario():
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        try:
+            async with async_sessionmaker(bind=engine)() as db:
+                e, version = await entitlements._lookup(org.id)
+                assert e is None and version == ""
+                loaded = entitlements.for_org("free", "none", None)
+
+                # the webhook commits between our postgres read and the write-back
+                await entitlements.invalidate(org.id)
+                assert not await entitlements._store(org.id, loaded, version)
+                e, version = await entitlements._lookup(org.id)
+                assert e is None and version not in (None, "")
+
+                # a load after the invalidation is cached for other workers
+                e = await entitlements.get(db, org.id)
+                assert e.plan == "free" and e.max_tasks == 100
+                entitlements._local.clear()
+                assert await entitlements._lookup(org.id) == (e, None)
+        finally:
+            await engine.dispose()
+            await close_redis()
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+import time
+import uuid
+
+import jwt
+import pytest
+
+from app.auth import tokens
+from app.auth.tokens import decode_access_token, issue_access_token, jwt_cache_stats
+from app.config import settings
+
+def _token(exp_in: int) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": str(uuid.uuid4()),
+            "iss": settings.jwt_issuer,
+            "aud": settings.jwt_audience,
+            "iat": now,
+            "exp": now + exp_in,
+        },
+        settings.jwt_secret,
+        algorithm="HS256",
+    )
+
+def test_repeat_decodes_are_cached_and_isolated():
+    token = issue_access_token(uuid.uuid4())
+    before = jwt_cache_stats()
+
+    first = decode_access_token(token)
+    first["sub"] = "tampered"
+    second = decode_access_token(token)
+
+    after = jwt_cache_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert second["sub"] != "tampered"
+
+def test_nested_claims_are_isolated_too():
+    token = issue_access_token(uuid.uuid4(), {"orgs": {"abc": "m"}, "mv": 1})
+    first = decode_access_token(token)
+    first["orgs"]["abc"] = "o"
+    first["orgs"]["xyz"] = "o"
+    assert decode_access_token(token)["orgs"] == {"abc": "m"}
+
+def test_cached_token_expires_with_its_exp():
+    token = _token(exp_in=1)
+    decode_access_token(token)
+    time.sleep(1.1)
+
+    expired = jwt_cache_stats()["expired"]
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_access_token(token)
+    assert jwt_cache_stats()["expired"] == expired + 1
+
+def test_lru_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "jwt_cache_max_entries", 2)
+    tokens._verified.clear()
+    evictions = jwt_cache_stats()["evictions"]
+
+    for _ in range(3):
+        decode_access_token(issue_access_token(uuid.uuid4()))
+
+    assert jwt_cache_stats()["size"] == 2
+    assert jwt_cache_stats()["evictions"] == evictions + 1
+
+def test_revocation_hook_rejects_cached_tokens(client):
+    r = client.post("/auth/request-link", json={"email": f"revoke+{uuid.uuid4().hex[:8]}@example.com"})
+    r = client.post("/auth/redeem", json={"token": r.json()["token"]})
+    jwt_ = r.json()["access_token"]
+    headers = {"authorization": f"bearer {jwt_}"}
+    assert client.get("/orgs", headers=headers).status_code == 200
+
+    sub = decode_access_token(jwt_)["sub"]
+
+    def revoked(claims: dict) -> bool:
+        return claims["sub"] == sub
+
+    tokens.add_revocation_hook(revoked)
+    try:
+        r = client.get("/orgs", headers=headers)
+        assert r.status_code == 401
+        assert r.json()["detail"] == "invalid token"
+    finally:
+        tokens.remove_revocation_hook(revoked)
+
+    assert client.get("/orgs", headers=headers).status_code == 200
@@ -0,0 +1,71 @@
+import uuid
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+from app.schemas.pagination import Page
+from app.schemas.projects import ProjectOut
+from app.schemas.tasks import TaskOut
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def test_pre_encoded_pages_match_the_response_models(client, db_session: Session):
+    email = f"encode+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = db_session.scalar(select(User.id).where(User.email == email))
+    org_id = client.post("/orgs", json={"name": "encode"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p ✓"}, headers=auth(jwt)).json()["id"]
+    created = [
+        client.post(f"/orgs/{org_id}/projects/{project_id}/tasks", json=body, headers=auth(jwt)).json()
+        for body in ({"title": "plain"}, {"title": 'quote " ünïcode ✓', "assigned_to": str(me)}, {"title": "c"})
+    ]
+    client.patch(f"/orgs/{org_id}/tasks/{created[0]['id']}", json={"status": "done"}, headers=auth(jwt))
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        r = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", params=params, headers=auth(jwt))
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        page = TypeAdapter(Page[TaskOut]).validate_json(r.content)
+        # same document a Page[TaskOut] would have produced
+        assert r.json() == page.model_dump(mode="json")
+        seen.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert [t.title for t in seen] == ["c", 'quote " ünïcode ✓', "plain"]
+    assert seen[1].assigned_to == me and seen[0].assigned_to is None
+    assert seen[2].status == "done"
+
+    r = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt))
+    assert r.json() == TypeAdapter(Page[ProjectOut]).validate_json(r.content).model_dump(mode="json")
+    assert r.json()["items"][0]["name"] == "p ✓"
+
+def test_list_responses_keep_quota_headers(client, monkeypatch):
+    jwt = login(client, f"encode-quota+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "encode"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "tenant_quota_free_read_per_min", 10)
+
+    for path in (f"/orgs/{org_id}/projects", f"/orgs/{org_id}/projects/{project_id}/tasks"):
+        r = client.get(path, headers=auth(jwt))
+        assert r.headers["ratelimit-limit"] == "10"
+        r = client.get(path, headers=auth(jwt) | {"if-none-match": r.headers["etag"]})
+        assert r.status_code == 304
+        assert r.headers["ratelimit-limit"] == "10"
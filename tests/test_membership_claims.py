@@ -0,0 +1,112 @@
+import uuid
+
+import jwt
+import redis
+from sqlalchemy import delete
+
+from app.auth.claims import encode_org_id
+from app.config import settings
+from app.models.auth_magic_link import AuthMagicLink
+from app.models.membership import Membership
+from app.models.user import User
+from app.rbac import cache as auth_cache
+
+def login(client, email: str, include_memberships: bool = True) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token, "include_memberships": include_memberships})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt_: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt_}"}
+
+def claims_of(token: str) -> dict:
+    return jwt.decode(token, options={"verify_signature": False})
+
+def refresh(client, token: str, **body) -> str:
+    r = client.post("/auth/refresh", json=body or None, headers=auth(token))
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+def drop_membership_behind_the_apps_back(db_session, user_id: str, org_id: str) -> None:
+    # no version bump, no cache invalidation: only token claims still say "member"
+    db_session.execute(delete(Membership).where(Membership.user_id == user_id, Membership.org_id == org_id))
+    db_session.commit()
+    auth_cache._local.clear()
+    redis.Redis.from_url(settings.redis_url).delete(f"ac:{org_id}")
+
+def test_current_claims_authorize_without_the_membership_row(client, db_session):
+    token = login(client, f"claims+{uuid.uuid4().hex[:8]}@example.com")
+    assert claims_of(token)["orgs"] == {}
+
+    org_id = client.post("/orgs", json={"name": "claims-org"}, headers=auth(token)).json()["id"]
+    token = refresh(client, token)
+    claims = claims_of(token)
+    assert claims["orgs"] == {encode_org_id(uuid.UUID(org_id)): "o"}
+
+    plain = refresh(client, token, include_memberships=False)
+    assert "orgs" not in claims_of(plain)
+
+    drop_membership_behind_the_apps_back(db_session, claims["sub"], org_id)
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(token)).status_code == 200
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(plain)).status_code == 403
+
+def test_membership_change_makes_old_claims_stale(client, db_session):
+    token = login(client, f"claims-stale+{uuid.uuid4().hex[:8]}@example.com")
+    org_a = client.post("/orgs", json={"name": "claims-a"}, headers=auth(token)).json()["id"]
+    token = refresh(client, token)
+
+    # joining another org bumps the stamp: the old map is no longer trusted
+    client.post("/orgs", json={"name": "claims-b"}, headers=auth(token))
+    drop_membership_behind_the_apps_back(db_session, claims_of(token)["sub"], org_a)
+    assert client.get(f"/orgs/{org_a}/projects", headers=auth(token)).status_code == 403
+
+def test_invite_reaches_a_claims_token_holder(client):
+    owner = login(client, f"claims-owner+{uuid.uuid4().hex[:8]}@example.com")
+    email = f"claims-invitee+{uuid.uuid4().hex[:8]}@example.com"
+    invitee = login(client, email)
+    org_id = client.post("/orgs", json={"name": "claims-c"}, headers=auth(owner)).json()["id"]
+
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(invitee)).status_code == 403
+    r = client.post(f"/orgs/{org_id}/invites", json={"email": email, "role": "member"}, headers=auth(owner))
+    assert r.status_code == 200
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(invitee)).status_code == 200
+
+    invitee = refresh(client, invitee)
+    assert claims_of(invitee)["orgs"] == {encode_org_id(uuid.UUID(org_id)): "m"}
+    assert client.post(f"/orgs/{org_id}/projects", json={"name": "x"}, headers=auth(invitee)).status_code == 403
+
+def test_claims_are_capped(client, monkeypatch):
+    monkeypatch.setattr(settings, "jwt_membership_claims_max_orgs", 1)
+    token = login(client, f"claims-cap+{uuid.uuid4().hex[:8]}@example.com")
+    first = client.post("/orgs", json={"name": "cap-1"}, headers=auth(token)).json()["id"]
+    second = client.post("/orgs", json={"name": "cap-2"}, headers=auth(token)).json()["id"]
+
+    token = refresh(client, token)
+    assert list(claims_of(token)["orgs"]) == [encode_org_id(uuid.UUID(second))]
+
+    # the org left out of the token is authorized from postgres
+    assert client.get(f"/orgs/{first}/projects", headers=auth(token)).status_code == 200
+
+def test_a_deleted_users_token_stops_working(client, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "auth_cache_local_ttl_seconds", 0.0)
+    token = login(client, f"claims-gone+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "claims-gone"}, headers=auth(token)).json()["id"]
+    claims_token = refresh(client, token)
+    plain = refresh(client, token, include_memberships=False)
+    for t in (claims_token, plain):
+        # warm the claims and the cached paths
+        assert client.get(f"/orgs/{org_id}/projects", headers=auth(t)).status_code == 200
+
+    user_id = claims_of(token)["sub"]
+    db_session.execute(delete(Membership).where(Membership.user_id == user_id))
+    db_session.execute(delete(AuthMagicLink).where(AuthMagicLink.user_id == user_id))
+    db_session.execute(delete(User).where(User.id == user_id))
+    db_session.commit()
+
+    for t in (claims_token, plain):
+        r = client.get(f"/orgs/{org_id}/projects", headers=auth(t))
+        assert r.status_code == 401
+        assert r.json()["detail"] == "user not found"
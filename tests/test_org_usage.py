@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+import uuid
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.billing import usage
+from app.models.org import Org
+from app.models.org_usage import OrgUsage
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def counters(db_session: Session, org_id: str) -> tuple[int, int, int]:
+    u = db_session.get(OrgUsage, uuid.UUID(org_id), populate_existing=True)
+    return u.projects, u.tasks, u.members
+
+def test_counters_follow_creates_and_deletes(client, db_session: Session):
+    jwt = login(client, f"usage+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "usage"}, headers=auth(jwt)).json()["id"]
+    assert counters(db_session, org_id) == (0, 0, 1)
+
+    pid = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    r = client.post(f"/orgs/{org_id}/projects/{pid}/tasks:batch", json={"tasks": [{"title": "t"}] * 5}, headers=auth(jwt))
+    task_id = r.json()["created"][0]["id"]
+    client.post(f"/orgs/{org_id}/projects/{pid}/tasks", json={"title": "one more"}, headers=auth(jwt))
+    invitee = f"usage-invitee+{uuid.uuid4().hex[:8]}@example.com"
+    for _ in range(2):  # re-inviting an existing member counts nothing
+        r = client.post(f"/orgs/{org_id}/invites", json={"email": invitee, "role": "member"}, headers=auth(jwt))
+        assert r.status_code == 200
+    assert counters(db_session, org_id) == (1, 6, 2)
+
+    assert client.delete(f"/orgs/{org_id}/tasks/{task_id}", headers=auth(jwt)).status_code == 200
+    assert counters(db_session, org_id) == (1, 5, 2)
+
+    # the project stops counting at once, its tasks as the purge removes them
+    assert client.delete(f"/orgs/{org_id}/projects/{pid}", headers=auth(jwt)).status_code == 200
+    deadline = time.monotonic() + 10
+    while client.get(f"/orgs/{org_id}/projects/{pid}/deletion", headers=auth(jwt)).json()["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert counters(db_session, org_id) == (0, 0, 2)
+
+def test_concurrent_creates_cannot_both_take_the_last_slot(client, db_session: Session):
+    jwt = login(client, f"usage-race+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = uuid.UUID(client.post("/orgs", json={"name": "race"}, headers=auth(jwt)).json()["id"])
+    db_session.execute(update(OrgUsage).where(OrgUsage.org_id == org_id).values(tasks=99))
+    db_session.commit()
+
+    async def scenario():
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            async with sessions() as first, sessions() as second:
+                assert await usage.reserve(first, org_id, "tasks", limit=100) == 100
+                # the second waits on the first's row lock, then sees 100
+                racing = asyncio.create_task(usage.reserve(second, org_id, "tasks", limit=100))
+                await asyncio.sleep(0.2)
+                assert not racing.done()
+                await first.commit()
+                assert await racing is None
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+    assert counters(db_session, str(org_id))[1] == 100
+
+def test_reconcile_repairs_drift_and_missing_rows(client, db_session: Session):
+    jwt = login(client, f"usage-drift+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "drift"}, headers=auth(jwt)).json()["id"]
+    client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt))
+    db_session.execute(update(OrgUsage).where(OrgUsage.org_id == uuid.UUID(org_id)).values(projects=3, tasks=7))
+    db_session.commit()
+
+    # an org created outside the api has no row yet
+    bare = Org(name="no usage row")
+    db_session.add(bare)
+    db_session.commit()
+
+    async def scenario():
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        try:
+            async with async_sessionmaker(bind=engine)() as db:
+                assert await usage.reconcile_org(db, uuid.UUID(org_id)) == {"projects": (3, 1), "tasks": (7, 0)}
+                assert await usage.reconcile_org(db, uuid.UUID(org_id)) == {}
+                # reserve() reconciles an org without a row before counting
+                assert await usage.reserve(db, bare.id, "projects", limit=3) == 1
+                await db.commit()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+    assert counters(db_session, org_id) == (1, 0, 1)
+    assert counters(db_session, str(bare.id)) == (1, 0, 0)
@@ -0,0 +1,77 @@
+import uuid
+from datetime import datetime, timezone
+
+from app.models.project import Project
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def walk(client, path: str, jwt: str, limit: int) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        r = client.get(path, params=params, headers=auth(jwt))
+        assert r.status_code == 200, r.text
+        body = r.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_tasks_are_paged_newest_first(client):
+    jwt = login(client, f"pages+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "pages"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+    for i in range(7):
+        assert client.post(path, json={"title": f"t{i}"}, headers=auth(jwt)).status_code == 200
+
+    pages = walk(client, path, jwt, limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [t["title"] for p in pages for t in p] == [f"t{i}" for i in reversed(range(7))]
+
+    # exact multiple of the limit: no empty trailing page
+    assert [len(p) for p in walk(client, path, jwt, limit=7)] == [7]
+
+def test_rows_sharing_created_at_are_neither_skipped_nor_repeated(client, db_session):
+    jwt = login(client, f"pages-ties+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "ties"}, headers=auth(jwt)).json()["id"]
+
+    same = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ids = {uuid.uuid4() for _ in range(5)}
+    db_session.add_all(Project(id=i, org_id=uuid.UUID(org_id), name=str(i), created_at=same) for i in ids)
+    db_session.commit()
+
+    pages = walk(client, f"/orgs/{org_id}/projects", jwt, limit=2)
+    seen = [p["id"] for page in pages for p in page]
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert sorted(seen) == sorted(str(i) for i in ids)
+
+def test_orgs_are_paged_by_when_the_user_joined(client):
+    email = f"pages-orgs+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    owner = login(client, f"pages-orgs-owner+{uuid.uuid4().hex[:8]}@example.com")
+    # created before any of the user's own orgs, joined after them
+    invited = client.post("/orgs", json={"name": "invited"}, headers=auth(owner)).json()["id"]
+    for i in range(4):
+        assert client.post("/orgs", json={"name": f"own{i}"}, headers=auth(jwt)).status_code == 200
+    r = client.post(f"/orgs/{invited}/invites", json={"email": email, "role": "member"}, headers=auth(owner))
+    assert r.status_code == 200
+
+    pages = walk(client, "/orgs", jwt, limit=2)
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert [o["name"] for p in pages for o in p] == ["invited", "own3", "own2", "own1", "own0"]
+
+def test_bad_cursor_and_limit(client):
+    jwt = login(client, f"pages-bad+{uuid.uuid4().hex[:8]}@example.com")
+    assert client.get("/orgs", params={"cursor": "not-a-cursor"}, headers=auth(jwt)).status_code == 400
+    assert client.get("/orgs", params={"limit": 0}, headers=auth(jwt)).status_code == 422
+    assert client.get("/orgs", params={"limit": 10_000}, headers=auth(jwt)).status_code == 422
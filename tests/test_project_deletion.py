@@ -0,0 +1,221 @@
+import asyncio
+import os
+import time
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import project_deletion
+from app.models.org_usage import OrgUsage
+from app.models.project import Project
+from app.models.project_deletion import ProjectDeletion
+from app.models.task import Task
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def make_projects(client, jwt: str) -> tuple[str, str, str]:
+    org_id = client.post("/orgs", json={"name": "deletion"}, headers=auth(jwt)).json()["id"]
+    doomed = client.post(f"/orgs/{org_id}/projects", json={"name": "doomed"}, headers=auth(jwt)).json()["id"]
+    kept = client.post(f"/orgs/{org_id}/projects", json={"name": "kept"}, headers=auth(jwt)).json()["id"]
+    return org_id, doomed, kept
+
+def add_tasks(client, jwt: str, org_id: str, project_id: str, titles: list[str]) -> list[str]:
+    r = client.post(
+        f"/orgs/{org_id}/projects/{project_id}/tasks:batch",
+        json={"tasks": [{"title": t} for t in titles]},
+        headers=auth(jwt),
+    )
+    assert r.status_code == 200, r.text
+    return [t["id"] for t in r.json()["created"]]
+
+def test_delete_hides_the_project_and_purges_in_batches(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "project_purge_batch_size", 7)
+    monkeypatch.setattr(settings, "project_purge_pause_seconds", 0.0)
+
+    jwt = login(client, f"deletion+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, doomed, kept = make_projects(client, jwt)
+    add_tasks(client, jwt, org_id, doomed, [f"widget {i}" for i in range(30)])
+    kept_ids = add_tasks(client, jwt, org_id, kept, ["widget kept"])
+
+    r = client.delete(f"/orgs/{org_id}/projects/{doomed}", headers=auth(jwt))
+    assert r.status_code == 200, r.text
+    assert r.json()["deleted"] is True
+    assert r.json()["deletion"]["project_id"] == doomed
+
+    listed = client.get(f"/orgs/{org_id}/projects", headers=auth(jwt)).json()["items"]
+    assert [p["id"] for p in listed] == [kept]
+    assert client.get(f"/orgs/{org_id}/projects/{doomed}/tasks", headers=auth(jwt)).status_code == 404
+    found = client.get(f"/orgs/{org_id}/tasks/search", params={"q": "widget"}, headers=auth(jwt)).json()["items"]
+    assert [t["id"] for t in found] == kept_ids
+
+    deadline = time.monotonic() + 10
+    while True:
+        d = client.get(f"/orgs/{org_id}/projects/{doomed}/deletion", headers=auth(jwt)).json()
+        if d["status"] == "done" or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert d["status"] == "done", d
+    assert d["tasks_total"] == d["tasks_purged"] == 30
+    assert d["finished_at"] is not None
+
+    # the project row is gone too; the other project is untouched
+    assert client.delete(f"/orgs/{org_id}/projects/{doomed}", headers=auth(jwt)).status_code == 404
+    assert len(client.get(f"/orgs/{org_id}/projects/{kept}/tasks", headers=auth(jwt)).json()["items"]) == 1
+
+def test_tasks_of_a_deleting_project_are_out_of_reach(client, db_session: Session):
+    jwt = login(client, f"deleting+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, doomed, kept = make_projects(client, jwt)
+    (doomed_task,) = add_tasks(client, jwt, org_id, doomed, ["gadget doomed"])
+    (kept_task,) = add_tasks(client, jwt, org_id, kept, ["gadget kept"])
+
+    # marked but not purged yet, as while a purge is under way
+    db_session.execute(update(Project).where(Project.id == uuid.UUID(doomed)).values(deleting_at=Project.created_at))
+    db_session.commit()
+
+    found = client.get(f"/orgs/{org_id}/tasks/search", params={"q": "gadget"}, headers=auth(jwt)).json()["items"]
+    assert [t["id"] for t in found] == [kept_task]
+
+    r = client.patch(f"/orgs/{org_id}/tasks/{doomed_task}", json={"title": "x"}, headers=auth(jwt))
+    assert r.status_code == 404
+    assert client.delete(f"/orgs/{org_id}/tasks/{doomed_task}", headers=auth(jwt)).status_code == 404
+
+    r = client.patch(
+        f"/orgs/{org_id}/tasks:batch",
+        json={"items": [{"id": doomed_task, "title": "x"}, {"id": kept_task, "project_id": doomed}]},
+        headers=auth(jwt),
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["updated"] == []
+    assert [e["detail"] for e in r.json()["errors"]] == ["task not found", "project not found"]
+
+    r = client.post(f"/orgs/{org_id}/projects/{doomed}/tasks", json={"title": "x"}, headers=auth(jwt))
+    assert r.status_code == 404
+
+def test_concurrent_deletes_record_one_deletion(client, db_session: Session):
+    email = f"deletion-race+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = db_session.scalar(select(User.id).where(User.email == email))
+    org_id, doomed, _ = make_projects(client, jwt)
+    org, project_id = uuid.UUID(org_id), uuid.UUID(doomed)
+
+    async def scenario() -> tuple[bool, bool]:
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        async def mark(db) -> bool:
+            return await project_deletion.mark(db, await db.get(Project, project_id), me)
+
+        try:
+            async with sessions() as first, sessions() as second:
+                first_marked = await mark(first)
+                # the second waits on the first's deletion row
+                later = asyncio.create_task(mark(second))
+                await asyncio.sleep(0.3)
+                assert not later.done()
+                await first.commit()
+                second_marked = await asyncio.wait_for(later, 5)
+                await second.commit()
+                return first_marked, second_marked
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == (True, False)
+    # released once: "kept" is the only live project
+    db_session.expire_all()
+    assert db_session.get(OrgUsage, org).projects == 1
+
+    r = client.delete(f"/orgs/{org_id}/projects/{doomed}", headers=auth(jwt))
+    assert r.status_code == 200, r.text
+    assert r.json()["deletion"]["project_id"] == doomed
+
+def test_purge_gives_up_on_locked_tasks_and_resumes_later(client, db_session: Session, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "project_purge_pause_seconds", 0.0)
+    monkeypatch.setattr(settings, "project_purge_max_retries", 2)
+
+    jwt = login(client, f"deletion-stuck+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, doomed, _ = make_projects(client, jwt)
+    add_tasks(client, jwt, org_id, doomed, ["free", "held"])
+    project_id = uuid.UUID(doomed)
+    db_session.execute(update(Project).where(Project.id == project_id).values(deleting_at=Project.created_at))
+    db_session.add(ProjectDeletion(project_id=project_id, org_id=uuid.UUID(org_id)))
+    db_session.commit()
+
+    async def scenario() -> tuple[str, str | None, list[uuid.UUID], str]:
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            async with sessions() as writer:
+                # a writer sits on one task for the whole purge
+                await writer.execute(
+                    select(Task.id).where(Task.project_id == project_id, Task.title == "held").with_for_update()
+                )
+                stuck = await project_deletion.purge(project_id, sessions)
+            async with sessions() as db:
+                error = (await db.get(ProjectDeletion, project_id)).error
+            # startup resumes it once the writer is gone
+            resumed = await project_deletion.resume(sessions)
+            deadline = time.monotonic() + 10
+            while True:
+                async with sessions() as db:
+                    d = await db.get(ProjectDeletion, project_id)
+                if d.status == "done" or time.monotonic() > deadline:
+                    return stuck, error, resumed, d.status
+                await asyncio.sleep(0.05)
+        finally:
+            await engine.dispose()
+
+    stuck, error, resumed, status = asyncio.run(scenario())
+    assert stuck == "failed"
+    assert "still locked after 2 retries" in error
+    assert project_id in resumed
+    assert status == "done"
+
+def test_purge_survives_losing_the_database(client, db_session: Session, monkeypatch):
+    jwt = login(client, f"deletion-down+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, doomed, _ = make_projects(client, jwt)
+    add_tasks(client, jwt, org_id, doomed, ["t"])
+    project_id = uuid.UUID(doomed)
+    db_session.execute(update(Project).where(Project.id == project_id).values(deleting_at=Project.created_at))
+    db_session.add(ProjectDeletion(project_id=project_id, org_id=uuid.UUID(org_id)))
+    db_session.commit()
+
+    async def scenario() -> str:
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        real = async_sessionmaker(bind=engine, expire_on_commit=False)
+        calls = 0
+
+        def sessions():
+            # the claim goes through, then the database is gone
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                raise ConnectionRefusedError("database down")
+            return real()
+
+        try:
+            return await project_deletion.purge(project_id, sessions)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == "failed"
+    # still claimed: resumable() picks it up when the lease runs out
+    db_session.expire_all()
+    d = db_session.get(ProjectDeletion, project_id)
+    assert d.status == "running" and d.lease_until is not None
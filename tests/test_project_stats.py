@@ -0,0 +1,120 @@
+import asyncio
+import os
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import project_stats
+from app.models.project_task_stats import ProjectTaskStats
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def counts(client, jwt: str, org_id: str, project_id: str) -> tuple[int, int, int, int]:
+    s = client.get(f"/orgs/{org_id}/projects/{project_id}/stats", headers=auth(jwt)).json()
+    return s["todo"], s["doing"], s["done"], s["total"]
+
+def test_stats_follow_every_kind_of_task_write(client, db_session: Session):
+    email = f"stats+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = str(db_session.scalar(select(User.id).where(User.email == email)))
+    org_id = client.post("/orgs", json={"name": "stats"}, headers=auth(jwt)).json()["id"]
+    a = client.post(f"/orgs/{org_id}/projects", json={"name": "a"}, headers=auth(jwt)).json()["id"]
+    b = client.post(f"/orgs/{org_id}/projects", json={"name": "b"}, headers=auth(jwt)).json()["id"]
+
+    s = client.get(f"/orgs/{org_id}/projects/{a}/stats", headers=auth(jwt)).json()
+    assert s == {"todo": 0, "doing": 0, "done": 0, "total": 0, "last_activity_at": None, "by_assignee": []}
+
+    created = client.post(
+        f"/orgs/{org_id}/projects/{a}/tasks:batch",
+        json={"tasks": [{"title": "t"}, {"title": "t"}, {"title": "mine", "assigned_to": me}]},
+        headers=auth(jwt),
+    ).json()["created"]
+    one = client.post(f"/orgs/{org_id}/projects/{a}/tasks", json={"title": "one"}, headers=auth(jwt)).json()
+    r = client.post(
+        f"/orgs/{org_id}/projects/{a}/tasks:import?format=ndjson",
+        content=b'{"title": "imported", "status": "doing"}\n',
+        headers=auth(jwt),
+    )
+    assert r.json()["imported"] == 1
+    assert counts(client, jwt, org_id, a) == (4, 1, 0, 5)
+
+    client.patch(f"/orgs/{org_id}/tasks/{created[2]['id']}", json={"status": "done"}, headers=auth(jwt))
+    client.patch(
+        f"/orgs/{org_id}/tasks:batch",
+        json={"items": [{"id": created[0]["id"], "project_id": b}, {"id": created[1]["id"], "status": "doing"}]},
+        headers=auth(jwt),
+    )
+    client.delete(f"/orgs/{org_id}/tasks/{one['id']}", headers=auth(jwt))
+    assert counts(client, jwt, org_id, a) == (0, 2, 1, 3)
+    assert counts(client, jwt, org_id, b) == (1, 0, 0, 1)
+
+    s = client.get(f"/orgs/{org_id}/projects/{a}/stats", headers=auth(jwt)).json()
+    assert s["by_assignee"] == [
+        {"assigned_to": me, "todo": 0, "doing": 0, "done": 1},
+        {"assigned_to": None, "todo": 0, "doing": 2, "done": 0},
+    ]
+    assert s["last_activity_at"] is not None
+
+    r = client.get(f"/orgs/{org_id}/projects?include=stats", headers=auth(jwt))
+    assert r.status_code == 200
+    by_name = {p["name"]: p["stats"] for p in r.json()["items"]}
+    assert by_name["a"] == s
+    assert by_name["b"]["total"] == 1
+    assert "stats" not in client.get(f"/orgs/{org_id}/projects", headers=auth(jwt)).json()["items"][0]
+
+def test_stats_are_conditional_on_the_project_version(client):
+    jwt = login(client, f"stats-etag+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "stats"}, headers=auth(jwt)).json()["id"]
+    pid = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    path = f"/orgs/{org_id}/projects/{pid}/stats"
+
+    tag = client.get(path, headers=auth(jwt)).headers["etag"]
+    assert client.get(path, headers=auth(jwt) | {"if-none-match": tag}).status_code == 304
+    client.post(f"/orgs/{org_id}/projects/{pid}/tasks", json={"title": "t"}, headers=auth(jwt))
+    r = client.get(path, headers=auth(jwt) | {"if-none-match": tag})
+    assert r.status_code == 200
+    assert r.json()["todo"] == 1
+
+    other_jwt = login(client, f"stats-other+{uuid.uuid4().hex[:8]}@example.com")
+    assert client.get(path, headers=auth(other_jwt)).status_code == 403
+
+def test_rebuild_repairs_a_drifted_rollup(client, db_session: Session):
+    jwt = login(client, f"stats-rebuild+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "stats"}, headers=auth(jwt)).json()["id"]
+    pid = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    client.post(f"/orgs/{org_id}/projects/{pid}/tasks:batch", json={"tasks": [{"title": "t"}] * 3}, headers=auth(jwt))
+
+    db_session.execute(
+        update(ProjectTaskStats).where(ProjectTaskStats.project_id == uuid.UUID(pid)).values(todo=40, done=2)
+    )
+    db_session.commit()
+    assert counts(client, jwt, org_id, pid) == (40, 0, 2, 42)
+
+    async def scenario() -> list[bool]:
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            repaired = []
+            for _ in range(2):
+                async with sessions() as db:
+                    repaired.append(await project_stats.rebuild(db, uuid.UUID(pid)))
+                    await db.commit()
+            return repaired
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == [True, False]
+    assert counts(client, jwt, org_id, pid) == (3, 0, 0, 3)
@@ -0,0 +1,117 @@
+import uuid
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.tokens import issue_access_token
+from app.config import settings
+from app.main import lifespan
+import app.ratelimit as rl
+from app.ratelimit import rate_limit
+
+def _app(algorithm: str, key_by: tuple[str, ...] = ("ip",), limit: int = 3) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    name = f"test:{uuid.uuid4().hex[:8]}"
+
+    @app.get("/orgs/{org_id}/ping")
+    async def ping(org_id: str, _: None = Depends(rate_limit(name, limit, 60, algorithm, key_by))) -> dict:
+        return {"ok": True}
+
+    return app
+
+@pytest.fixture(autouse=True)
+def _limiter_on(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+def test_limit_headers_and_retry_after(algorithm):
+    with TestClient(_app(algorithm)) as c:
+        remaining = []
+        for _ in range(3):
+            r = c.get("/orgs/o1/ping")
+            assert r.status_code == 200, r.text
+            assert r.headers["ratelimit-limit"] == "3"
+            assert r.headers["ratelimit-policy"] == "3;w=60"
+            remaining.append(int(r.headers["ratelimit-remaining"]))
+        assert remaining == [2, 1, 0]
+
+        r = c.get("/orgs/o1/ping")
+        assert r.status_code == 429
+        assert r.json()["detail"] == "rate_limited"
+        assert int(r.headers["retry-after"]) >= 1
+        assert r.headers["ratelimit-remaining"] == "0"
+
+def test_keys_compose_from_org_and_user():
+    with TestClient(_app("sliding_window", key_by=("org", "user"), limit=1)) as c:
+        alice = {"authorization": f"bearer {issue_access_token(uuid.uuid4())}"}
+        bob = {"authorization": f"bearer {issue_access_token(uuid.uuid4())}"}
+
+        assert c.get("/orgs/o1/ping", headers=alice).status_code == 200
+        assert c.get("/orgs/o1/ping", headers=alice).status_code == 429
+
+        # separate budget per user, and per org for the same user
+        assert c.get("/orgs/o1/ping", headers=bob).status_code == 200
+        assert c.get("/orgs/o2/ping", headers=alice).status_code == 200
+
+def test_leased_bucket_is_exact_on_one_worker_and_batches_round_trips(monkeypatch):
+    calls = {"n": 0}
+    real = rl._lease
+
+    async def _counting(keys, args):
+        calls["n"] += 1
+        return await real(keys, args)
+
+    monkeypatch.setattr(rl, "_lease", _counting)
+    monkeypatch.setattr(settings, "rate_limit_lease_chunk", 5)
+
+    app = FastAPI(lifespan=lifespan)
+    name = f"test:{uuid.uuid4().hex[:8]}"
+
+    @app.get("/ping")
+    async def ping(_: None = Depends(rate_limit(name, 50, 60, leased=True))) -> dict:
+        return {"ok": True}
+
+    with TestClient(app) as c:
+        codes = [c.get("/ping").status_code for _ in range(55)]
+
+    assert codes[:50] == [200] * 50
+    assert codes[50:] == [429] * 5
+    # 10 leases of 5, one empty lease, then denials served locally
+    assert calls["n"] == 11
+
+def test_failed_refill_keeps_the_expired_lease_tokens(monkeypatch):
+    import asyncio
+
+    from app import redis_client
+
+    monkeypatch.setattr(settings, "rate_limit_lease_chunk", 5)
+    key = f"test:{uuid.uuid4().hex[:8]}"
+    real = rl._lease
+    returned: list[int] = []
+
+    async def _down(keys, args):
+        raise ConnectionError("redis down")
+
+    async def _recording(keys, args):
+        returned.append(args[3])
+        return await real(keys, args)
+
+    async def scenario() -> None:
+        try:
+            assert (await rl.check_limit_leased(key, 50, 60)).allowed
+            assert rl._leases[key].tokens == 4
+            rl._leases[key].expires_at = 0.0
+
+            monkeypatch.setattr(rl, "_lease", _down)
+            assert await rl.check_limit_leased(key, 50, 60) is None
+            assert rl._leases[key].tokens == 4
+
+            monkeypatch.setattr(redis_client, "_down_until", 0.0)
+            monkeypatch.setattr(rl, "_lease", _recording)
+            assert (await rl.check_limit_leased(key, 50, 60)).allowed
+            assert returned == [4]
+        finally:
+            await redis_client.close_redis()
+
+    asyncio.run(scenario())
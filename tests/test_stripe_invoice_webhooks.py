@@ -15,7 +15,7 @@ def _post_invoice(client, event_id: str, event_type: str, customer: str, subscri
         },
     )
 
-def test_invoice_paid_sets_active_and_is_idempotent(client, db_session, seeded_org):
+def test_invoice_paid_sets_active_and_is_idempotent(client, db_session, seeded_org, drain_webhooks):
     # seeded_org fixture should give you an org + owner membership; adapt if your fixture name differs
     org: Org = seeded_org
     org.stripe_customer_id = "cus_invoice_ok"
@@ -24,6 +24,7 @@ def test_invoice_paid_sets_active_and_is_idempotent(client, db_session, seeded_o
     event_id = f"evt_invoice_paid_{int(time.time())}"
     r1 = _post_invoice(client, event_id, "invoice.paid", "cus_invoice_ok")
     assert r1.status_code == 200
+    drain_webhooks()
     db_session.refresh(org)
     assert org.subscription_status == SubscriptionStatus.active
     assert org.plan == Plan.pro
@@ -36,7 +37,7 @@ def test_invoice_paid_sets_active_and_is_idempotent(client, db_session, seeded_o
     assert row is not None
     assert row.status in {"processed", "ignored"}
 
-def test_invoice_payment_failed_blocks_writes(client, db_session, seeded_org, owner_jwt):
+def test_invoice_payment_failed_blocks_writes(client, db_session, seeded_org, owner_jwt, drain_webhooks):
     org: Org = seeded_org
     org.stripe_customer_id = "cus_invoice_fail"
     db_session.commit()
@@ -44,6 +45,7 @@ def test_invoice_payment_failed_blocks_writes(client, db_session, seeded_org, ow
     event_id = f"evt_invoice_fail_{int(time.time())}"
     r = _post_invoice(client, event_id, "invoice.payment_failed", "cus_invoice_fail")
     assert r.status_code == 200
+    drain_webhooks()
 
     db_session.refresh(org)
     assert org.subscription_status == SubscriptionStatus.past_due
@@ -0,0 +1,88 @@
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def make_project(client, jwt: str) -> tuple[str, str]:
+    org_id = client.post("/orgs", json={"name": "batch"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    return org_id, project_id
+
+def batch(client, jwt: str, org_id: str, project_id: str, tasks: list[dict]):
+    return client.post(f"/orgs/{org_id}/projects/{project_id}/tasks:batch", json={"tasks": tasks}, headers=auth(jwt))
+
+def test_batch_creates_in_order_and_reports_bad_items(client, db_session: Session):
+    email = f"batch+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = db_session.scalar(select(User.id).where(User.email == email))
+    org_id, project_id = make_project(client, jwt)
+
+    r = batch(
+        client,
+        jwt,
+        org_id,
+        project_id,
+        [
+            {"title": "first", "assigned_to": str(me)},
+            {"title": "ghost", "assigned_to": str(uuid.uuid4())},
+            {"title": "x" * 301},
+            {"title": "last"},
+        ],
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [t["title"] for t in body["created"]] == ["first", "last"]
+    assert body["created"][0]["assigned_to"] == str(me)
+    assert all(t["status"] == "todo" and t["project_id"] == project_id for t in body["created"])
+    assert body["errors"] == [
+        {"index": 1, "detail": "assignee not found"},
+        {"index": 2, "detail": "title too long"},
+    ]
+
+    listed = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).json()["items"]
+    assert {t["id"] for t in listed} == {t["id"] for t in body["created"]}
+
+def test_batch_checks_the_free_cap_once_for_the_whole_batch(client):
+    jwt = login(client, f"batch-cap+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_project(client, jwt)
+
+    r = batch(client, jwt, org_id, project_id, [{"title": f"t{i}"} for i in range(101)])
+    assert r.status_code == 402
+    assert r.json()["detail"] == "free_plan_task_limit"
+    assert client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).json()["items"] == []
+
+    r = batch(client, jwt, org_id, project_id, [{"title": f"t{i}"} for i in range(99)])
+    assert r.status_code == 200
+    assert len(r.json()["created"]) == 99
+
+    # exactly at the cap is fine, one past it is not
+    assert batch(client, jwt, org_id, project_id, [{"title": "a"}, {"title": "b"}]).status_code == 402
+    assert batch(client, jwt, org_id, project_id, [{"title": "a"}]).status_code == 200
+    r = client.post(f"/orgs/{org_id}/projects/{project_id}/tasks", json={"title": "c"}, headers=auth(jwt))
+    assert r.status_code == 402
+
+def test_batch_rejects_empty_oversized_and_foreign_projects(client):
+    from app.config import settings
+
+    jwt = login(client, f"batch-shape+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_project(client, jwt)
+    other_jwt = login(client, f"batch-other+{uuid.uuid4().hex[:8]}@example.com")
+    _, other_project = make_project(client, other_jwt)
+
+    assert batch(client, jwt, org_id, project_id, []).status_code == 422
+    too_many = [{"title": "t"}] * (settings.task_batch_max_items + 1)
+    assert batch(client, jwt, org_id, project_id, too_many).status_code == 422
+    assert batch(client, jwt, org_id, other_project, [{"title": "t"}]).status_code == 404
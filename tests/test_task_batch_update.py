@@ -0,0 +1,117 @@
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.enums import Role
+from app.models.membership import Membership
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def setup_org(client, jwt: str, titles: list[str]) -> tuple[str, str, list[str]]:
+    org_id = client.post("/orgs", json={"name": "kanban"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "board"}, headers=auth(jwt)).json()["id"]
+    ids = []
+    for title in titles:
+        r = client.post(f"/orgs/{org_id}/projects/{project_id}/tasks", json={"title": title}, headers=auth(jwt))
+        ids.append(r.json()["id"])
+    return org_id, project_id, ids
+
+def patch(client, jwt: str, org_id: str, body: dict, **params):
+    return client.patch(f"/orgs/{org_id}/tasks:batch", json=body, params=params, headers=auth(jwt))
+
+def test_batch_update_by_ids(client):
+    jwt = login(client, f"kanban+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id, (a, b, c) = setup_org(client, jwt, ["a", "b", "c"])
+    other_project = client.post(f"/orgs/{org_id}/projects", json={"name": "next"}, headers=auth(jwt)).json()["id"]
+
+    r = patch(
+        client,
+        jwt,
+        org_id,
+        {
+            "items": [
+                {"id": c, "status": "done", "title": "c!"},
+                {"id": a, "status": "doing"},
+                {"id": str(uuid.uuid4()), "status": "doing"},
+                {"id": b, "status": "doing", "project_id": other_project},
+                {"id": a, "status": "done"},
+                {"id": str(uuid.uuid4()), "project_id": str(uuid.uuid4())},
+                {"id": str(uuid.uuid4())},
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [(t["id"], t["status"], t["title"]) for t in body["updated"]] == [
+        (c, "done", "c!"),
+        (a, "doing", "a"),
+        (b, "doing", "b"),
+    ]
+    assert body["updated"][2]["project_id"] == other_project
+    assert body["errors"] == [
+        {"index": 2, "detail": "task not found"},
+        {"index": 4, "detail": "duplicate id"},
+        {"index": 5, "detail": "project not found"},
+        {"index": 6, "detail": "nothing to change"},
+    ]
+
+    # the query string guards the move: only tasks still in todo
+    r = patch(client, jwt, org_id, {"items": [{"id": a, "status": "done"}]}, status="todo")
+    assert r.json() == {"updated": [], "errors": [{"index": 0, "detail": "not matched"}]}
+
+def test_batch_update_by_filter(client, monkeypatch):
+    from app.config import settings
+
+    jwt = login(client, f"kanban-filter+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id, ids = setup_org(client, jwt, ["a", "b", "c"])
+    patch(client, jwt, org_id, {"items": [{"id": ids[0], "status": "doing"}]})
+
+    assert patch(client, jwt, org_id, {"changes": {"status": "done"}}).status_code == 400
+    assert patch(client, jwt, org_id, {"items": [{"id": ids[0]}], "changes": {"status": "done"}}).status_code == 422
+
+    r = patch(client, jwt, org_id, {"changes": {"status": "done"}}, project_id=project_id, status="todo")
+    assert r.status_code == 200
+    assert sorted(t["id"] for t in r.json()["updated"]) == sorted(ids[1:])
+    assert all(t["status"] == "done" for t in r.json()["updated"])
+
+    # too broad: nothing is changed
+    monkeypatch.setattr(settings, "task_batch_max_items", 2)
+    r = patch(client, jwt, org_id, {"changes": {"title": "same"}}, project_id=project_id)
+    assert r.status_code == 400
+    listed = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).json()["items"]
+    assert "same" not in {t["title"] for t in listed}
+
+def test_batch_update_members_only_touch_their_tasks(client, db_session: Session):
+    owner_jwt = login(client, f"kanban-owner+{uuid.uuid4().hex[:8]}@example.com")
+    member_email = f"kanban-member+{uuid.uuid4().hex[:8]}@example.com"
+    member_jwt = login(client, member_email)
+    org_id, project_id, (owners,) = setup_org(client, owner_jwt, ["owner's"])
+    member = db_session.scalar(select(User).where(User.email == member_email))
+    db_session.add(Membership(user_id=member.id, org_id=uuid.UUID(org_id), role=Role.member))
+    db_session.commit()
+
+    r = client.post(f"/orgs/{org_id}/projects/{project_id}/tasks", json={"title": "mine"}, headers=auth(member_jwt))
+    mine = r.json()["id"]
+
+    r = patch(client, member_jwt, org_id, {"items": [{"id": owners, "status": "done"}, {"id": mine, "status": "done"}]})
+    assert [t["id"] for t in r.json()["updated"]] == [mine]
+    assert r.json()["errors"] == [{"index": 0, "detail": "forbidden"}]
+
+    r = patch(client, member_jwt, org_id, {"changes": {"status": "doing"}}, project_id=project_id)
+    assert [t["id"] for t in r.json()["updated"]] == [mine]
+
+    # assigning the owner's task to the member makes it theirs to move
+    patch(client, owner_jwt, org_id, {"items": [{"id": owners, "assigned_to": str(member.id)}]})
+    r = patch(client, member_jwt, org_id, {"changes": {"status": "doing"}}, project_id=project_id)
+    assert sorted(t["id"] for t in r.json()["updated"]) == sorted([owners, mine])
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import uuid
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def seed(client, jwt: str) -> tuple[str, str, list[str]]:
+    # -> org, first project, task ids newest first
+    org_id = client.post("/orgs", json={"name": "export"}, headers=auth(jwt)).json()["id"]
+    ids = []
+    projects = []
+    for name, n in (("a", 15), ("b", 10)):
+        pid = client.post(f"/orgs/{org_id}/projects", json={"name": name}, headers=auth(jwt)).json()["id"]
+        projects.append(pid)
+        for i in range(n):
+            # one request per task: distinct created_at, a predictable order
+            r = client.post(f"/orgs/{org_id}/projects/{pid}/tasks", json={"title": f'{name} "{i}", ok'}, headers=auth(jwt))
+            ids.append(r.json()["id"])
+    return org_id, projects[0], ids[::-1]
+
+def ndjson(r) -> list[dict]:
+    return [json.loads(line) for line in r.text.splitlines()]
+
+def test_export_streams_every_task_and_resumes_from_a_cursor(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "task_export_batch_size", 4)
+    jwt = login(client, f"export+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_a, ids = seed(client, jwt)
+
+    r = client.get(f"/orgs/{org_id}/tasks/export", headers=auth(jwt))
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = ndjson(r)
+    assert [t["id"] for t in rows] == ids
+    assert rows[-1]["title"] == 'a "0", ok' and rows[-1]["status"] == "todo"
+
+    # the connection dropped after row 10: pick up from its cursor
+    r = client.get(f"/orgs/{org_id}/tasks/export", params={"cursor": rows[9]["cursor"]}, headers=auth(jwt))
+    assert [t["id"] for t in ndjson(r)] == ids[10:]
+
+    r = client.get(f"/orgs/{org_id}/tasks/export", params={"project_id": project_a}, headers=auth(jwt))
+    assert [t["id"] for t in ndjson(r)] == ids[10:]
+
+def test_export_as_csv(client):
+    jwt = login(client, f"export-csv+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, _, ids = seed(client, jwt)
+
+    r = client.get(f"/orgs/{org_id}/tasks/export", params={"format": "csv", "status": "todo"}, headers=auth(jwt))
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [t["id"] for t in rows] == ids
+    assert rows[-1]["title"] == 'a "0", ok'
+    assert rows[-1]["assigned_to"] == ""
+
+def test_export_checks_access_and_cursor(client):
+    jwt = login(client, f"export-acl+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "export"}, headers=auth(jwt)).json()["id"]
+    outsider = login(client, f"export-out+{uuid.uuid4().hex[:8]}@example.com")
+
+    assert client.get(f"/orgs/{org_id}/tasks/export", headers=auth(outsider)).status_code == 403
+    assert client.get(f"/orgs/{org_id}/tasks/export", params={"cursor": "nope"}, headers=auth(jwt)).status_code == 400
+    assert client.get(f"/orgs/{org_id}/tasks/export", params={"format": "xml"}, headers=auth(jwt)).status_code == 422
+    assert client.get(f"/orgs/{org_id}/tasks/export", headers=auth(jwt)).text == ""
@@ -0,0 +1,165 @@
+"""EXPLAIN checks for the task list filters on a seeded 1M-task dataset.
+
+slow (seeding takes a minute or more), so opt-in:
+
+    RUN_EXPLAIN_TESTS=1 pytest tests/test_task_filter_plans.py
+
+EXPLAIN_SEED_TASKS overrides the row count (default 1,000,000). half the
+rows land in one big project, the rest spread over 99 others; ~60% done.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.models.enums import TaskStatus
+from app.pagination import PageParams
+from app.routes.tasks import _list_statement
+from app.task_filters import TaskFilters
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("RUN_EXPLAIN_TESTS") != "1", reason="set RUN_EXPLAIN_TESTS=1 (seeds 1M tasks)"
+)
+
+ORG = uuid.UUID("00000000-0000-0000-0001-000000000001")
+BIG_PROJECT = uuid.UUID("00000000-0000-0000-0002-000000000001")
+USER = uuid.UUID("00000000-0000-0000-0000-000000000007")
+
+_SEED = """
+insert into users(id, email)
+select ('00000000-0000-0000-0000-' || lpad(g::text, 12, '0'))::uuid, 'seed' || g || '@example.com'
+from generate_series(1, 50) g;
+
+insert into orgs(id, name)
+select ('00000000-0000-0000-0001-' || lpad(g::text, 12, '0'))::uuid, 'seed org ' || g
+from generate_series(1, 20) g;
+
+insert into projects(id, org_id, name)
+select ('00000000-0000-0000-0002-' || lpad(g::text, 12, '0'))::uuid,
+       ('00000000-0000-0000-0001-' || lpad((1 + (g - 1) / 5)::text, 12, '0'))::uuid,
+       'seed project ' || g
+from generate_series(1, 100) g;
+
+insert into tasks(id, org_id, project_id, title, status, created_by, assigned_to, created_at, updated_at)
+select gen_random_uuid(),
+       ('00000000-0000-0000-0001-' || lpad((1 + (p - 1) / 5)::text, 12, '0'))::uuid,
+       ('00000000-0000-0000-0002-' || lpad(p::text, 12, '0'))::uuid,
+       't' || g,
+       (case when r < 0.6 then 'done' when r < 0.85 then 'todo' else 'doing' end)::task_status,
+       ('00000000-0000-0000-0000-' || lpad((1 + (g % 50))::text, 12, '0'))::uuid,
+       case when g % 5 = 0 then null
+            else ('00000000-0000-0000-0000-' || lpad((1 + ((g * 7) % 50))::text, 12, '0'))::uuid end,
+       ts,
+       ts + (g % 1000) * interval '1 minute'
+from (
+  select g, random() as r,
+         case when g <= :n / 2 then 1 else 2 + (g % 99) end as p,
+         timestamptz '2024-01-01' + g * interval '1 minute' as ts
+  from generate_series(1, :n) g
+) s;
+
+analyze users, orgs, projects, tasks;
+"""
+
+@pytest.fixture(scope="module")
+def seeded():
+    engine = create_engine(os.environ["DATABASE_URL"])
+    n = int(os.getenv("EXPLAIN_SEED_TASKS", "1000000"))
+    with engine.begin() as conn:
+        for stmt in filter(str.strip, _SEED.split(";")):
+            conn.execute(text(stmt), {"n": n})
+    try:
+        yield engine
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("truncate tasks, projects, memberships, orgs, users cascade"))
+        engine.dispose()
+
+def _filters(**kw) -> TaskFilters:
+    return TaskFilters(
+        **{
+            k: kw.get(k)
+            for k in (
+                "status",
+                "assigned_to",
+                "created_by",
+                "created_after",
+                "created_before",
+                "updated_after",
+                "updated_before",
+            )
+        }
+    )
+
+def _page(limit: int = 50, after=None) -> PageParams:
+    p = PageParams(limit=limit, cursor=None)
+    p.after = after
+    return p
+
+def _plan(engine, filters: TaskFilters, page: PageParams) -> dict:
+    # built by the helper list_tasks runs
+    q = _list_statement(ORG, BIG_PROJECT, filters, page)
+    with engine.connect() as conn:
+        compiled = q.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+        return conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()[0]["Plan"]
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+def _assert_index_scan(plan: dict, *indexes: str) -> None:
+    nodes = list(_nodes(plan))
+    scans = [n for n in nodes if n.get("Relation Name") == "tasks" or "Index Name" in n]
+    assert not any(n["Node Type"] == "Seq Scan" for n in scans), plan
+    used = {n.get("Index Name") for n in scans}
+    assert used & set(indexes), (used, plan)
+
+@pytest.mark.parametrize(
+    "filters, indexes",
+    [
+        pytest.param(dict(status=[TaskStatus.todo]), ["ix_tasks_project_status_created"], id="status"),
+        pytest.param(
+            dict(assigned_to=USER, status=[TaskStatus.todo, TaskStatus.doing]),
+            ["ix_tasks_project_assignee_open"],
+            id="open-per-assignee",
+        ),
+        pytest.param(
+            dict(assigned_to=USER),
+            ["ix_tasks_project_assignee_created", "ix_tasks_project_assignee_open"],
+            id="assignee",
+        ),
+        pytest.param(dict(created_by=USER), ["ix_tasks_project_creator_created"], id="creator"),
+        pytest.param(
+            dict(
+                created_after=datetime(2024, 3, 1, tzinfo=timezone.utc),
+                created_before=datetime(2024, 3, 8, tzinfo=timezone.utc),
+            ),
+            ["ix_tasks_org_project_created_id"],
+            id="created-range",
+        ),
+        pytest.param(
+            dict(
+                updated_after=datetime(2024, 3, 1, tzinfo=timezone.utc),
+                updated_before=datetime(2024, 3, 2, tzinfo=timezone.utc),
+            ),
+            ["ix_tasks_project_updated"],
+            id="updated-range",
+        ),
+        pytest.param(
+            dict(status=[TaskStatus.doing], created_by=USER),
+            ["ix_tasks_project_status_created", "ix_tasks_project_creator_created"],
+            id="status+creator",
+        ),
+    ],
+)
+def test_hot_filters_use_index_scans(seeded, filters, indexes):
+    _assert_index_scan(_plan(seeded, _filters(**filters), _page()), *indexes)
+
+def test_deep_filtered_page_is_still_an_index_range_scan(seeded):
+    after = (datetime(2024, 6, 1, tzinfo=timezone.utc), uuid.UUID(int=0))
+    plan = _plan(seeded, _filters(status=[TaskStatus.todo]), _page(after=after))
+    _assert_index_scan(plan, "ix_tasks_project_status_created")
+    assert plan["Node Type"] == "Limit"
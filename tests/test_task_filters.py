@@ -0,0 +1,68 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.models.task import Task
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def test_filters_compose(client, db_session):
+    owner = login(client, f"filters+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "filters"}, headers=auth(owner)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(owner)).json()["id"]
+    path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+
+    a = client.post(path, json={"title": "a"}, headers=auth(owner)).json()
+    owner_id = a["created_by"]
+    client.post(path, json={"title": "b", "assigned_to": owner_id}, headers=auth(owner))
+    c = client.post(path, json={"title": "c", "assigned_to": owner_id}, headers=auth(owner)).json()
+    client.patch(f"/orgs/{org_id}/tasks/{c['id']}", json={"status": "done"}, headers=auth(owner))
+
+    # push "a" back in time so the ranges have something to cut
+    t = db_session.get(Task, uuid.UUID(a["id"]))
+    t.created_at = t.updated_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db_session.commit()
+
+    def titles(**params) -> list[str]:
+        r = client.get(path, params=params, headers=auth(owner))
+        assert r.status_code == 200, r.text
+        return [x["title"] for x in r.json()["items"]]
+
+    assert titles() == ["c", "b", "a"]
+    assert titles(status="todo") == ["b", "a"]
+    assert titles(status=["todo", "done"]) == ["c", "b", "a"]
+    assert titles(assigned_to=owner_id) == ["c", "b"]
+    assert titles(assigned_to=owner_id, status=["todo", "doing"]) == ["b"]
+    assert titles(created_by=owner_id, status="done") == ["c"]
+    assert titles(created_by=str(uuid.uuid4())) == []
+
+    cut = datetime(2025, 6, 1, tzinfo=timezone.utc).isoformat()
+    assert titles(created_before=cut) == ["a"]
+    assert titles(created_after=cut) == ["c", "b"]
+    assert titles(updated_after=cut, status="todo") == ["b"]
+
+    # filters and cursors compose
+    r = client.get(path, params={"assigned_to": owner_id, "limit": 1}, headers=auth(owner)).json()
+    assert [x["title"] for x in r["items"]] == ["c"]
+    r = client.get(
+        path, params={"assigned_to": owner_id, "limit": 1, "cursor": r["next_cursor"]}, headers=auth(owner)
+    ).json()
+    assert [x["title"] for x in r["items"]] == ["b"] and r["next_cursor"] is None
+
+def test_bad_filter_values(client):
+    owner = login(client, f"filters-bad+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "filters-bad"}, headers=auth(owner)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(owner)).json()["id"]
+    path = f"/orgs/{org_id}/projects/{project_id}/tasks"
+
+    assert client.get(path, params={"status": "nope"}, headers=auth(owner)).status_code == 422
+    naive = (datetime.now() - timedelta(days=1)).replace(microsecond=0).isoformat()
+    assert client.get(path, params={"created_after": naive}, headers=auth(owner)).status_code == 400
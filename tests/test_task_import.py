@@ -0,0 +1,162 @@
+import json
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import task_import
+from app.models.user import User
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def make_project(client, jwt: str) -> tuple[str, str]:
+    org_id = client.post("/orgs", json={"name": "import"}, headers=auth(jwt)).json()["id"]
+    project_id = client.post(f"/orgs/{org_id}/projects", json={"name": "p"}, headers=auth(jwt)).json()["id"]
+    return org_id, project_id
+
+def upload(client, jwt, org_id, project_id, body: str, fmt: str = "ndjson", **params):
+    def chunks():
+        # a few bytes at a time: records and utf-8 sequences split across chunks
+        data = body.encode("utf-8")
+        for i in range(0, len(data), 7):
+            yield data[i : i + 7]
+
+    return client.post(
+        f"/orgs/{org_id}/projects/{project_id}/tasks:import",
+        params={"format": fmt, **params},
+        content=chunks(),
+        headers=auth(jwt),
+    )
+
+def titles(client, jwt, org_id, project_id) -> list[str]:
+    items = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).json()["items"]
+    return [t["title"] for t in items]
+
+def test_ndjson_import_skips_bad_records_and_keeps_file_order(client, db_session: Session, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "task_import_chunk_size", 2)
+    email = f"import+{uuid.uuid4().hex[:8]}@example.com"
+    jwt = login(client, email)
+    me = db_session.scalar(select(User.id).where(User.email == email))
+    org_id, project_id = make_project(client, jwt)
+
+    lines = [
+        {"title": "first ünïcode", "status": "doing", "assigned_to": str(me)},
+        {"title": "ghost", "assigned_to": str(uuid.uuid4())},
+        "not json",
+        {"title": "x" * 301},
+        {"title": "bad status", "status": "later"},
+        {"status": "todo"},
+        {"title": "last", "extra": "ignored"},
+    ]
+    body = "\n".join(line if isinstance(line, str) else json.dumps(line, ensure_ascii=False) for line in lines)
+    r = upload(client, jwt, org_id, project_id, body + "\n\n")
+    assert r.status_code == 200, r.text
+    out = r.json()
+    assert uuid.UUID(out.pop("id"))
+    assert out == {
+        "imported": 2,
+        "rejected": 5,
+        "errors": [
+            {"line": 2, "detail": "assignee not found"},
+            {"line": 3, "detail": "invalid json"},
+            {"line": 4, "detail": "title too long"},
+            {"line": 5, "detail": "unknown status"},
+            {"line": 6, "detail": "title missing"},
+        ],
+    }
+    items = client.get(f"/orgs/{org_id}/projects/{project_id}/tasks", headers=auth(jwt)).json()["items"]
+    assert [(t["title"], t["status"]) for t in items] == [("last", "todo"), ("first ünïcode", "doing")]
+    assert items[1]["assigned_to"] == str(me)
+
+def test_csv_import_reads_an_export_back(client):
+    jwt = login(client, f"import-csv+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_project(client, jwt)
+    body = 'Title,status,notes\r\nplain,done,x\r\n"quoted, with ""quotes""",,\r\n"two\nlines",todo,\r\n'
+    r = upload(client, jwt, org_id, project_id, body, fmt="csv")
+    assert r.status_code == 200, r.text
+    assert r.json()["imported"] == 3
+    assert titles(client, jwt, org_id, project_id) == ["two\nlines", 'quoted, with "quotes"', "plain"]
+
+    # an export imports as is (newest first there, so the order flips)
+    export = client.get(f"/orgs/{org_id}/tasks/export", params={"format": "csv"}, headers=auth(jwt)).text
+    other_org, other_project = make_project(client, jwt)
+    r = upload(client, jwt, other_org, other_project, export, fmt="csv")
+    assert r.json()["imported"] == 3
+    assert titles(client, jwt, other_org, other_project) == ["plain", 'quoted, with "quotes"', "two\nlines"]
+
+    r = upload(client, jwt, org_id, project_id, "name\nfoo\n", fmt="csv")
+    assert r.status_code == 400
+
+def test_import_respects_the_free_cap_all_or_nothing(client):
+    jwt = login(client, f"import-cap+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_project(client, jwt)
+    client.post(
+        f"/orgs/{org_id}/projects/{project_id}/tasks:batch",
+        json={"tasks": [{"title": "existing"}] * 50},
+        headers=auth(jwt),
+    )
+
+    r = upload(client, jwt, org_id, project_id, "".join(json.dumps({"title": f"t{i}"}) + "\n" for i in range(51)))
+    assert r.status_code == 402
+    assert r.json()["detail"] == "free_plan_task_limit"
+    # nothing from the failed import landed
+    assert len(titles(client, jwt, org_id, project_id)) == 50
+
+    r = upload(client, jwt, org_id, project_id, "".join(json.dumps({"title": f"t{i}"}) + "\n" for i in range(50)))
+    assert r.status_code == 200
+    assert r.json()["imported"] == 50
+
+def test_import_progress_is_readable_by_id(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "task_import_chunk_size", 2)
+    saved = []
+    save_status = task_import.save_status
+
+    async def recording(org_id, project_id, import_id, state, result, detail=None):
+        saved.append((state, result.read))
+        await save_status(org_id, project_id, import_id, state, result, detail)
+
+    monkeypatch.setattr(task_import, "save_status", recording)
+    jwt = login(client, f"import-progress+{uuid.uuid4().hex[:8]}@example.com")
+    org_id, project_id = make_project(client, jwt)
+    status = f"/orgs/{org_id}/projects/{project_id}/tasks:import"
+
+    import_id = str(uuid.uuid4())
+    body = "".join(json.dumps({"title": f"t{i}"}) + "\n" for i in range(5))
+    r = upload(client, jwt, org_id, project_id, body, import_id=import_id)
+    assert r.json()["id"] == import_id
+    # running after every chunk, then done
+    assert saved[0] == ("running", 0)
+    assert {s for s, _ in saved[:-1]} == {"running"}
+    assert [n for _, n in saved] == sorted(n for _, n in saved)
+    assert saved[-1] == ("done", 5)
+    r = client.get(f"{status}/{import_id}", headers=auth(jwt))
+    assert r.json() == {
+        "id": import_id,
+        "state": "done",
+        "read": 5,
+        "staged": 5,
+        "rejected": 0,
+        "imported": 5,
+        "detail": None,
+    }
+    assert client.get(f"{status}/{uuid.uuid4()}", headers=auth(jwt)).status_code == 404
+
+    # over the free cap: failed, with the reason
+    failed_id = str(uuid.uuid4())
+    body = "".join(json.dumps({"title": f"u{i}"}) + "\n" for i in range(100))
+    assert upload(client, jwt, org_id, project_id, body, import_id=failed_id).status_code == 402
+    r = client.get(f"{status}/{failed_id}", headers=auth(jwt)).json()
+    assert (r["state"], r["imported"], r["detail"]) == ("failed", 0, "free_plan_task_limit")
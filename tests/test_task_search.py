@@ -0,0 +1,129 @@
+import uuid
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def make_org(client, jwt: str, titles: list[str], projects: int = 1) -> str:
+    org_id = client.post("/orgs", json={"name": "search"}, headers=auth(jwt)).json()["id"]
+    pids = [
+        client.post(f"/orgs/{org_id}/projects", json={"name": f"p{i}"}, headers=auth(jwt)).json()["id"]
+        for i in range(projects)
+    ]
+    for i, title in enumerate(titles):
+        r = client.post(f"/orgs/{org_id}/projects/{pids[i % projects]}/tasks", json={"title": title}, headers=auth(jwt))
+        assert r.status_code == 200
+    return org_id
+
+def search(client, jwt: str, org_id: str, **params) -> dict:
+    r = client.get(f"/orgs/{org_id}/tasks/search", params=params, headers=auth(jwt))
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def test_search_is_ranked_prefixed_and_spans_projects(client):
+    jwt = login(client, f"search+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = make_org(
+        client,
+        jwt,
+        ["Fix login bug", "login page copy", "Logout button", "Login login login retry", "unrelated"],
+        projects=2,
+    )
+
+    titles = [t["title"] for t in search(client, jwt, org_id, q="login")["items"]]
+    assert titles[0] == "Login login login retry"
+    assert set(titles) == {"Fix login bug", "login page copy", "Login login login retry"}
+
+    # last word is a prefix, every word must match
+    assert {t["title"] for t in search(client, jwt, org_id, q="log")["items"]} == set(titles) | {"Logout button"}
+    assert [t["title"] for t in search(client, jwt, org_id, q="fix log")["items"]] == ["Fix login bug"]
+    # ...unless the query ends with a separator: the word is complete
+    assert search(client, jwt, org_id, q="fix log ")["items"] == []
+
+    # operators and punctuation are just separators
+    assert [t["title"] for t in search(client, jwt, org_id, q="fix & !(login")["items"]] == ["Fix login bug"]
+    assert search(client, jwt, org_id, q="!!!")["items"] == []
+
+def test_search_pages_and_stays_in_the_org(client):
+    jwt = login(client, f"search-pages+{uuid.uuid4().hex[:8]}@example.com")
+    mine = make_org(client, jwt, [f"deploy step {i}" for i in range(5)])
+    other_jwt = login(client, f"search-other+{uuid.uuid4().hex[:8]}@example.com")
+    make_org(client, other_jwt, ["deploy secret"])
+
+    seen, cursor = [], None
+    while True:
+        body = search(client, jwt, mine, q="deploy", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [t["title"] for t in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(f"deploy step {i}" for i in range(5))
+
+    r = client.get(f"/orgs/{mine}/tasks/search", params={"q": "deploy"}, headers=auth(other_jwt))
+    assert r.status_code == 403
+
+def test_search_ranks_only_the_newest_candidates(client, monkeypatch):
+    from app.config import settings
+
+    jwt = login(client, f"search-cap+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = make_org(client, jwt, [f"release {i}" for i in range(5)])
+    monkeypatch.setattr(settings, "task_search_max_candidates", 3)
+
+    body = search(client, jwt, org_id, q="release")
+    assert sorted(t["title"] for t in body["items"]) == ["release 2", "release 3", "release 4"]
+    assert body["next_cursor"] is None
+
+def test_lexemes_only_match_their_own_org(db_session):
+    from sqlalchemy import text
+
+    mine, other = uuid.uuid4(), uuid.uuid4()
+
+    def matches(org: uuid.UUID, q: str) -> bool:
+        return db_session.execute(
+            text("select task_search_tsv(:mine, 'Fix login bug') @@ task_search_tsquery(:org, to_tsquery('simple', :q))"),
+            {"mine": mine, "org": org, "q": q},
+        ).scalar_one()
+
+    assert matches(mine, "fix & log:*")
+    assert not matches(other, "fix & log:*")
+    assert not matches(mine, "fix & logout")
+    # positions survive the prefixing, so ranking sees the same document
+    assert db_session.execute(
+        text("select ts_rank_cd(task_search_tsv(:o, 'a b a'), task_search_tsquery(:o, 'a'::tsquery))"
+             " = ts_rank_cd(to_tsvector('simple', 'a b a'), 'a'::tsquery)"),
+        {"o": mine},
+    ).scalar_one()
+
+def test_prefix_terms_search_the_orgs_words(client, db_session, monkeypatch):
+    from sqlalchemy import select
+
+    from app import task_search
+    from app.models import TaskSearchWord
+
+    jwt = login(client, f"search-words+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = make_org(client, jwt, ["Fix login bug", "Fix logout", "fix lint", "Login page"])
+
+    def words() -> set[str]:
+        return set(db_session.scalars(select(TaskSearchWord.word).where(TaskSearchWord.org_id == org_id)))
+
+    assert words() == {"fix", "login", "bug", "logout", "lint", "page"}
+
+    expanded = {t["title"] for t in search(client, jwt, org_id, q="fix lo")["items"]}
+    assert expanded == {"Fix login bug", "Fix logout"}
+    # too many words for the prefix: a plain prefix match finds the same tasks
+    monkeypatch.setattr(task_search, "MAX_PREFIX_WORDS", 1)
+    assert {t["title"] for t in search(client, jwt, org_id, q="fix lo")["items"]} == expanded
+
+    # a renamed task's new words count too
+    task = next(t for t in search(client, jwt, org_id, q="lint ")["items"])
+    r = client.patch(f"/orgs/{org_id}/tasks/{task['id']}", json={"title": "fix logging"}, headers=auth(jwt))
+    assert r.status_code == 200, r.text
+    assert "logging" in words()
+    monkeypatch.setattr(task_search, "MAX_PREFIX_WORDS", 64)
+    assert {t["title"] for t in search(client, jwt, org_id, q="fix logg")["items"]} == {"fix logging"}
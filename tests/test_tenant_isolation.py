@@ -1,3 +1,5 @@
+import uuid
+
 def login(client, email: str) -> str:
     r = client.post("/auth/request-link", json={"email": email})
     assert r.status_code == 200
@@ -36,3 +38,28 @@ def test_tenant_isolation_projects(client):
         headers=auth_headers(b),
     )
     assert r.status_code in (403, 404)
+
+def test_project_from_another_org_is_not_found(client):
+    a = login(client, "c@example.com")
+
+    org_1 = client.post("/orgs", json={"name": "org-1"}, headers=auth_headers(a)).json()["id"]
+    org_2 = client.post("/orgs", json={"name": "org-2"}, headers=auth_headers(a)).json()["id"]
+    r = client.post(f"/orgs/{org_2}/projects", json={"name": "p2"}, headers=auth_headers(a))
+    assert r.status_code == 200
+    project_2 = r.json()["id"]
+
+    # member of both orgs, but the project is addressed through the wrong one
+    r = client.get(f"/orgs/{org_1}/projects/{project_2}/tasks", headers=auth_headers(a))
+    assert r.status_code == 404
+    r = client.post(
+        f"/orgs/{org_1}/projects/{project_2}/tasks",
+        json={"title": "t"},
+        headers=auth_headers(a),
+    )
+    assert r.status_code == 404
+
+    r = client.get(f"/orgs/{org_2}/projects/{project_2}/tasks", headers=auth_headers(a))
+    assert r.status_code == 200
+
+    r = client.get(f"/orgs/{uuid.uuid4()}/projects", headers=auth_headers(a))
+    assert r.status_code == 404
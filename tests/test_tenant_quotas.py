@@ -0,0 +1,60 @@
+import uuid
+
+from app.config import settings
+
+def login(client, email: str) -> str:
+    r = client.post("/auth/request-link", json={"email": email})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    r = client.post("/auth/redeem", json={"token": token})
+    assert r.status_code == 200
+    return r.json()["access_token"]
+
+def auth(jwt: str) -> dict[str, str]:
+    return {"authorization": f"bearer {jwt}"}
+
+def test_read_and_write_budgets_are_separate_and_per_org(client, monkeypatch):
+    jwt = login(client, f"quota+{uuid.uuid4().hex[:8]}@example.com")
+    org_a = client.post("/orgs", json={"name": "quota-a"}, headers=auth(jwt)).json()["id"]
+    org_b = client.post("/orgs", json={"name": "quota-b"}, headers=auth(jwt)).json()["id"]
+
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "tenant_quota_free_read_per_min", 3)
+    monkeypatch.setattr(settings, "tenant_quota_free_write_per_min", 2)
+
+    for _ in range(3):
+        r = client.get(f"/orgs/{org_a}/projects", headers=auth(jwt))
+        assert r.status_code == 200
+        assert r.headers["ratelimit-limit"] == "3"
+
+    r = client.get(f"/orgs/{org_a}/projects", headers=auth(jwt))
+    assert r.status_code == 429
+    assert r.json()["detail"] == "tenant_read_quota_exceeded"
+    assert int(r.headers["retry-after"]) >= 1
+
+    # writes draw from their own budget
+    r = client.post(f"/orgs/{org_a}/projects", json={"name": "p1"}, headers=auth(jwt))
+    assert r.status_code == 200
+    r = client.post(f"/orgs/{org_a}/projects", json={"name": "p2"}, headers=auth(jwt))
+    assert r.status_code == 200
+    r = client.post(f"/orgs/{org_a}/projects", json={"name": "p3"}, headers=auth(jwt))
+    assert r.status_code == 429
+    assert r.json()["detail"] == "tenant_write_quota_exceeded"
+
+    # another tenant is unaffected
+    r = client.get(f"/orgs/{org_b}/projects", headers=auth(jwt))
+    assert r.status_code == 200
+
+def test_unauthorized_calls_do_not_spend_the_tenant_budget(client, monkeypatch):
+    owner = login(client, f"quota-owner+{uuid.uuid4().hex[:8]}@example.com")
+    outsider = login(client, f"quota-out+{uuid.uuid4().hex[:8]}@example.com")
+    org_id = client.post("/orgs", json={"name": "quota-c"}, headers=auth(owner)).json()["id"]
+
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "tenant_quota_free_read_per_min", 2)
+
+    for _ in range(5):
+        assert client.get(f"/orgs/{org_id}/projects", headers=auth(outsider)).status_code == 403
+
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(owner)).status_code == 200
+    assert client.get(f"/orgs/{org_id}/projects", headers=auth(owner)).status_code == 200
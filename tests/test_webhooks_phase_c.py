@@ -1,13 +1,19 @@
+import asyncio
 import hmac
 import hashlib
 import json
+import os
 import time
 
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.billing import stripe_events
 from app.config import settings
 from app.models.org import Org
 from app.models.webhook_event import WebhookEvent
+from app.redis_client import close_redis
 
 def login(client, email: str) -> str:
     r = client.post("/auth/request-link", json={"email": email})
@@ -56,7 +62,7 @@ def test_stripe_signature_accepts_valid(client):
     # it will be ignored (unknown customer) but signature should pass
     assert r.status_code == 200
 
-def test_failed_event_records_failed_and_retry_can_succeed(client, db_session):
+def test_failed_event_records_failed_and_retry_can_succeed(client, db_session, drain_webhooks):
     settings.STRIPE_WEBHOOK_SECRET = None  # keep simple for this test
 
     owner_jwt = login(client, "phasec-owner@example.com")
@@ -76,7 +82,9 @@ def test_failed_event_records_failed_and_retry_can_succeed(client, db_session):
         "data": {"object": "boom"},
     }
     r1 = client.post("/webhooks/stripe", json=bad_payload)
-    assert r1.status_code == 500
+    assert r1.status_code == 200
+    assert r1.json()["status"] == "queued"
+    drain_webhooks()
 
     ev = db_session.scalar(
         select(WebhookEvent).where(WebhookEvent.provider == "stripe", WebhookEvent.event_id == "evt_fail_1")
@@ -101,9 +109,184 @@ def test_failed_event_records_failed_and_retry_can_succeed(client, db_session):
     }
     r2 = client.post("/webhooks/stripe", json=good_payload)
     assert r2.status_code == 200
+    assert r2.json()["status"] == "queued"
+    drain_webhooks()
 
     ev2 = db_session.scalar(
         select(WebhookEvent).where(WebhookEvent.provider == "stripe", WebhookEvent.event_id == "evt_fail_1")
     )
     assert ev2
     assert ev2.status in {"processed", "ignored"}  # processed if org matched
+    assert ev2.error is None
+
+def test_database_error_is_recorded_in_a_fresh_session(client, db_session, drain_webhooks):
+    settings.STRIPE_WEBHOOK_SECRET = None
+
+    owner_jwt = login(client, "phasec-owner-db@example.com")
+    org_id = client.post("/orgs", json={"name": "phasec-org-db"}, headers=auth(owner_jwt)).json()["id"]
+    org = db_session.get(Org, org_id)
+    org.stripe_customer_id = "cus_phasec_db"
+    db_session.commit()
+
+    # the subscription id doesn't fit the column: the commit itself fails
+    payload = {
+        "id": "evt_fail_db",
+        "type": "customer.subscription.updated",
+        "data": {"object": {"id": "sub_" + "x" * 300, "customer": "cus_phasec_db", "status": "active"}},
+    }
+    assert client.post("/webhooks/stripe", json=payload).status_code == 200
+    drain_webhooks()
+
+    ev = db_session.scalar(select(WebhookEvent).where(WebhookEvent.event_id == "evt_fail_db"))
+    assert ev.status == "failed"
+    assert "StringDataRightTruncation" in ev.error
+    assert db_session.get(Org, org_id).plan == "free"
+
+    # a duplicate of a failed event is queued again, not ignored
+    r = client.post("/webhooks/stripe", json=payload)
+    assert r.json()["status"] == "queued"
+    drain_webhooks()
+
+def test_events_left_queued_or_failed_are_drained(db_session):
+    org = Org(name="phasec-org-resume", stripe_customer_id="cus_phasec_resume")
+    db_session.add(org)
+    # recorded by a worker that died before applying it, and a failed one
+    queued = WebhookEvent(
+        provider="stripe",
+        event_id="evt_resume_1",
+        event_type="invoice.paid",
+        status="received",
+        payload={"data": {"object": {"id": "in_resume", "customer": "cus_phasec_resume"}}},
+    )
+    failed = WebhookEvent(
+        provider="stripe",
+        event_id="evt_resume_2",
+        event_type="invoice.payment_failed",
+        status="failed",
+        error="OperationalError: server closed the connection",
+        payload={"data": {"object": {"id": "in_resume_2", "customer": "cus_phasec_resume"}}},
+    )
+    db_session.add_all([queued, failed])
+    db_session.commit()
+
+    async def scenario():
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            async with sessions() as db:
+                assert await stripe_events.requeue_failed(db) == 1
+                await db.commit()
+            assert dict(await stripe_events.drain(sessions)) == {queued.id: "processed", failed.id: "processed"}
+            # nothing left for the next worker or run of the script
+            assert await stripe_events.drain(sessions) == []
+        finally:
+            await engine.dispose()
+            await close_redis()
+
+    asyncio.run(scenario())
+    db_session.refresh(org)
+    assert org.plan == "pro" and org.subscription_status == "past_due"
+    for ev in (queued, failed):
+        db_session.refresh(ev)
+        assert ev.status == "processed" and ev.processed_at is not None and ev.error is None
+
+def test_one_bad_event_does_not_fail_its_batch(client, db_session, drain_webhooks):
+    settings.STRIPE_WEBHOOK_SECRET = None
+    org = Org(name="phasec-org-batch", stripe_customer_id="cus_phasec_batch")
+    db_session.add(org)
+    db_session.commit()
+
+    # queued together, so the drain takes them as one batch
+    for event_id, obj in (
+        ("evt_batch_ok_1", {"id": "in_1", "customer": "cus_phasec_batch"}),
+        ("evt_batch_bad", {"id": "sub_" + "x" * 300, "customer": "cus_phasec_batch", "status": "active"}),
+        ("evt_batch_ok_2", {"id": "in_2", "customer": "cus_phasec_batch"}),
+    ):
+        event_type = "customer.subscription.updated" if event_id == "evt_batch_bad" else "invoice.paid"
+        db_session.add(
+            WebhookEvent(
+                provider="stripe",
+                event_id=event_id,
+                event_type=event_type,
+                status="received",
+                payload={"data": {"object": obj}},
+            )
+        )
+    db_session.commit()
+
+    # any delivery starts the worker's drain
+    r = client.post("/webhooks/stripe", json={"id": "evt_batch_other", "type": "charge.succeeded", "data": {"object": {}}})
+    assert r.json()["status"] == "queued"
+    drain_webhooks()
+
+    statuses = dict(db_session.execute(select(WebhookEvent.event_id, WebhookEvent.status)).all())
+    assert statuses == {
+        "evt_batch_ok_1": "processed",
+        "evt_batch_bad": "failed",
+        "evt_batch_ok_2": "processed",
+        "evt_batch_other": "ignored",
+    }
+    db_session.refresh(org)
+    assert org.plan == "pro"
+
+def test_deliveries_arriving_together_are_recorded_together(db_session):
+    async def scenario():
+        engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            # one insert for all four: a repeat of the first is a duplicate,
+            # an event id the ledger can't hold fails only its own delivery
+            results = await asyncio.gather(
+                stripe_events.record(sessions, "evt_together_1", "charge.succeeded", {"data": {"object": {}}}),
+                stripe_events.record(sessions, "evt_together_1", "charge.succeeded", {"data": {"object": {}}}),
+                stripe_events.record(sessions, "evt_" + "x" * 300, "charge.succeeded", {"data": {"object": {}}}),
+                stripe_events.record(sessions, "evt_together_2", "charge.succeeded", {"data": {"object": {}}}),
+                return_exceptions=True,
+            )
+            while stripe_events._running:
+                await asyncio.sleep(0.05)
+            return results
+        finally:
+            await engine.dispose()
+
+    first, repeat, bad, other = asyncio.run(scenario())
+    assert first is not None and other is not None
+    assert repeat is None
+    assert "StringDataRightTruncation" in str(bad)
+
+    rows = dict(db_session.execute(select(WebhookEvent.event_id, WebhookEvent.id)).all())
+    assert rows == {"evt_together_1": first, "evt_together_2": other}
+    statuses = set(db_session.scalars(select(WebhookEvent.status)))
+    assert statuses == {"ignored"}
+
+def test_batch_finds_an_org_by_the_subscription_an_earlier_event_gave_it(client, db_session, drain_webhooks):
+    settings.STRIPE_WEBHOOK_SECRET = None
+    org = Org(name="phasec-org-batch-sub")
+    db_session.add(org)
+    db_session.commit()
+
+    # the first names the org by metadata only and gives it the subscription,
+    # the second names it by that subscription only
+    for event_id, event_type, obj in (
+        (
+            "evt_batch_sub_1",
+            "customer.subscription.updated",
+            {"id": "sub_phasec_batch", "customer": "cus_unknown", "status": "past_due", "metadata": {"org_id": str(org.id)}},
+        ),
+        ("evt_batch_sub_2", "invoice.paid", {"id": "in_1", "customer": "cus_unknown", "subscription": "sub_phasec_batch"}),
+    ):
+        db_session.add(
+            WebhookEvent(provider="stripe", event_id=event_id, event_type=event_type, status="received", payload={"data": {"object": obj}})
+        )
+        # received_at is the transaction's start: one each, so they apply in order
+        db_session.commit()
+
+    r = client.post("/webhooks/stripe", json={"id": "evt_batch_sub_other", "type": "charge.succeeded", "data": {"object": {}}})
+    assert r.json()["status"] == "queued"
+    drain_webhooks()
+
+    statuses = dict(db_session.execute(select(WebhookEvent.event_id, WebhookEvent.status)).all())
+    assert statuses["evt_batch_sub_1"] == statuses["evt_batch_sub_2"] == "processed"
+    db_session.refresh(org)
+    assert org.stripe_subscription_id == "sub_phasec_batch"
+    assert org.plan == "pro" and org.subscription_status == "active"
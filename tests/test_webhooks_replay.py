@@ -17,7 +17,7 @@ def login(client, email: str) -> str:
 def auth(jwt: str) -> dict[str, str]:
     return {"authorization": f"bearer {jwt}"}
 
-def test_stripe_webhook_replay_is_idempotent(client, db_session: Session):
+def test_stripe_webhook_replay_is_idempotent(client, db_session: Session, drain_webhooks):
     owner_jwt = login(client, "owner-webhooks@example.com")
 
     r = client.post("/orgs", json={"name": "stripe-org"}, headers=auth(owner_jwt))
@@ -49,6 +49,10 @@ def test_stripe_webhook_replay_is_idempotent(client, db_session: Session):
     assert r2.status_code == 200
     assert r2.json().get("duplicate") is True
 
+    drain_webhooks()
+    r3 = client.post("/webhooks/stripe", json=payload)
+    assert r3.json().get("duplicate") is True
+
     org2 = db_session.get(Org, org_id)
     assert org2 is not None
     assert org2.plan == "pro"
@@ -60,7 +64,7 @@ def test_stripe_webhook_replay_is_idempotent(client, db_session: Session):
     )
     assert count == 1
 
-def test_stripe_webhook_unknown_customer_is_noop(client, db_session: Session):
+def test_stripe_webhook_unknown_customer_is_noop(client, db_session: Session, drain_webhooks):
     owner_jwt = login(client, "owner-webhooks-2@example.com")
 
     r = client.post("/orgs", json={"name": "org-1"}, headers=auth(owner_jwt))
@@ -94,6 +98,7 @@ def test_stripe_webhook_unknown_customer_is_noop(client, db_session: Session):
 
     r = client.post("/webhooks/stripe", json=payload)
     assert r.status_code == 200
+    drain_webhooks()
 
     org1b = db_session.get(Org, org_1_id)
     org2b = db_session.get(Org, org_2_id)